@@ -0,0 +1,104 @@
+"""
+Compara la extracción de medicamentos del HTML de resultados de CIMAVet.
+
+Uso (desde la raíz del proyecto):
+    python scripts/benchmark_parser_cimavet.py                      # páginas sintéticas
+    python scripts/benchmark_parser_cimavet.py --tarjetas 500 2000 --profundidad 40
+    python scripts/benchmark_parser_cimavet.py --html data/raw/cimavet_results.html
+
+Mide tres implementaciones sobre la misma página:
+    legado  find_all('div') + get_text() en cada div con html.parser (cuadrático)
+    bs4     recorrido de un paso con html.parser (respaldo sin lxml)
+    lxml    HTMLPullParser en streaming (el que se usa si lxml está instalado)
+
+Las páginas sintéticas no tienen clases de tarjeta, así que se ejercita el
+camino de búsqueda por marcas, que es el que era cuadrático.
+"""
+import sys
+import time
+import argparse
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from bs4 import BeautifulSoup
+
+from scraping import parser_cimavet
+
+
+def pagina_sintetica(tarjetas: int, profundidad: int = 4) -> str:
+    """Página de resultados con `tarjetas` fichas sin clase, anidadas en `profundidad` divs"""
+    fichas = []
+    for i in range(tarjetas):
+        fichas.append(
+            f"<div><div><h4>MEDICAMENTO SINTETICO NUMERO {i} COMPRIMIDOS</h4></div>"
+            f"<div><p>LABORATORIO LABIANA</p></div>"
+            f"<div><p>PRINCIPIOS ACTIVOS</p>\n<p>PRINCIPIO {i}</p></div>\n"
+            f"<div><p>ESPECIE DE DESTINO</p>\n<p>Perros</p></div>\n"
+            f"<div><p>Nº REGISTRO</p>\n<p>{1000 + i} ESP</p></div>\n<p>AUTORIZADO</p></div>\n"
+        )
+    return ("<html><body>" + "<div class='contenedor'>" * profundidad + "\n".join(fichas)
+            + "</div>" * profundidad + "</body></html>")
+
+
+def parsear_legado(html: str) -> list:
+    """Implementación anterior (referencia): get_text() en cada div que contiene las marcas"""
+    soup = BeautifulSoup(html, 'html.parser')
+    elementos = soup.find_all(['div', 'article'], class_=['card', 'medication', 'result'])
+    if not elementos:
+        elementos = [d for d in soup.find_all('div')
+                     if 'PRINCIPIOS ACTIVOS' in d.get_text().upper()
+                     or ('ESPECIE' in d.get_text().upper() and 'LABORATORIO' in d.get_text().upper())]
+    return [med for med in (parser_cimavet._medicamento(e.get_text()) for e in elementos) if med]
+
+
+def medir(funcion, html, repeticiones: int):
+    mejor, resultado = float('inf'), None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion(html)
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor, resultado
+
+
+def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(description="Benchmark de la extracción de resultados de CIMAVet")
+    parser.add_argument("--tarjetas", type=int, nargs="+", default=[100, 400, 1600])
+    parser.add_argument("--profundidad", type=int, default=4,
+                        help="Divs contenedores alrededor de las fichas (el legado los recorre enteros cada uno)")
+    parser.add_argument("--html", default=None, help="Página guardada a medir en lugar de las sintéticas")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--sin-legado", action="store_true", help="No medir la implementación cuadrática")
+    args = parser.parse_args()
+
+    if args.html:
+        paginas = [(Path(args.html).name, Path(args.html).read_text(encoding='utf-8'))]
+    else:
+        paginas = [(f"{n} tarjetas", pagina_sintetica(n, args.profundidad)) for n in args.tarjetas]
+
+    implementaciones = [('bs4', parser_cimavet._parsear_bs4)]
+    if parser_cimavet.etree is not None:
+        implementaciones.append(('lxml', parser_cimavet.parsear_medicamentos))
+    if not args.sin_legado:
+        implementaciones.insert(0, ('legado', parsear_legado))
+
+    print("\n" + "="*70)
+    print("⏱️  BENCHMARK EXTRACCIÓN CIMAVET")
+    print("="*70)
+    for nombre_pagina, html in paginas:
+        print(f"\n• {nombre_pagina} ({len(html) / 1024:.0f} KB)")
+        referencia = None
+        for nombre, funcion in implementaciones:
+            segundos, medicamentos = medir(funcion, html, args.repeticiones)
+            # El legado además devuelve campos sueltos y contenedores: se comparan los registros válidos
+            registros = sorted({m['numero_registro'] for m in medicamentos if m['numero_registro']})
+            referencia = registros if referencia is None else referencia
+            coincide = "✅" if registros == referencia else "⚠️ distinto"
+            print(f"   {nombre:>7}: {segundos * 1000:9.1f} ms | {len(registros)} registros "
+                  f"({len(medicamentos)} filas) {coincide}")
+    print("\n" + "="*70 + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Mide el rendimiento del scraper HTTP contra el servidor CIMAVet local (sin red).
+
+Uso (desde la raíz del proyecto):
+    python scripts/benchmark_scraper_http.py
+    python scripts/benchmark_scraper_http.py --latencia 0.1 --concurrencias 1 4 16
+
+Para cada nivel de concurrencia levanta un servidor con el catálogo grabado y
+una latencia fija por petición, scrapea todas las particiones y muestra
+peticiones por segundo y medicamentos obtenidos.
+"""
+import sys
+import time
+import argparse
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from scraping.servidor_cimavet_local import ServidorCimavetLocal
+from scraping.scraper_http import ejecutar
+
+
+def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(description="Benchmark del scraper HTTP contra el servidor local")
+    parser.add_argument("--latencia", type=float, default=0.05, help="Segundos por petición en el servidor")
+    parser.add_argument("--tamano-pagina", type=int, default=2)
+    parser.add_argument("--concurrencias", type=int, nargs="+", default=[1, 4, 8, 16])
+    parser.add_argument("--por-segundo", type=float, default=0, help="Límite de tasa del cliente (0 = sin límite)")
+    args = parser.parse_args()
+
+    print("\n" + "="*70)
+    print(f"⏱️  BENCHMARK SCRAPER HTTP (latencia {args.latencia * 1000:.0f} ms/petición)")
+    print("="*70)
+
+    for concurrencia in args.concurrencias:
+        with ServidorCimavetLocal(latencia=args.latencia, tamano_pagina=args.tamano_pagina) as servidor:
+            inicio = time.perf_counter()
+            medicamentos, fallidas = ejecutar(servidor.url, concurrencia=concurrencia, por_segundo=args.por_segundo)
+            segundos = time.perf_counter() - inicio
+        print(f"   • concurrencia {concurrencia:>3}: {segundos:6.2f}s | {servidor.peticiones / segundos:7.1f} pet/s | "
+              f"{len(medicamentos)} medicamentos | máx. en vuelo {servidor.max_simultaneas}"
+              + (f" | ❌ {len(fallidas)} fallidas" if fallidas else ""))
+    print("="*70 + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Compila el grafo de conocimiento a un binario mapeable en memoria (.kgbin).
+
+Uso (desde la raíz del proyecto):
+    python scripts/compilar_grafo.py
+    python scripts/compilar_grafo.py --grafo data/knowledge_graph/mapeo_enfermedades_medicamentos.json
+
+El motor usa automáticamente el .kgbin si es posterior al JSON; todos los
+procesos de Streamlit que lo abren comparten las mismas páginas de memoria,
+también las de los índices de búsqueda que se compilan junto al grafo.
+"""
+import sys
+import argparse
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from processing.grafo_compilado import compilar_desde_json, GrafoCompilado
+from processing.indices_compilados import SECCIONES_INDICES
+
+GRAFO_POR_DEFECTO = "data/knowledge_graph/mapeo_enfermedades_medicamentos.json"
+
+
+def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(description="Compila el grafo de conocimiento a .kgbin")
+    parser.add_argument("--grafo", default=GRAFO_POR_DEFECTO, help="JSON del grafo de conocimiento")
+    parser.add_argument("--salida", default=None, help="Ruta del binario (por defecto, junto al JSON)")
+    parser.add_argument("--sin-indices", action="store_true", help="Solo los datos, sin los índices de búsqueda")
+    args = parser.parse_args()
+
+    print("\n" + "="*70)
+    print("🧱 COMPILADOR DEL GRAFO DE CONOCIMIENTO")
+    print("="*70)
+
+    salida = compilar_desde_json(args.grafo, args.salida, indices=not args.sin_indices)
+    grafo = GrafoCompilado(salida)
+
+    print(f"\n📁 Archivo creado: {salida} ({salida.stat().st_size / 1024:.0f} KB)")
+    print(f"   • Medicamentos: {len(grafo.medicamentos)}")
+    print(f"   • Enfermedades: {len(grafo.enfermedades)}")
+    print(f"   • Relaciones:   {len(grafo.relaciones)}")
+    print(f"   • Índices:      {sum(nombre in grafo.secciones for nombre in SECCIONES_INDICES)} secciones")
+    print("="*70 + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Construye TODOS los artefactos del grafo de conocimiento desde los CSV procesados.
+
+Uso (desde la raíz del proyecto):
+    python scripts/construir_grafo.py
+    python scripts/construir_grafo.py --completo --workers 2
+
+Etapas (las independientes se ejecutan en paralelo en un pool de procesos):
+    1. enfermedades_42_completo.json + sintomas_enfermedades_mapping.json
+       (GeneradorEnfermedadesJSON, incremental con su manifest)
+    2. mapeo_enfermedades_medicamentos.json (medicamentos, enfermedades y
+       relaciones con principios_coincidentes) y a continuación su .kgbin
+    3. Índices de búsqueda compilados (principios, catálogo, ranking y
+       autocompletado), como secciones del mismo .kgbin
+
+El mapeo se escribe en streaming: las aristas de cada enfermedad se vuelcan a
+un JSONL temporal según se calculan, y tanto el JSON final como el .kgbin se
+escriben leyendo ese JSONL registro a registro. Las relaciones no llegan a
+estar todas en memoria (del .kgbin solo se acumula su tabla de offsets, 8
+bytes por relación, y el ranking su adyacencia ponderada); medicamentos y
+enfermedades sí se cargan enteros. Los índices van en el .kgbin y no en un
+fichero aparte para que nunca queden desfasados respecto a los datos.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+sys.path.append(str(Path(__file__).parent))
+
+import pandas as pd
+
+from processing.principios_index import PrincipiosIndex
+from processing.relaciones_incrementales import CalculadorRelaciones
+from processing.escritor_json import EscritorJSON
+from processing.grafo_compilado import compilar, ruta_compilada
+from processing.indices_compilados import SECCIONES_INDICES
+from processing.validador_grafo import validar_directorio
+from generar_enfermedades_json import GeneradorEnfermedadesJSON, MANIFEST_POR_DEFECTO
+
+MEDICAMENTOS_CSV = 'data/processed/cimavet_completo.csv'
+ENFERMEDADES_CSV = 'data/processed/enfermedades_medicamentos_procesado.csv'
+SALIDA_POR_DEFECTO = 'data/knowledge_graph'
+NOMBRE_MAPEO = 'mapeo_enfermedades_medicamentos.json'
+
+# Campos de la ficha del medicamento en el grafo; los opcionales se toman del CSV si existen
+CAMPOS_MEDICAMENTO = ('id', 'nombre', 'numero_registro', 'principios_activos', 'especie', 'presentacion',
+                      'titular', 'prescripcion', 'estado', 'fecha_comercializado')
+
+
+# ========== CARGA ==========
+
+def cargar_medicamentos(ruta: str = MEDICAMENTOS_CSV) -> dict:
+    """med_<fila> -> ficha en el formato del grafo, con carga vectorizada"""
+    df = pd.read_csv(ruta, dtype=str).fillna('').rename(columns={'medicamento': 'nombre'})
+    df['id'] = 'med_' + df.index.astype(str)
+    df['principios_activos'] = df['principios_activos'].str.split(',').map(
+        lambda lista: [p.strip() for p in lista if p.strip()])
+    campos = [c for c in CAMPOS_MEDICAMENTO if c in df.columns]
+    return {ficha['id']: ficha for ficha in df[campos].to_dict('records')}
+
+
+def cargar_enfermedades(ruta: str = ENFERMEDADES_CSV) -> dict:
+    """'<nombre>_<especie>' -> enfermedad del grafo (sin medicamentos todavía)"""
+    df = pd.read_csv(ruta, dtype=str).fillna('')
+    enfermedades = {}
+    for nombre, categoria, especie, principios, indicaciones, contraindicaciones, notas in zip(
+            df['enfermedad'], df['categoria'], df['especie'], df['principios_activos'],
+            df['indicaciones'], df['contraindicaciones'], df['notas']):
+        key = f"{nombre}_{especie}"
+        enfermedades[key] = {
+            'id': key,
+            'nombre': nombre,
+            'categoria': categoria,
+            'especie': especie,
+            'indicaciones': indicaciones,
+            'contraindicaciones': contraindicaciones,
+            'notas': notas,
+            'principios_recomendados': [p.strip() for p in principios.split(';') if p.strip()],
+            'medicamentos_asociados': [],
+        }
+    return enfermedades
+
+
+def _leer_jsonl(ruta):
+    with open(ruta, 'r', encoding='utf-8') as f:
+        for linea in f:
+            yield json.loads(linea)
+
+
+# ========== ETAPAS ==========
+
+def etapa_enfermedades(dir_salida: str, manifest: str, completo: bool) -> dict:
+    """JSON de enfermedades y de síntomas (incremental)"""
+    inicio = time.perf_counter()
+    generador = GeneradorEnfermedadesJSON(dir_salida=dir_salida, manifest_path=manifest)
+    if not generador.cargar_datos(incremental=not completo):
+        raise RuntimeError("No se pudieron cargar los CSV de enfermedades")
+    archivos = generador.guardar_jsons()
+    return {'etapa': 'enfermedades', 'archivos': list(archivos), 'segundos': time.perf_counter() - inicio,
+            'recalculadas': len(generador.recalculadas)}
+
+
+def etapa_mapeo(dir_salida: str) -> dict:
+    """Mapeo enfermedades -> medicamentos en streaming y, tras él, su versión compilada"""
+    inicio = time.perf_counter()
+    medicamentos = cargar_medicamentos()
+    enfermedades = cargar_enfermedades()
+    calculador = CalculadorRelaciones(medicamentos, PrincipiosIndex(medicamentos, {}))
+
+    salida = Path(dir_salida) / NOMBRE_MAPEO
+    salida.parent.mkdir(parents=True, exist_ok=True)
+    fd, spool = tempfile.mkstemp(dir=salida.parent, prefix='relaciones', suffix='.jsonl.tmp')
+    try:
+        # 1. Aristas de cada enfermedad al JSONL temporal (solo queda en memoria la lista de ids)
+        total_relaciones = 0
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            for key, enfermedad in enfermedades.items():
+                aristas = calculador.calcular(key, enfermedad)
+                enfermedad['medicamentos_asociados'] = [a['hacia_medicamento'] for a in aristas]
+                for arista in aristas:
+                    f.write(json.dumps(arista, ensure_ascii=False) + '\n')
+                total_relaciones += len(aristas)
+
+        # 2. JSON final registro a registro
+        with EscritorJSON(salida) as escritor:
+            escritor.escribir('metadata', {
+                'total_medicamentos': len(medicamentos),
+                'total_enfermedades': len(enfermedades),
+                'total_correlaciones': total_relaciones,
+            })
+            escritor.escribir_objeto('medicamentos', medicamentos.items())
+            escritor.escribir_objeto('enfermedades', enfermedades.items())
+            escritor.escribir_lista('relaciones', _leer_jsonl(spool))
+
+        # 3. Binario mapeable con los índices de búsqueda (después del JSON: el motor
+        #    solo lo usa si es posterior)
+        compilado = compilar({'medicamentos': medicamentos, 'enfermedades': enfermedades,
+                              'relaciones': _leer_jsonl(spool)}, ruta_compilada(salida), indices=True)
+    finally:
+        if os.path.exists(spool):
+            os.unlink(spool)
+
+    return {'etapa': 'mapeo', 'archivos': [str(salida), str(compilado)], 'segundos': time.perf_counter() - inicio,
+            'medicamentos': len(medicamentos), 'enfermedades': len(enfermedades), 'relaciones': total_relaciones,
+            'indices': len(SECCIONES_INDICES)}
+
+
+def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(description="Construye todos los artefactos del grafo de conocimiento")
+    parser.add_argument("--salida", default=SALIDA_POR_DEFECTO, help="Directorio de los JSON generados")
+    parser.add_argument("--manifest", default=MANIFEST_POR_DEFECTO, help="Manifest del generador de enfermedades")
+    parser.add_argument("--completo", action="store_true", help="Recalcula todo ignorando el manifest")
+    parser.add_argument("--workers", type=int, default=2, help="Procesos para las etapas independientes")
+    args = parser.parse_args()
+
+    print("\n" + "="*70)
+    print("🏗️  CONSTRUCCIÓN DEL GRAFO DE CONOCIMIENTO")
+    print("="*70)
+
+    inicio = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        futuros = [
+            pool.submit(etapa_enfermedades, args.salida, args.manifest, args.completo),
+            pool.submit(etapa_mapeo, args.salida),
+        ]
+        resultados = [futuro.result() for futuro in futuros]
+
+    print("\n" + "="*70)
+    print("✅ CONSTRUCCIÓN COMPLETADA")
+    print("="*70)
+    for resultado in resultados:
+        print(f"\n• Etapa {resultado['etapa']} ({resultado['segundos']:.2f}s)")
+        for archivo in resultado['archivos']:
+            print(f"   📁 {archivo}")
+    mapeo = resultados[1]
+    print(f"\n📊 {mapeo['medicamentos']} medicamentos | {mapeo['enfermedades']} enfermedades | "
+          f"{mapeo['relaciones']} relaciones")
+    print(f"🔎 Índices de búsqueda: {mapeo['indices']} secciones en el .kgbin")
+    print(f"⏱️  Total: {time.perf_counter() - inicio:.2f}s")
+
+    # Integridad referencial de lo generado (falla el comando si hay referencias rotas)
+    informe = validar_directorio(args.salida)
+    print(f"{'🩺' if informe.valido else '❌'} {informe.resumen()} | avisos: {len(informe.avisos)}")
+    print("="*70 + "\n")
+    if not informe.valido:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
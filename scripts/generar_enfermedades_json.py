@@ -6,76 +6,225 @@ Genera automáticamente los JSONs para 42 enfermedades + síntomas
 Usa los datos que ya tienes en CSVs
 
 Ejecutar: python scripts/generar_enfermedades_json.py
+         python scripts/generar_enfermedades_json.py --completo   (ignora el manifest)
+
+La reconstrucción es incremental: un manifest guarda el hash de cada fila de
+medicamento y de enfermedad, y solo se recalculan las enfermedades cuya fila
+cambió o a las que afecta algún medicamento cambiado. Los JSON solo se
+reescriben si su contenido cambia (así el motor no recarga sin motivo).
 """
 
-import pandas as pd
+import os
 import json
+import argparse
+import tempfile
+import pandas as pd
 from pathlib import Path
-from typing import Dict, List, Set
+from typing import Dict, List, Set, Optional, Tuple
+
+# Medicamentos por enfermedad que se guardan en el JSON
+MAX_MEDICAMENTOS = 5
+# Fuera de data/knowledge_graph para no disparar la recarga del motor
+MANIFEST_POR_DEFECTO = 'data/processed/manifest_generador.json'
+VERSION_MANIFEST = 1
+
+
+def hashes_filas(df: pd.DataFrame) -> List[str]:
+    """Hash del contenido de cada fila (vectorizado, independiente del índice)"""
+    return [format(h, '016x') for h in pd.util.hash_pandas_object(df, index=False).tolist()]
+
+
+def escribir_si_cambia(ruta: Path, datos: Dict) -> bool:
+    """Escribe el JSON (temporal + rename) solo si su contenido cambia; devuelve si se escribió"""
+    contenido = json.dumps(datos, ensure_ascii=False, indent=2)
+    try:
+        if ruta.read_text(encoding='utf-8') == contenido:
+            return False
+    except FileNotFoundError:
+        pass
+    fd, tmp = tempfile.mkstemp(dir=ruta.parent, prefix=ruta.name, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(contenido)
+        os.replace(tmp, ruta)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+    return True
+
+
+class IndiceIngredientes:
+    """Índice invertido palabra de principio activo -> principios -> medicamentos.
+
+    Mantiene la regla de siempre (el principio buscado está contenido en algún
+    principio del medicamento y la especie coincide) pero sin recorrer el
+    catálogo por cada enfermedad: la búsqueda solo mira las palabras distintas
+    del catálogo y los principios que las contienen, y el resultado de cada
+    principio buscado se memoriza porque se repite entre enfermedades.
+    """
+
+    def __init__(self, medicamentos: Dict[int, Dict]):
+        # principio (minúsculas) -> ids de medicamento, en orden de catálogo
+        self.medicamentos_por_principio: Dict[str, List[int]] = {}
+        # palabra -> principios que la contienen
+        self.principios_por_palabra: Dict[str, Set[str]] = {}
+        # especie (minúsculas) -> ids de medicamento
+        self.por_especie: Dict[str, Set[int]] = {}
+
+        for idx, med in medicamentos.items():
+            self.por_especie.setdefault(med['especie'].lower(), set()).add(idx)
+            for principio in med['principios']:
+                principio = principio.lower()
+                self.medicamentos_por_principio.setdefault(principio, []).append(idx)
+                for palabra in principio.split():
+                    self.principios_por_palabra.setdefault(palabra, set()).add(principio)
+
+        self._cache: Dict[str, Set[int]] = {}
+
+    def medicamentos_con(self, principio: str) -> Set[int]:
+        """Ids de los medicamentos con algún principio que contiene `principio`"""
+        principio = principio.lower()
+        if principio not in self._cache:
+            encontrados = set()
+            palabras = principio.split()
+            if palabras:
+                # Cualquier principio que contenga el texto contiene su palabra más larga
+                pista = max(palabras, key=len)
+                for palabra, principios in self.principios_por_palabra.items():
+                    if pista in palabra:
+                        for candidato in principios:
+                            if principio in candidato:
+                                encontrados.update(self.medicamentos_por_principio[candidato])
+            self._cache[principio] = encontrados
+        return self._cache[principio]
+
+    def buscar(self, principios_activos: List[str], especie: str, limite: int = MAX_MEDICAMENTOS) -> List[int]:
+        """Primeros `limite` medicamentos (orden de catálogo) de la especie con alguno de los principios"""
+        de_especie = self.por_especie.get(especie.lower(), set())
+        encontrados = set()
+        for principio in principios_activos:
+            encontrados |= self.medicamentos_con(principio)
+        return sorted(encontrados & de_especie)[:limite]
 
 
 class GeneradorEnfermedadesJSON:
     """Genera JSONs de enfermedades desde CSVs existentes"""
     
-    def __init__(self):
+    def __init__(self, dir_salida: str = 'data/knowledge_graph', manifest_path: str = MANIFEST_POR_DEFECTO):
         self.enfermedades = {}
         self.medicamentos = {}
         self.sintomas_map = {}
+        self.indice = None
+        self.dir_salida = Path(dir_salida)
+        self.manifest_path = Path(manifest_path)
+        self.manifest = {}
+        self.recalculadas: List[str] = []
+        self.reutilizadas = 0
     
-    def cargar_datos(self):
+    def _cargar_previo(self) -> Tuple[Optional[Dict], Dict]:
+        """Manifest y enfermedades de la generación anterior (None, {}) si falta alguno"""
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            with open(self.dir_salida / 'enfermedades_42_completo.json', 'r', encoding='utf-8') as f:
+                enfermedades = json.load(f).get('enfermedades', {})
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None, {}
+        if manifest.get('version') != VERSION_MANIFEST:
+            return None, {}
+        return manifest, enfermedades
+    
+    def cargar_datos(self, incremental: bool = True):
         """Carga datos de los CSVs"""
         
         print("📥 Cargando datos...")
         
         # 1. Cargar enfermedades procesadas
         try:
-            df_enf = pd.read_csv('data/processed/enfermedades_medicamentos_procesado.csv')
+            df_enf = pd.read_csv('data/processed/enfermedades_medicamentos_procesado.csv', dtype=str)
             print(f"✅ Enfermedades procesadas: {len(df_enf)} filas")
         except Exception as e:
             print(f"❌ Error cargando enfermedades_procesado: {e}")
             return False
         
-        # 2. Cargar medicamentos CIMAVET
+        # 2. Cargar medicamentos CIMAVET (solo las columnas que se usan, como texto)
         try:
-            df_med = pd.read_csv('data/processed/cimavet_completo.csv')
+            columnas = ['medicamento', 'numero_registro', 'principios_activos', 'especie', 'prescripcion']
+            df_med = pd.read_csv('data/processed/cimavet_completo.csv', usecols=columnas, dtype=str)
             print(f"✅ Medicamentos CIMAVET: {len(df_med)} filas")
             
-            # Crear índice de medicamentos por principios activos
-            for idx, row in df_med.iterrows():
-                principios = str(row['principios_activos']).split(',')
-                self.medicamentos[idx] = {
-                    'nombre': row['medicamento'],
-                    'registro': row['numero_registro'],
-                    'principios': [p.strip() for p in principios],
-                    'especie': row['especie'],
-                    'prescripcion': row['prescripcion']
+            # Separar y limpiar principios activos de todas las filas a la vez
+            principios = (df_med['principios_activos'].fillna('nan').str.split(',')
+                          .map(lambda lista: [p.strip() for p in lista]))
+            especies = df_med['especie'].fillna('')
+            self.medicamentos = {
+                idx: {
+                    'nombre': nombre,
+                    'registro': registro,
+                    'principios': lista,
+                    'especie': especie,
+                    'prescripcion': prescripcion
                 }
+                for idx, nombre, registro, lista, especie, prescripcion in zip(
+                    df_med.index, df_med['medicamento'], df_med['numero_registro'],
+                    principios, especies, df_med['prescripcion']
+                )
+            }
+            # Índice principio activo -> medicamentos, una sola vez para todas las enfermedades
+            self.indice = IndiceIngredientes(self.medicamentos)
+            print(f"✅ Índice de principios: {len(self.indice.medicamentos_por_principio)} principios | "
+                  f"{len(self.indice.principios_por_palabra)} palabras")
         except Exception as e:
             print(f"❌ Error cargando CIMAVET: {e}")
             return False
         
-        # 3. Procesar enfermedades
-        for idx, row in df_enf.iterrows():
-            enfermedad = row['enfermedad']
-            categoria = row['categoria']
-            especie = row['especie']
-            
+        # 3. Qué ha cambiado desde la generación anterior
+        hashes_med = dict(zip(map(str, df_med.index), hashes_filas(df_med[columnas])))
+        hashes_enf = hashes_filas(df_enf)
+        manifest, previas = self._cargar_previo() if incremental else (None, {})
+        cambiados = None
+        if manifest is not None:
+            anteriores = manifest.get('medicamentos', {})
+            cambiados = {int(idx) for idx in set(anteriores) | set(hashes_med)
+                         if anteriores.get(idx) != hashes_med.get(idx)}
+            print(f"🧾 Manifest previo: {len(cambiados)} medicamentos cambiados")
+            if len(cambiados) > len(self.medicamentos) // 2:
+                cambiados = None  # Casi todo cambió: sale más a cuenta recalcular todo
+        hashes_previos = manifest.get('enfermedades', {}) if cambiados is not None else {}
+        
+        # 4. Procesar enfermedades
+        df_enf = df_enf.fillna({'indicaciones': '', 'contraindicaciones': '', 'notas': ''})
+        filas = zip(df_enf['enfermedad'], df_enf['categoria'], df_enf['especie'],
+                    df_enf['principios_activos'].fillna('nan'), df_enf['indicaciones'],
+                    df_enf['contraindicaciones'], df_enf['notas'], hashes_enf)
+        hashes_por_key = {}
+        for enfermedad, categoria, especie, principios_texto, indicaciones, contraindicaciones, notas, h in filas:
             # Parsear principios activos como síntomas
-            principios = str(row['principios_activos']).split(';')
-            principios = [p.strip() for p in principios if p.strip()]
+            principios = [p.strip() for p in principios_texto.split(';') if p.strip()]
             
             # Crear key única
             key = f"{enfermedad.replace(' ', '_')}_{especie.replace(' ', '_')}"
+            hashes_por_key[key] = h
+            
+            previa = previas.get(key)
+            if (previa is not None and hashes_previos.get(key) == h
+                    and not self._afectada(previa.get('medicamentos_asociados', []), principios, especie, cambiados)):
+                medicamentos_asociados = previa.get('medicamentos_asociados', [])
+                self.reutilizadas += 1
+            else:
+                medicamentos_asociados = self._buscar_medicamentos(principios, especie)
+                self.recalculadas.append(key)
             
             self.enfermedades[key] = {
                 'nombre': enfermedad,
                 'categoria': categoria,
                 'especie': especie,
                 'síntomas': principios,  # Principios activos = síntomas/indicaciones
-                'indicaciones': row['indicaciones'],
-                'contraindicaciones': row['contraindicaciones'],
-                'notas': row['notas'],
-                'medicamentos_asociados': self._buscar_medicamentos(principios, especie)
+                'indicaciones': indicaciones,
+                'contraindicaciones': contraindicaciones,
+                'notas': notas,
+                'medicamentos_asociados': medicamentos_asociados
             }
             
             # Mapear síntomas → enfermedades
@@ -84,26 +233,36 @@ class GeneradorEnfermedadesJSON:
                     self.sintomas_map[síntoma] = []
                 self.sintomas_map[síntoma].append(enfermedad)
         
-        print(f"✅ Enfermedades procesadas: {len(self.enfermedades)}")
+        self.manifest = {'version': VERSION_MANIFEST, 'medicamentos': hashes_med, 'enfermedades': hashes_por_key}
+        print(f"✅ Enfermedades procesadas: {len(self.enfermedades)} "
+              f"(recalculadas: {len(self.recalculadas)} | reutilizadas: {self.reutilizadas})")
         return True
     
+    def _afectada(self, asociados_previos: List[str], principios: List[str], especie: str,
+                  cambiados: Optional[Set[int]]) -> bool:
+        """¿Algún medicamento cambiado puede alterar la lista de esta enfermedad?
+
+        Sí si estaba en su lista anterior (pudo desaparecer o dejar de encajar) o
+        si su versión actual encaja ahora con la especie y algún principio.
+        """
+        if cambiados is None:
+            return True
+        if any(f"med_{idx}" in asociados_previos for idx in cambiados):
+            return True
+        for idx in cambiados:
+            med = self.medicamentos.get(idx)
+            if med is None or med['especie'].lower() != especie.lower():
+                continue
+            if any(p.lower() in q.lower() for p in principios for q in med['principios']):
+                return True
+        return False
+    
     def _buscar_medicamentos(self, principios_activos: List[str], especie: str) -> List[str]:
         """Busca medicamentos que contengan los principios activos"""
         
-        medicamentos_encontrados = []
-        
-        for idx, med in self.medicamentos.items():
-            # Verificar que sea para la especie
-            if med['especie'].lower() != especie.lower():
-                continue
-            
-            # Verificar que contenga alguno de los principios
-            for principio in principios_activos:
-                if any(principio.lower() in p.lower() for p in med['principios']):
-                    medicamentos_encontrados.append(f"med_{idx}")
-                    break
-        
-        return medicamentos_encontrados[:5]  # Top 5
+        if self.indice is None:
+            self.indice = IndiceIngredientes(self.medicamentos)
+        return [f"med_{idx}" for idx in self.indice.buscar(principios_activos, especie)]
     
     def crear_json_enfermedades(self) -> Dict:
         """Crea JSON de enfermedades"""
@@ -142,34 +301,36 @@ class GeneradorEnfermedadesJSON:
         
         return json_final
     
-    def guardar_jsons(self, dir_salida: str = 'data/knowledge_graph'):
-        """Guarda los JSONs generados"""
+    def guardar_jsons(self, dir_salida: str = None):
+        """Guarda los JSONs generados (solo los que cambian) y el manifest"""
         
-        Path(dir_salida).mkdir(parents=True, exist_ok=True)
+        dir_salida = Path(dir_salida) if dir_salida else self.dir_salida
+        dir_salida.mkdir(parents=True, exist_ok=True)
         
         # 1. JSON de enfermedades
         print("\n💾 Guardando JSONs...")
         
         json_enf = self.crear_json_enfermedades()
-        archivo_enf = f'{dir_salida}/enfermedades_42_completo.json'
-        
-        with open(archivo_enf, 'w', encoding='utf-8') as f:
-            json.dump(json_enf, f, ensure_ascii=False, indent=2)
+        archivo_enf = dir_salida / 'enfermedades_42_completo.json'
+        escrito = escribir_si_cambia(archivo_enf, json_enf)
         
-        print(f"✅ {archivo_enf}")
+        print(f"{'✅' if escrito else '⏭️ '} {archivo_enf}{'' if escrito else ' (sin cambios)'}")
         print(f"   Contiene: {len(json_enf['enfermedades'])} enfermedades")
         
         # 2. JSON de síntomas
         json_sint = self.crear_json_sintomas()
-        archivo_sint = f'{dir_salida}/sintomas_enfermedades_mapping.json'
+        archivo_sint = dir_salida / 'sintomas_enfermedades_mapping.json'
+        escrito = escribir_si_cambia(archivo_sint, json_sint)
         
-        with open(archivo_sint, 'w', encoding='utf-8') as f:
-            json.dump(json_sint, f, ensure_ascii=False, indent=2)
-        
-        print(f"✅ {archivo_sint}")
+        print(f"{'✅' if escrito else '⏭️ '} {archivo_sint}{'' if escrito else ' (sin cambios)'}")
         print(f"   Contiene: {len(json_sint['sintomas_enfermedades'])} síntomas")
         
-        return archivo_enf, archivo_sint
+        # 3. Manifest (después de los JSON: si algo falla antes, la próxima vez se recalcula)
+        if self.manifest:
+            self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+            escribir_si_cambia(self.manifest_path, self.manifest)
+        
+        return str(archivo_enf), str(archivo_sint)
     
     def mostrar_resumen(self):
         """Muestra resumen de enfermedades"""
@@ -211,15 +372,19 @@ class GeneradorEnfermedadesJSON:
 
 def main():
     """Función principal"""
+    parser = argparse.ArgumentParser(description="Genera los JSON de enfermedades y síntomas desde los CSV")
+    parser.add_argument("--completo", action="store_true", help="Recalcula todo ignorando el manifest")
+    parser.add_argument("--manifest", default=MANIFEST_POR_DEFECTO, help="Ruta del manifest de hashes")
+    args = parser.parse_args()
     
     print("\n" + "="*70)
     print("🔧 GENERADOR DE ENFERMEDADES JSON")
     print("="*70)
     
-    generador = GeneradorEnfermedadesJSON()
+    generador = GeneradorEnfermedadesJSON(manifest_path=args.manifest)
     
     # Cargar datos
-    if not generador.cargar_datos():
+    if not generador.cargar_datos(incremental=not args.completo):
         print("\n❌ Error: No se pudieron cargar los datos")
         return
     
@@ -240,6 +405,8 @@ def main():
     print(f"   • Total enfermedades: {len(generador.enfermedades)}")
     print(f"   • Total síntomas únicos: {len(generador.sintomas_map)}")
     print(f"   • Total medicamentos indexados: {len(generador.medicamentos)}")
+    print(f"   • Enfermedades recalculadas: {len(generador.recalculadas)} "
+          f"(reutilizadas: {generador.reutilizadas})")
     
     print("\n🎯 Próximo paso:")
     print("   Ejecuta: python scripts/integrar_enfermedades.py")
@@ -0,0 +1,50 @@
+"""
+Valida la integridad referencial del grafo de conocimiento.
+
+Uso (desde la raíz del proyecto):
+    python scripts/validar_grafo.py
+    python scripts/validar_grafo.py --directorio data/knowledge_graph --json
+
+Comprueba con operaciones de conjuntos todas las referencias cruzadas
+(enfermedad -> medicamentos, síntoma -> enfermedades, raza -> enfermedades,
+principio -> categoría -> dosis). Sale con código 1 si hay errores, así que
+sirve como paso previo a desplegar o a recargar los datos.
+"""
+import sys
+import json
+import argparse
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from processing.validador_grafo import validar_directorio
+
+
+def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(description="Valida la integridad del grafo de conocimiento")
+    parser.add_argument("--directorio", default="data/knowledge_graph", help="Directorio del grafo")
+    parser.add_argument("--json", action="store_true", help="Imprime el informe completo en JSON")
+    args = parser.parse_args()
+
+    informe = validar_directorio(args.directorio)
+    if args.json:
+        print(json.dumps(informe.como_dict(), ensure_ascii=False, indent=2))
+        sys.exit(0 if informe.valido else 1)
+
+    print("\n" + "="*70)
+    print("🩺 VALIDACIÓN DEL GRAFO DE CONOCIMIENTO")
+    print("="*70)
+    for titulo, problemas in (("❌ Errores", informe.errores), ("⚠️  Avisos", informe.avisos)):
+        print(f"\n{titulo}: {len(problemas)}")
+        for nombre, ejemplos in problemas.items():
+            print(f"   • {nombre}: {informe.totales[nombre]}")
+            for ejemplo in ejemplos[:3]:
+                print(f"       - {ejemplo}")
+    print(f"\n{informe.resumen()} en {informe.segundos * 1000:.0f} ms")
+    print("="*70 + "\n")
+    sys.exit(0 if informe.valido else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Construye y calienta el motor de recomendación antes de abrir la app.
+
+Uso (desde la raíz del proyecto):
+    python scripts/warmup_motor.py           # carga + consultas de calentamiento
+    python scripts/warmup_motor.py --timeout 60
+
+Sale con código 0 si el motor queda listo y 1 si no, para poder usarlo como
+comprobación de disponibilidad en el despliegue.
+"""
+import sys
+import json
+import argparse
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from processing import warmup
+
+
+def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(description="Precarga y calentamiento del motor Vet-IA")
+    parser.add_argument("--timeout", type=float, default=None,
+                        help="Segundos máximos de espera (por defecto, sin límite)")
+    args = parser.parse_args()
+
+    print("\n" + "="*70)
+    print("🔥 CALENTAMIENTO DEL MOTOR")
+    print("="*70)
+
+    warmup.iniciar_precarga()
+    listo = warmup.estado.esperar(args.timeout)
+    informe = warmup.estado.informe()
+
+    print(json.dumps(informe, indent=2, ensure_ascii=False))
+    print("="*70)
+    print("✅ Motor listo" if listo else f"❌ Motor no disponible ({informe['fase']})")
+    print("="*70 + "\n")
+    return 0 if listo else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,59 @@
 import streamlit as st
-import json
 import sys
 import os
+import json
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
+from database.journal import JournalCambios
+from database.estadisticas import calcular_estadisticas, firma_ficheros
+from database.importacion import leer_filas, ValidadorImportacion, confirmar_importacion
+from processing.principios_index import PrincipiosIndex
+from processing.relaciones_incrementales import (
+    CalculadorRelaciones, recalcular_enfermedad, ruta_overlay, SECCION_OVERLAY
+)
+
+ENFERMEDADES_PATH = 'data/knowledge_graph/enfermedades_42_completo.json'
+SINTOMAS_PATH = 'data/knowledge_graph/sintomas_enfermedades_mapping.json'
+GRAFO_PATH = 'data/knowledge_graph/mapeo_enfermedades_medicamentos.json'
+
+@st.cache_resource
+def cargar_journals():
+    """Escrituras O(cambio) en un journal con lock de fichero; se compactan solas en el JSON"""
+    return (JournalCambios(ENFERMEDADES_PATH, 'enfermedades'),
+            JournalCambios(SINTOMAS_PATH, 'sintomas_enfermedades'))
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def cargar_estadisticas(firma):
+    """Agregados de la BD; `firma` (mtime + tamaño de JSONs y journals) es la clave de la caché"""
+    journal_enf, journal_sint = cargar_journals()
+    enfermedades = journal_enf.estado()
+    return calcular_estadisticas(enfermedades, journal_sint.estado()), {
+        key: enfermedades[key] for key in list(enfermedades)[-5:]
+    }
+
+@st.cache_resource(max_entries=2)
+def cargar_ids_medicamentos(firma):
+    """Conjunto de ids de medicamentos del grafo (se recalcula solo si cambia el fichero)"""
+    with open(GRAFO_PATH, 'r', encoding='utf-8') as f:
+        return frozenset(json.load(f).get('medicamentos', {}))
+
+@st.cache_resource
+def cargar_journal_relaciones():
+    """Overlay de aristas recalculadas por enfermedad; el motor lo aplica al recargar"""
+    return JournalCambios(ruta_overlay(GRAFO_PATH), SECCION_OVERLAY)
+
+@st.cache_resource(max_entries=2)
+def cargar_calculador_relaciones(firma):
+    """Índice de principios activos del catálogo para calcular aristas al guardar (uno por versión)"""
+    with open(GRAFO_PATH, 'r', encoding='utf-8') as f:
+        medicamentos = json.load(f).get('medicamentos', {})
+    return CalculadorRelaciones(medicamentos, PrincipiosIndex(medicamentos, {}))
+
 st.set_page_config(page_title="Panel Admin - Vet-IA", page_icon="⚙️", layout="wide")
 
+journal_enfermedades, journal_sintomas = cargar_journals()
+
 # Login simple
 if 'admin_logged' not in st.session_state:
     st.session_state.admin_logged = False
@@ -25,7 +72,7 @@ if not st.session_state.admin_logged:
 # ======== PANEL PRINCIPAL ========
 st.title("⚙️ Panel de Administración Veterinaria")
 
-tabs = st.tabs(["➕ Añadir Enfermedad", "➕ Añadir Síntoma", "📊 Ver Base de Datos"])
+tabs = st.tabs(["➕ Añadir Enfermedad", "➕ Añadir Síntoma", "📊 Ver Base de Datos", "📥 Importación masiva"])
 
 # TAB 1: Añadir Enfermedad
 with tabs[0]:
@@ -37,29 +84,30 @@ with tabs[0]:
         categoria = st.selectbox("Categoría", ["Dermatología", "Oftalmología", "Otología", "Parasitología", "Gastrointestinal", "Otros"])
         
         sintomas = st.text_area("Síntomas (uno por línea)")
+        principios = st.text_area("Principios activos recomendados (uno por línea, opcional)")
         medicamentos = st.text_area("Medicamentos asociados (IDs, uno por línea)")
         
         if st.form_submit_button("💾 Guardar Enfermedad"):
             try:
-                # Cargar JSON existente
-                with open('data/knowledge_graph/enfermedades_42_completo.json', 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                
-                # Crear nueva enfermedad
-                nueva_key = f"ENF_{len(data['enfermedades']) + 1:03d}"
-                data['enfermedades'][nueva_key] = {
+                enfermedad = {
                     "nombre": nombre,
                     "especie": especie,
                     "categoria": categoria,
-                    "sintomas": [s.strip() for s in sintomas.split('\n') if s.strip()],
+                    "síntomas": [s.strip() for s in sintomas.split('\n') if s.strip()],
+                    "principios_recomendados": [p.strip() for p in principios.split('\n') if p.strip()],
                     "medicamentos_asociados": [m.strip() for m in medicamentos.split('\n') if m.strip()]
                 }
+                # Clave nueva única calculada dentro del lock del journal
+                nueva_key = journal_enfermedades.anadir(enfermedad)
                 
-                # Guardar
-                with open('data/knowledge_graph/enfermedades_42_completo.json', 'w', encoding='utf-8') as f:
-                    json.dump(data, f, indent=2, ensure_ascii=False)
+                # Aristas solo de esta enfermedad contra el índice de principios activos
+                aristas = recalcular_enfermedad(
+                    cargar_calculador_relaciones(firma_ficheros(GRAFO_PATH)),
+                    cargar_journal_relaciones(), nueva_key, enfermedad
+                )
                 
-                st.success(f"✅ Enfermedad '{nombre}' añadida con ID: {nueva_key}")
+                st.success(f"✅ Enfermedad '{nombre}' añadida con ID: {nueva_key} "
+                           f"({len(aristas)} medicamentos relacionados)")
                 st.balloons()
             except Exception as e:
                 st.error(f"❌ Error: {e}")
@@ -74,15 +122,9 @@ with tabs[1]:
         
         if st.form_submit_button("💾 Guardar Síntoma"):
             try:
-                with open('data/knowledge_graph/sintomas_enfermedades_mapping.json', 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                
-                data['sintomas_enfermedades'][sintoma] = [
+                journal_sintomas.guardar(sintoma, [
                     e.strip() for e in enfermedades_asociadas.split('\n') if e.strip()
-                ]
-                
-                with open('data/knowledge_graph/sintomas_enfermedades_mapping.json', 'w', encoding='utf-8') as f:
-                    json.dump(data, f, indent=2, ensure_ascii=False)
+                ])
                 
                 st.success(f"✅ Síntoma '{sintoma}' añadido")
             except Exception as e:
@@ -93,20 +135,92 @@ with tabs[2]:
     st.header("📊 Estadísticas de la Base de Datos")
     
     try:
-        with open('data/knowledge_graph/enfermedades_42_completo.json', 'r', encoding='utf-8') as f:
-            enf_data = json.load(f)
+        # Solo se recalcula cuando cambia algún fichero (no en cada rerun de Streamlit)
+        stats, ultimas = cargar_estadisticas(firma_ficheros(ENFERMEDADES_PATH, SINTOMAS_PATH))
+        
+        c1, c2, c3, c4 = st.columns(4)
+        c1.metric("Total Enfermedades", stats['total_enfermedades'])
+        c2.metric("Total Síntomas", stats['total_sintomas'])
+        c3.metric("Medicamentos/enfermedad (media)", stats['resumen_medicamentos']['media'])
+        c4.metric("Síntomas huérfanos", len(stats['sintomas_huerfanos']))
+        
+        pendientes = journal_enfermedades.pendientes() + journal_sintomas.pendientes()
+        st.caption(f"Cambios pendientes de compactar: {pendientes}")
+        if pendientes and st.button("🗜️ Compactar ahora"):
+            journal_enfermedades.compactar()
+            journal_sintomas.compactar()
+            st.rerun()
         
-        st.metric("Total Enfermedades", len(enf_data['enfermedades']))
+        st.divider()
+        col_cat, col_esp = st.columns([2, 1])
+        with col_cat:
+            st.subheader("Enfermedades por categoría y especie")
+            st.dataframe(stats['categoria_especie'], use_container_width=True)
+        with col_esp:
+            st.subheader("Por especie")
+            st.bar_chart(stats['por_especie'])
         
-        with open('data/knowledge_graph/sintomas_enfermedades_mapping.json', 'r', encoding='utf-8') as f:
-            sint_data = json.load(f)
+        st.subheader("Medicamentos asociados por enfermedad")
+        st.dataframe(
+            [{"Enfermedad": k, "Medicamentos": n} for k, n in stats['medicamentos_por_enfermedad'].items()],
+            hide_index=True, use_container_width=True, height=250
+        )
+        if stats['resumen_medicamentos']['sin_medicamentos']:
+            st.warning(f"{stats['resumen_medicamentos']['sin_medicamentos']} enfermedades sin medicamentos asociados")
         
-        st.metric("Total Síntomas", len(sint_data['sintomas_enfermedades']))
+        if stats['sintomas_huerfanos'] or stats['referencias_rotas']:
+            with st.expander(f"⚠️ Síntomas huérfanos ({len(stats['sintomas_huerfanos'])}) "
+                             f"y referencias rotas ({len(stats['referencias_rotas'])})"):
+                st.write(stats['sintomas_huerfanos'])
+                st.json(stats['referencias_rotas'])
         
         st.divider()
         st.subheader("Últimas 5 Enfermedades")
-        for key in list(enf_data['enfermedades'].keys())[-5:]:
-            with st.expander(f"{key}: {enf_data['enfermedades'][key]['nombre']}"):
-                st.json(enf_data['enfermedades'][key])
+        for key, enf in ultimas.items():
+            with st.expander(f"{key}: {enf['nombre']}"):
+                st.json(enf)
     except Exception as e:
         st.error(f"❌ Error cargando datos: {e}")
+
+# TAB 4: Importación masiva
+with tabs[3]:
+    st.header("📥 Importación masiva (CSV / JSONL)")
+    st.caption(
+        "Una fila por enfermedad (`tipo=enfermedad`: nombre, especie, categoria, sintomas, principios_recomendados, "
+        "medicamentos_asociados, indicaciones, notas) o por síntoma (`tipo=sintoma`: sintoma, "
+        "enfermedades). En CSV las listas van separadas por `|`. El lote se importa entero o no se importa."
+    )
+    
+    subido = st.file_uploader("Fichero", type=["csv", "jsonl"])
+    if subido is not None:
+        formato = "csv" if subido.name.lower().endswith(".csv") else "jsonl"
+        validador = ValidadorImportacion(
+            cargar_ids_medicamentos(firma_ficheros(GRAFO_PATH)),
+            journal_enfermedades.estado()
+        )
+        # Validación fila a fila mientras se lee el fichero
+        subido.seek(0)
+        resultado = validador.validar(leer_filas(subido, formato))
+        
+        c1, c2, c3, c4 = st.columns(4)
+        c1.metric("Filas leídas", resultado.filas)
+        c2.metric("Enfermedades válidas", len(resultado.enfermedades))
+        c3.metric("Síntomas válidos", len(resultado.sintomas))
+        c4.metric("Filas con errores", len(resultado.errores))
+        
+        if resultado.errores:
+            st.error("Corrige las filas con errores y vuelve a subir el fichero.")
+            st.dataframe(
+                [{"Fila": n, "Errores": "; ".join(errores)} for n, errores in resultado.errores],
+                hide_index=True, use_container_width=True
+            )
+        elif resultado.valido and st.button("💾 Importar lote", type="primary"):
+            try:
+                escrito = confirmar_importacion(
+                    resultado, journal_enfermedades, journal_sintomas,
+                    cargar_calculador_relaciones(firma_ficheros(GRAFO_PATH)), cargar_journal_relaciones()
+                )
+                st.success(f"✅ Importadas {len(escrito['enfermedades'])} enfermedades "
+                           f"({escrito['relaciones']} medicamentos relacionados) y {escrito['sintomas']} síntomas")
+            except Exception as e:
+                st.error(f"❌ Error: {e}")
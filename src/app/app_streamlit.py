@@ -7,6 +7,8 @@ sys.path.append(str(Path(__file__).parent.parent))
 
 try:
     from processing.smart_recommendation_engine import SmartRecommendationEngine
+    from processing.autocompletado import ultima_palabra, completar_texto
+    from processing import warmup
 except ImportError:
     st.error("Error crítico: No se encuentra el motor de recomendación.")
     st.stop()
@@ -21,6 +23,10 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# El motor se construye y calienta en segundo plano (una vez por proceso)
+# mientras el usuario todavía está en la pantalla de acceso
+warmup.iniciar_precarga()
+
 # ==========================================
 # 2. AUTENTICACIÓN
 # ==========================================
@@ -35,6 +41,14 @@ def verificar_autenticacion():
             u = st.text_input("Usuario", key="u")
             p = st.text_input("Contraseña", type="password", key="p")
             
+            informe = warmup.estado.informe()
+            if informe['listo']:
+                st.caption(f"🟢 Motor listo ({informe['segundos']} s)")
+            elif informe['fase'] == 'error':
+                st.caption(f"🔴 Error cargando el motor: {informe['error']}")
+            else:
+                st.caption(f"⏳ Preparando motor: {informe['fase']}...")
+            
             if st.button("Entrar", type="primary"):
                 if u == "admin" and p == "veterinaria":
                     st.session_state.autenticado = True
@@ -132,9 +146,89 @@ st.markdown("""
 # ==========================================
 @st.cache_resource
 def cargar_motor():
-    return SmartRecommendationEngine()
+    # Normalmente ya está listo gracias a la precarga; si no, se espera a que termine
+    try:
+        motor = warmup.obtener_motor()
+        # Recarga en caliente: al cambiar data/knowledge_graph/ se publica una foto nueva
+        motor.vigilar()
+        return motor
+    except RuntimeError as e:
+        st.error(f"Error crítico: {e}")
+        st.stop()
+
+with st.spinner("Preparando motor de recomendación..."):
+    motor = cargar_motor()
+
+def selector_sugerencias(contenedor, clave_texto: str, prefijo: str, tipos, reemplazar_palabra: bool):
+    """Selectbox con las sugerencias del motor; al elegir una se escribe en el campo `clave_texto`"""
+    sugerencias = motor.autocompletar(prefijo, 8, tipos) if prefijo else []
+    if not sugerencias:
+        return
+    clave_selector = f"sug_{clave_texto}"
+
+    def aplicar():
+        elegida = st.session_state.get(clave_selector)
+        if elegida:
+            actual = st.session_state.get(clave_texto, "")
+            st.session_state[clave_texto] = completar_texto(actual, elegida) if reemplazar_palabra else elegida
+            st.session_state[clave_selector] = ""
+
+    contenedor.selectbox(
+        "Sugerencias",
+        [""] + [s['texto'] for s in sugerencias],
+        key=clave_selector,
+        on_change=aplicar,
+        format_func=lambda t: t or f"✍️ {len(sugerencias)} sugerencias para «{prefijo}»"
+    )
+
+def tabla_medicamentos(meds, clave: str):
+    """Tabla compacta (un solo widget) con selección de fila; devuelve el medicamento elegido"""
+    filas = [{
+        "Nombre": m.get('nombre', 'Sin Nombre'),
+        "Principios": ", ".join(m.get('principios_activos', [])),
+        "Titular": m.get('titular', '') or m.get('forma_farmaceutica', ''),
+        "Receta": "🔒" if "Sujeto" in m.get('prescripcion', '') else "🟢",
+    } for m in meds]
+    try:
+        evento = st.dataframe(filas, hide_index=True, use_container_width=True, key=clave,
+                              on_select="rerun", selection_mode="single-row")
+        seleccion = evento.selection.rows
+        return meds[seleccion[0]] if seleccion and seleccion[0] < len(meds) else None
+    except TypeError:
+        # Versiones de Streamlit sin selección de filas en st.dataframe
+        st.dataframe(filas, hide_index=True, use_container_width=True)
+        pos = st.selectbox("Ver detalle", range(len(meds)), key=f"{clave}_detalle",
+                           format_func=lambda i: meds[i].get('nombre', 'Sin Nombre'))
+        return meds[pos]
+
+
+def detalle_medicamento(med):
+    """Panel de detalle del medicamento elegido en la tabla"""
+    if not med:
+        st.caption("Selecciona una fila para ver el detalle.")
+        return
+    st.markdown(f"#### 💊 {med.get('nombre', 'Sin Nombre')}")
+    c1, c2 = st.columns([2, 1])
+    with c1:
+        st.markdown("**Principios:**")
+        for p in med.get('principios_activos', []):
+            st.markdown(f"- {p}")
+        if med.get('titular'):
+            st.markdown(f"**Titular:** {med['titular']}")
+        st.markdown(f"**Presentación:** {med.get('forma_farmaceutica') or med.get('presentacion') or '-'}")
+        if med.get('posologia'):
+            st.markdown(f"**Posología:** {med['posologia']}")
+        if med.get('enfermedades'):
+            st.caption(f"Indicado para: {', '.join(med['enfermedades'])}")
+    with c2:
+        presc = med.get('prescripcion', '-')
+        if "Sujeto" in presc:
+            st.error(f"🔒 {presc}")
+        else:
+            st.success(f"🟢 {presc}")
+        if med.get('numero_registro'):
+            st.caption(f"Nº registro: {med['numero_registro']}")
 
-motor = cargar_motor()
 
 # ==========================================
 # 5. SIDEBAR
@@ -169,86 +263,86 @@ if modo == "Asistente Clínico (IA)":
     consulta = st.text_area(
         "Caso Clínico:",
         placeholder="Ej: Felino 4kg, otitis purulenta...",
-        height=100
+        height=100,
+        key="consulta"
     )
+    # Sugerencias de síntomas para la palabra que se está escribiendo
+    selector_sugerencias(st, "consulta", ultima_palabra(consulta), ("sintoma",), reemplazar_palabra=True)
     
     if st.button("Analizar Caso", type="primary"):
         if consulta:
             with st.spinner("Procesando..."):
-                resultado = motor.procesar_consulta_chat(consulta)
-            
-            # Informe IA
-            st.markdown("### 📝 Informe Clínico")
-            st.markdown(resultado["respuesta_texto"])
-            
-            # Medicamentos
-            meds = resultado["datos_tecnicos"]["medicamentos"]
-            st.divider()
-            st.subheader(f"💊 Opciones Terapéuticas ({len(meds)})")
-            
-            if meds:
-                for idx, med in enumerate(meds, 1):
-                    nombre = med.get('nombre', 'Sin Nombre')
-                    with st.expander(f"{idx}. {nombre}", expanded=(idx<=3)):
-                        c1, c2 = st.columns([2,1])
-                        with c1:
-                            st.markdown("**Principios:**")
-                            for p in med.get('principios_activos', []):
-                                st.markdown(f"- {p}")
-                            st.markdown(f"**Presentación:** {med.get('forma_farmaceutica','-')}")
-                        with c2:
-                            presc = med.get('prescripcion', '-')
-                            if "Sujeto" in presc:
-                                st.error(f"🔒 {presc}")
-                            else:
-                                st.success(f"🟢 {presc}")
-            else:
-                st.info("No se encontraron fármacos específicos en BD para este cuadro.")
+                # Se guarda para que seleccionar una fila (rerun) no pierda el informe
+                st.session_state.resultado_chat = motor.procesar_consulta_chat(consulta)
+    
+    resultado = st.session_state.get("resultado_chat")
+    if resultado:
+        # Informe IA
+        st.markdown("### 📝 Informe Clínico")
+        st.markdown(resultado["respuesta_texto"])
+        
+        # Medicamentos
+        meds = resultado["datos_tecnicos"]["medicamentos"]
+        st.divider()
+        st.subheader(f"💊 Opciones Terapéuticas ({len(meds)})")
+        
+        if meds:
+            detalle_medicamento(tabla_medicamentos(meds, "tabla_chat"))
+        else:
+            st.info("No se encontraron fármacos específicos en BD para este cuadro.")
 
 # --- MODO 2: VADEMÉCUM ---
 else:
     st.header("📚 Vademécum Veterinario")
     
-    # Filtros
-    c1, c2, c3 = st.columns(3)
-    
-    # Selectbox normales de Streamlit, ahora con CSS corregido
-    f_esp = c1.selectbox("Especie", ["Todas", "Perro", "Gato"])
-    f_rec = c2.selectbox("Receta", ["Todas", "Sí", "No"])
-    q = c3.text_input("Buscar fármaco o principio activo...")
-    
-    if st.button("Buscar en Catálogo"):
-        resultados = []
-        for mid, m in motor.medicamentos.items():
-            # Filtro Especie
-            if f_esp != "Todas":
-                esp_med = m.get('especie','').upper()
-                if f_esp.upper() not in esp_med and "AMBOS" not in esp_med:
-                    continue
-            
-            # Filtro Receta
-            presc = m.get('prescripcion','')
-            if f_rec == "Sí" and "Sujeto" not in presc: continue
-            if f_rec == "No" and "No sujeto" not in presc: continue
-            
-            # Filtro Texto
-            if q:
-                txt = (m.get('nombre','') + " " + " ".join(m.get('principios_activos',[]))).lower()
-                if q.lower() not in txt: continue
-                
-            resultados.append(m)
-            
-        st.success(f"Resultados encontrados: {len(resultados)}")
-        
-        # Mostrar resultados (límite 50)
-        for m in resultados[:50]:
-            with st.expander(f"💊 {m.get('nombre')}"):
-                c_izq, c_der = st.columns([2, 1])
-                with c_izq:
-                    st.write(f"**Principios:** {', '.join(m.get('principios_activos', []))}")
-                    st.write(f"**Titular:** {m.get('titular')}")
-                with c_der:
-                    if "Sujeto" in m.get('prescripcion',''):
-                        st.error("Receta obligatoria")
-                    else:
-                        st.success("Venta libre")
+    q = st.text_input("Buscar fármaco o principio activo...", key="q_vademecum")
+    selector_sugerencias(st, "q_vademecum", q, ("medicamento", "principio"), reemplazar_palabra=False)
+    
+    # Facetas: recuentos en vivo por intersección de bitsets precalculados.
+    # Se leen los filtros ya elegidos (session_state) antes de pintar los selectores
+    catalogo = motor.catalogo_index
+    filtros = {
+        "especie": st.session_state.get("f_esp"),
+        "receta": st.session_state.get("f_rec"),
+        "titular": st.session_state.get("f_tit"),
+        "comercializado": st.session_state.get("f_com"),
+    }
+    conteos = catalogo.facetas(q, **filtros)
+    
+    def etiqueta(faceta, textos):
+        return lambda valor: f"{textos.get(valor, valor)} ({conteos[faceta].get(valor, 0)})"
+    
+    c1, c2, c3, c4 = st.columns(4)
+    c1.selectbox("Especie", [None] + catalogo.especies, key="f_esp",
+                 format_func=etiqueta("especie", {None: "Todas"}))
+    c2.selectbox("Receta", [None, True, False], key="f_rec",
+                 format_func=etiqueta("receta", {None: "Todas", True: "Sí", False: "No"}))
+    titulares = [t for t in conteos["titular"] if t is not None]
+    if filtros["titular"] and filtros["titular"] not in titulares:
+        titulares.append(filtros["titular"])
+    c3.selectbox("Titular", [None] + titulares, key="f_tit",
+                 format_func=etiqueta("titular", {None: "Todos"}))
+    c4.selectbox("Comercializado", [None, True, False], key="f_com",
+                 format_func=etiqueta("comercializado", {None: "Todos", True: "Sí", False: "No"}))
+    
+    resultados = catalogo.buscar(q, **filtros)
+    
+    # Paginación en servidor: solo se materializa y envía la página visible.
+    # Si cambian la búsqueda o los filtros se vuelve a la primera página
+    firma = (q, *filtros.values())
+    if st.session_state.get("vademecum_firma") != firma:
+        st.session_state.vademecum_firma = firma
+        st.session_state.vademecum_pagina = 1
+    
+    p1, p2, p3 = st.columns([1, 1, 2])
+    tamano = p1.selectbox("Por página", [25, 50, 100], key="vademecum_tamano")
+    total_paginas = resultados.paginas(tamano)
+    st.session_state.vademecum_pagina = min(st.session_state.vademecum_pagina, total_paginas)
+    pagina = p2.number_input("Página", min_value=1, max_value=total_paginas, key="vademecum_pagina")
+    p3.success(f"Resultados encontrados: {resultados.total} · página {pagina} de {total_paginas}")
+    
+    meds = resultados.pagina(pagina, tamano)
+    if meds:
+        detalle_medicamento(tabla_medicamentos(meds, f"tabla_vademecum_{pagina}_{tamano}"))
+    else:
+        st.info("No hay medicamentos con estos filtros.")
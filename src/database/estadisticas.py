@@ -0,0 +1,70 @@
+import os
+from collections import Counter
+from typing import Dict, List, Any, Tuple
+
+from database.journal import ruta_journal
+
+
+def firma_ficheros(*rutas) -> Tuple:
+    """(ruta, mtime_ns, tamaño) de cada JSON y de su journal: identifica una versión de los datos"""
+    firma = []
+    for ruta in rutas:
+        for fichero in (ruta, ruta_journal(ruta)):
+            try:
+                stat = os.stat(fichero)
+                firma.append((str(fichero), stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                firma.append((str(fichero), None, None))
+    return tuple(firma)
+
+
+def calcular_estadisticas(enfermedades: Dict[str, Dict], sintomas_map: Dict[str, List[str]]) -> Dict[str, Any]:
+    """Agregados de la pestaña "Ver Base de Datos" en una sola pasada por cada fichero.
+
+    - enfermedades por categoría, por especie y cruzadas (categoría x especie)
+    - medicamentos asociados por enfermedad (y su resumen)
+    - síntomas huérfanos: entradas del mapeo síntoma -> enfermedades que no
+      apuntan a ninguna enfermedad conocida (o apuntan a alguna que no existe)
+    """
+    por_categoria = Counter()
+    por_especie = Counter()
+    cruzado: Dict[str, Counter] = {}
+    medicamentos_por_enfermedad: Dict[str, int] = {}
+    nombres = set()
+
+    for enf_key, enf in enfermedades.items():
+        categoria = enf.get('categoria') or 'Sin categoría'
+        especie = enf.get('especie') or 'Sin especie'
+        por_categoria[categoria] += 1
+        por_especie[especie] += 1
+        cruzado.setdefault(categoria, Counter())[especie] += 1
+        medicamentos_por_enfermedad[enf_key] = len(enf.get('medicamentos_asociados') or [])
+        nombres.add((enf.get('nombre') or '').strip().lower())
+
+    sintomas_huerfanos = []
+    referencias_rotas: Dict[str, List[str]] = {}
+    for sintoma, enfs in sintomas_map.items():
+        desconocidas = sorted({e for e in enfs or [] if e.strip().lower() not in nombres})
+        if not enfs or len(desconocidas) == len(set(enfs)):
+            sintomas_huerfanos.append(sintoma)
+        elif desconocidas:
+            referencias_rotas[sintoma] = desconocidas
+
+    n_meds = list(medicamentos_por_enfermedad.values())
+    return {
+        'total_enfermedades': len(enfermedades),
+        'total_sintomas': len(sintomas_map),
+        'por_categoria': dict(por_categoria.most_common()),
+        'por_especie': dict(por_especie.most_common()),
+        'categoria_especie': {cat: dict(cnt) for cat, cnt in sorted(cruzado.items())},
+        'medicamentos_por_enfermedad': dict(sorted(medicamentos_por_enfermedad.items(),
+                                                   key=lambda item: (-item[1], item[0]))),
+        'resumen_medicamentos': {
+            'min': min(n_meds, default=0),
+            'media': round(sum(n_meds) / len(n_meds), 2) if n_meds else 0,
+            'max': max(n_meds, default=0),
+            'sin_medicamentos': sum(1 for n in n_meds if n == 0),
+        },
+        'sintomas_huerfanos': sorted(sintomas_huerfanos),
+        'referencias_rotas': referencias_rotas,
+    }
@@ -0,0 +1,198 @@
+import io
+import csv
+import json
+import logging
+from typing import Dict, List, Any, Iterable, Iterator, Optional, Set, Tuple
+
+from database.journal import JournalCambios
+from processing.relaciones_incrementales import CalculadorRelaciones, recalcular_enfermedades
+
+logger = logging.getLogger(__name__)
+
+ESPECIES_VALIDAS = ('Perro', 'Gato', 'Ambos')
+# Separador de listas dentro de una celda CSV ("picor|caída de pelo")
+SEPARADOR_LISTA = '|'
+
+TIPO_ENFERMEDAD = 'enfermedad'
+TIPO_SINTOMA = 'sintoma'
+
+
+def leer_filas(fichero, formato: str) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """(nº de fila, fila) leyendo el fichero subido de uno en uno, sin cargarlo entero.
+
+    `fichero` es un flujo binario (p. ej. el UploadedFile de Streamlit).
+    """
+    texto = io.TextIOWrapper(fichero, encoding='utf-8-sig', newline='')
+    try:
+        if formato == 'csv':
+            for n, fila in enumerate(csv.DictReader(texto), start=2):  # la 1 es la cabecera
+                yield n, fila
+        else:
+            for n, linea in enumerate(texto, start=1):
+                if not linea.strip():
+                    continue
+                try:
+                    yield n, json.loads(linea)
+                except json.JSONDecodeError as e:
+                    yield n, {'_error': f"JSON inválido: {e.msg}"}
+    finally:
+        texto.detach()
+
+
+def _lista(valor) -> List[str]:
+    """Celda CSV 'a|b|c' o lista JSON -> lista limpia"""
+    if valor is None:
+        return []
+    if isinstance(valor, str):
+        valor = valor.split(SEPARADOR_LISTA)
+    return [str(v).strip() for v in valor if str(v).strip()]
+
+
+class ResultadoImportacion:
+    """Filas válidas listas para escribir y errores por fila"""
+
+    def __init__(self):
+        self.enfermedades: List[Dict[str, Any]] = []
+        self.sintomas: Dict[str, List[str]] = {}
+        self.errores: List[Tuple[int, List[str]]] = []
+        self.filas = 0
+
+    @property
+    def valido(self) -> bool:
+        return not self.errores and bool(self.enfermedades or self.sintomas)
+
+
+class ValidadorImportacion:
+    """Valida filas de importación contra conjuntos de ids precalculados.
+
+    Los conjuntos se construyen una vez (ids de medicamentos del grafo, nombres
+    de enfermedades existentes) y cada fila se comprueba con búsquedas O(1).
+    Las enfermedades del propio lote cuentan como existentes para los síntomas.
+    """
+
+    def __init__(self, ids_medicamentos: Iterable[str], enfermedades: Dict[str, Dict],
+                 especies: Iterable[str] = ESPECIES_VALIDAS):
+        self.ids_medicamentos: Set[str] = set(ids_medicamentos)
+        self.especies: Set[str] = set(especies)
+        self.existentes: Set[Tuple[str, str]] = {
+            ((e.get('nombre') or '').strip().lower(), e.get('especie') or '') for e in enfermedades.values()
+        }
+        self.nombres: Set[str] = {nombre for nombre, _ in self.existentes}
+
+    def validar(self, filas: Iterable[Tuple[int, Dict[str, Any]]]) -> ResultadoImportacion:
+        resultado = ResultadoImportacion()
+        nuevas: Set[Tuple[str, str]] = set()
+        sintomas_pendientes: List[Tuple[int, str, List[str]]] = []
+
+        for n, fila in filas:
+            resultado.filas += 1
+            if '_error' in fila:
+                resultado.errores.append((n, [fila['_error']]))
+                continue
+            tipo = (fila.get('tipo') or TIPO_ENFERMEDAD).strip().lower()
+
+            if tipo == TIPO_ENFERMEDAD:
+                errores, enfermedad = self._validar_enfermedad(fila, nuevas)
+                if errores:
+                    resultado.errores.append((n, errores))
+                else:
+                    nuevas.add((enfermedad['nombre'].lower(), enfermedad['especie']))
+                    resultado.enfermedades.append(enfermedad)
+            elif tipo == TIPO_SINTOMA:
+                sintoma = (fila.get('sintoma') or fila.get('nombre') or '').strip()
+                enfermedades = _lista(fila.get('enfermedades'))
+                if not sintoma or not enfermedades:
+                    resultado.errores.append((n, ["Faltan 'sintoma' o 'enfermedades'"]))
+                else:
+                    # Se comprueban al final: pueden apuntar a enfermedades de filas posteriores
+                    sintomas_pendientes.append((n, sintoma, enfermedades))
+            else:
+                resultado.errores.append((n, [f"Tipo desconocido '{tipo}' (enfermedad o sintoma)"]))
+
+        nombres = self.nombres | {nombre for nombre, _ in nuevas}
+        for n, sintoma, enfermedades in sintomas_pendientes:
+            desconocidas = [e for e in enfermedades if e.lower() not in nombres]
+            if desconocidas:
+                resultado.errores.append((n, [f"Enfermedades inexistentes: {', '.join(desconocidas)}"]))
+            else:
+                resultado.sintomas[sintoma] = enfermedades
+
+        resultado.errores.sort()
+        return resultado
+
+    def _validar_enfermedad(self, fila: Dict[str, Any],
+                            nuevas: Set[Tuple[str, str]]) -> Tuple[List[str], Optional[Dict[str, Any]]]:
+        errores = []
+        nombre = (fila.get('nombre') or '').strip()
+        especie = (fila.get('especie') or '').strip().capitalize()
+        medicamentos = _lista(fila.get('medicamentos_asociados'))
+
+        if not nombre:
+            errores.append("Falta 'nombre'")
+        if especie not in self.especies:
+            errores.append(f"Especie '{fila.get('especie')}' no válida ({', '.join(sorted(self.especies))})")
+        desconocidos = [m for m in medicamentos if m not in self.ids_medicamentos]
+        if desconocidos:
+            errores.append(f"Medicamentos inexistentes: {', '.join(desconocidos[:5])}"
+                           + (f" (+{len(desconocidos) - 5})" if len(desconocidos) > 5 else ""))
+        clave = (nombre.lower(), especie)
+        if nombre and clave in self.existentes:
+            errores.append(f"'{nombre}' ({especie}) ya existe")
+        elif nombre and clave in nuevas:
+            errores.append(f"'{nombre}' ({especie}) está repetida en el fichero")
+        if errores:
+            return errores, None
+
+        return [], {
+            "nombre": nombre,
+            "especie": especie,
+            "categoria": (fila.get('categoria') or 'Otros').strip(),
+            "síntomas": _lista(fila.get('síntomas') or fila.get('sintomas')),
+            "principios_recomendados": _lista(fila.get('principios_recomendados')),
+            "indicaciones": (fila.get('indicaciones') or '').strip(),
+            "contraindicaciones": (fila.get('contraindicaciones') or '').strip(),
+            "notas": (fila.get('notas') or '').strip(),
+            "medicamentos_asociados": medicamentos,
+        }
+
+
+def confirmar_importacion(resultado: ResultadoImportacion, journal_enfermedades: JournalCambios,
+                          journal_sintomas: JournalCambios, calculador: CalculadorRelaciones,
+                          journal_relaciones: JournalCambios) -> Dict[str, Any]:
+    """Escribe el lote completo (todo o nada): una escritura por journal.
+
+    Las enfermedades van primero para que los síntomas nunca apunten a una
+    enfermedad aún no escrita; tras ellas, las aristas de todas las nuevas se
+    calculan y se guardan en el overlay de relaciones en una sola escritura
+    (lo mismo que hace el formulario de una enfermedad, una vez por lote).
+    Son varios ficheros, así que no hay una única escritura atómica: los lotes
+    se serializan antes de escribir nada y, si falla la escritura de aristas o
+    la de síntomas, se compensa borrando las aristas y las enfermedades recién
+    añadidas. Si también falla ese borrado se lanza RuntimeError con las
+    claves que han quedado escritas.
+    """
+    if resultado.errores:
+        raise ValueError(f"El lote tiene {len(resultado.errores)} filas con errores; no se importa nada")
+    sintomas = list(resultado.sintomas.items())
+    try:
+        json.dumps([resultado.enfermedades, sintomas], ensure_ascii=False)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"El lote no se puede guardar; no se importa nada: {e}") from e
+
+    claves = journal_enfermedades.anadir_lote(resultado.enfermedades)
+    try:
+        aristas = recalcular_enfermedades(calculador, journal_relaciones,
+                                          dict(zip(claves, resultado.enfermedades))) if claves else {}
+        n_sintomas = journal_sintomas.guardar_lote(sintomas)
+    except Exception as e:
+        logger.error(f"❌ Falló la importación, se deshacen {len(claves)} enfermedades: {e}")
+        try:
+            journal_relaciones.eliminar_lote(claves)
+            journal_enfermedades.eliminar_lote(claves)
+        except Exception as e2:
+            raise RuntimeError(f"Importación parcial: enfermedades {claves} escritas sin sus síntomas "
+                               f"({e}); no se pudieron deshacer: {e2}") from e
+        raise
+    n_aristas = sum(map(len, aristas.values()))
+    logger.info(f"📥 Importadas {len(claves)} enfermedades ({n_aristas} aristas) y {n_sintomas} síntomas")
+    return {'enfermedades': claves, 'sintomas': n_sintomas, 'relaciones': n_aristas}
@@ -0,0 +1,255 @@
+import os
+import re
+import json
+import time
+import logging
+import tempfile
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+from typing import Dict, List, Any, Optional, Iterable, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: solo se protege entre hilos del mismo proceso
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Entradas en el journal a partir de las cuales se compacta en el JSON tras escribir
+UMBRAL_COMPACTACION = 200
+
+OP_SET = 'set'
+OP_DELETE = 'delete'
+
+
+def ruta_journal(snapshot_path) -> Path:
+    """enfermedades_42_completo.json -> enfermedades_42_completo.journal.jsonl"""
+    snapshot_path = Path(snapshot_path)
+    return snapshot_path.with_name(snapshot_path.stem + '.journal.jsonl')
+
+
+class JournalCambios:
+    """Journal de cambios (append-only) sobre una sección de un JSON del grafo.
+
+    Las escrituras del panel de administración añaden una línea JSONL al journal
+    bajo un lock de fichero (flock) en lugar de reescribir el JSON completo:
+    cuestan O(cambio) y dos administradores guardando a la vez no se pisan.
+    Cada cierto número de entradas el journal se compacta en el JSON con
+    fichero temporal + rename atómico y se vacía.
+
+    El estado vigente es el JSON + el journal aplicado en orden; se mantiene en
+    memoria y solo se leen las líneas nuevas desde la última lectura.
+    """
+
+    _locks_proceso: Dict[str, threading.Lock] = {}
+
+    def __init__(self, snapshot_path, seccion: str, umbral_compactacion: int = UMBRAL_COMPACTACION):
+        self.snapshot_path = Path(snapshot_path)
+        self.seccion = seccion
+        self.journal_path = ruta_journal(self.snapshot_path)
+        self.lock_path = self.snapshot_path.with_name(self.snapshot_path.name + '.lock')
+        self.umbral_compactacion = umbral_compactacion
+
+        clave_lock = str(self.lock_path.resolve())
+        self._lock_hilos = self._locks_proceso.setdefault(clave_lock, threading.Lock())
+
+        self._documento: Dict[str, Any] = {}
+        self._estado: Dict[str, Any] = {}
+        self._firma_snapshot: Optional[Tuple[int, int]] = None
+        self._offset = 0
+        self._entradas = 0
+
+    # ========== BLOQUEO ==========
+
+    @contextmanager
+    def _bloqueo(self, exclusivo: bool = True):
+        """Lock entre hilos (siempre) y entre procesos (flock, si el sistema lo tiene)"""
+        with self._lock_hilos:
+            if fcntl is None:
+                yield
+                return
+            self.lock_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.lock_path, 'a') as f:
+                fcntl.flock(f, fcntl.LOCK_EX if exclusivo else fcntl.LOCK_SH)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    # ========== LECTURA ==========
+
+    def _firma(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = self.snapshot_path.stat()
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    @staticmethod
+    def _aplicar(estado: Dict[str, Any], entrada: Dict[str, Any]):
+        if entrada.get('op') == OP_DELETE:
+            estado.pop(entrada['clave'], None)
+        else:
+            estado[entrada['clave']] = entrada.get('valor')
+
+    def _sincronizar(self):
+        """Trae a memoria los cambios desde la última lectura (llamar con el lock tomado)"""
+        firma = self._firma()
+        if firma != self._firma_snapshot:
+            # JSON nuevo (primera lectura o compactado por otro proceso): se relee entero
+            if firma is None:
+                self._documento = {self.seccion: {}}
+            else:
+                with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                    self._documento = json.load(f)
+            self._estado = dict(self._documento.get(self.seccion, {}))
+            self._firma_snapshot = firma
+            self._offset = 0
+            self._entradas = 0
+
+        try:
+            with open(self.journal_path, 'rb') as f:
+                f.seek(self._offset)
+                for linea in f:
+                    if not linea.endswith(b'\n'):
+                        break  # línea a medio escribir por un proceso caído: se ignora
+                    self._offset += len(linea)
+                    if linea.strip():
+                        self._aplicar(self._estado, json.loads(linea))
+                        self._entradas += 1
+        except FileNotFoundError:
+            self._offset = 0
+
+    def estado(self) -> Dict[str, Any]:
+        """Copia de la sección con el journal aplicado"""
+        with self._bloqueo(exclusivo=False):
+            self._sincronizar()
+            return dict(self._estado)
+
+    # ========== ESCRITURA ==========
+
+    def _escribir(self, entradas: List[Dict[str, Any]]):
+        """Añade las entradas al journal en una sola escritura (llamar con el lock tomado)"""
+        ahora = time.time()
+        bloque = b''.join(
+            json.dumps({'ts': ahora, **entrada}, ensure_ascii=False).encode('utf-8') + b'\n'
+            for entrada in entradas
+        )
+        with open(self.journal_path, 'ab') as f:
+            if f.tell() > self._offset:
+                # Restos de una escritura interrumpida: se descartan antes de añadir
+                f.truncate(self._offset)
+            f.write(bloque)
+            f.flush()
+            os.fsync(f.fileno())
+        # Lo recién escrito ya está aplicado en memoria
+        for entrada in entradas:
+            self._aplicar(self._estado, entrada)
+        self._offset += len(bloque)
+        self._entradas += len(entradas)
+
+        if self._entradas >= self.umbral_compactacion:
+            self._compactar()
+
+    def guardar(self, clave: str, valor: Any):
+        """Crea o sustituye una entrada de la sección"""
+        self.guardar_lote([(clave, valor)])
+
+    def guardar_lote(self, cambios: Iterable[Tuple[str, Any]]) -> int:
+        """Varias entradas en una sola escritura al journal; devuelve cuántas"""
+        entradas = [{'op': OP_SET, 'clave': clave, 'valor': valor} for clave, valor in cambios]
+        if not entradas:
+            return 0
+        with self._bloqueo():
+            self._sincronizar()
+            self._escribir(entradas)
+        return len(entradas)
+
+    def eliminar(self, clave: str):
+        self.eliminar_lote([clave])
+
+    def eliminar_lote(self, claves: Iterable[str]) -> int:
+        """Borra varias entradas en una sola escritura al journal; devuelve cuántas"""
+        entradas = [{'op': OP_DELETE, 'clave': clave} for clave in claves]
+        if not entradas:
+            return 0
+        with self._bloqueo():
+            self._sincronizar()
+            self._escribir(entradas)
+        return len(entradas)
+
+    def anadir(self, valor: Any, prefijo: str = 'ENF_') -> str:
+        """Añade con una clave nueva `<prefijo>NNN` única (se calcula dentro del lock)"""
+        return self.anadir_lote([valor], prefijo)[0]
+
+    def anadir_lote(self, valores: Iterable[Any], prefijo: str = 'ENF_') -> List[str]:
+        """Añade varias entradas con claves nuevas consecutivas en una sola escritura"""
+        valores = list(valores)
+        if not valores:
+            return []
+        with self._bloqueo():
+            self._sincronizar()
+            patron = re.compile(rf'^{re.escape(prefijo)}(\d+)$')
+            siguiente = max((int(m.group(1)) for m in map(patron.match, self._estado) if m), default=0) + 1
+            claves = []
+            for _ in valores:
+                clave = f"{prefijo}{siguiente:03d}"
+                while clave in self._estado:
+                    clave = f"{clave}_"
+                claves.append(clave)
+                siguiente += 1
+            self._escribir([{'op': OP_SET, 'clave': clave, 'valor': valor}
+                            for clave, valor in zip(claves, valores)])
+        return claves
+
+    # ========== COMPACTACIÓN ==========
+
+    def _compactar(self):
+        """Vuelca el estado al JSON (temporal + rename) y vacía el journal (con el lock tomado)"""
+        documento = dict(self._documento)
+        documento[self.seccion] = self._estado
+        metadata = documento.get('metadata')
+        if isinstance(metadata, dict):
+            metadata = dict(metadata)
+            metadata[f'total_{self.seccion}'] = len(self._estado)
+            metadata['fecha_actualizacion'] = time.strftime('%Y-%m-%d')
+            documento['metadata'] = metadata
+
+        self.snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.snapshot_path.parent, prefix=self.snapshot_path.name,
+                                   suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(documento, f, indent=2, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.snapshot_path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+        # El JSON ya contiene todo lo del journal: se vacía. Si el proceso cae justo
+        # antes, reaplicar el journal sobre el JSON compactado da el mismo estado
+        with open(self.journal_path, 'wb') as f:
+            f.flush()
+            os.fsync(f.fileno())
+
+        compactadas = self._entradas
+        self._documento = documento
+        self._firma_snapshot = self._firma()
+        self._offset = 0
+        self._entradas = 0
+        logger.info(f"🗜️ Journal compactado en {self.snapshot_path.name}: {compactadas} cambios")
+
+    def compactar(self):
+        with self._bloqueo():
+            self._sincronizar()
+            self._compactar()
+
+    def pendientes(self) -> int:
+        """Entradas del journal aún no compactadas en el JSON"""
+        with self._bloqueo(exclusivo=False):
+            self._sincronizar()
+            return self._entradas
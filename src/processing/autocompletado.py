@@ -0,0 +1,199 @@
+import heapq
+import logging
+from array import array
+from bisect import bisect_left
+from typing import Dict, List, Tuple, Optional, Iterable, Any
+
+from processing.catalogo_index import tokenizar
+from processing.grafo_compilado import texto as texto_utf8
+
+logger = logging.getLogger(__name__)
+
+# Sugerencias que se guardan ya calculadas para cada prefijo corto
+MAX_SUGERENCIAS = 20
+# Prefijos de hasta esta longitud tienen su top precalculado (son los que más casan)
+LONGITUD_PREFIJO_PRECALCULADO = 3
+
+TIPOS = ('medicamento', 'principio', 'sintoma')
+# Tipos que solo dependen del grafo y van compilados en el .kgbin (prefijo de sus secciones)
+SECCIONES_TIPO = {'medicamento': 'ac_med', 'principio': 'ac_pri'}
+
+
+class _IndicePrefijos:
+    """Array ordenado de claves normalizadas -> término, para un único tipo.
+
+    Cada término se indexa también desde el inicio de cada una de sus palabras
+    ("Ácido clavulánico" casa con "aci" y con "clav").
+    """
+
+    def __init__(self, terminos: Iterable[Tuple[str, float]]):
+        self.textos: List[str] = []
+        self.pesos: List[float] = []
+        claves: List[Tuple[str, int, bool]] = []
+
+        vistos = set()
+        for texto, peso in terminos:
+            if not texto or texto in vistos:
+                continue
+            vistos.add(texto)
+            pos = len(self.textos)
+            self.textos.append(texto)
+            self.pesos.append(peso)
+            tokens = tokenizar(texto)
+            for i in range(len(tokens)):
+                claves.append((" ".join(tokens[i:]), pos, i > 0))
+
+        claves.sort()
+        self.claves = [clave for clave, _, _ in claves]
+        self.posiciones = [pos for _, pos, _ in claves]
+        self.interior = [interior for _, _, interior in claves]
+
+        # Top de cada prefijo corto, precalculado sobre su rango del array
+        self.top_corto: Dict[str, List[int]] = {}
+        for clave in set(c[:n] for c in self.claves for n in range(1, LONGITUD_PREFIJO_PRECALCULADO + 1)):
+            self.top_corto[clave] = self._calcular_top(clave, MAX_SUGERENCIAS)
+
+    @classmethod
+    def desde_compilado(cls, grafo, prefijo: str) -> '_IndicePrefijos':
+        """Arrays del índice leídos del .kgbin sin copiarlos (ver secciones_compiladas)"""
+        indice = cls.__new__(cls)
+        indice.textos = grafo.lista(f'{prefijo}_textos', texto_utf8)
+        indice.pesos = grafo.array(f'{prefijo}_pesos', 'd')
+        indice.claves = grafo.lista(f'{prefijo}_claves', texto_utf8)
+        indice.posiciones = grafo.array(f'{prefijo}_posic', 'I')
+        indice.interior = grafo.array(f'{prefijo}_inter', 'B')
+        indice.top_corto = grafo.registros(f'{prefijo}_top', lambda crudo: crudo.cast('I').tolist())
+        return indice
+
+    def secciones_compiladas(self, prefijo: str) -> Dict[str, Any]:
+        return {
+            f'{prefijo}_textos': (t.encode('utf-8') for t in self.textos),
+            f'{prefijo}_pesos': [array('d', self.pesos)],
+            f'{prefijo}_claves': (c.encode('utf-8') for c in self.claves),
+            f'{prefijo}_posic': [array('I', self.posiciones)],
+            f'{prefijo}_inter': [array('B', self.interior)],
+            f'{prefijo}_top': {clave: array('I', top) for clave, top in sorted(self.top_corto.items())},
+        }
+
+    def _calcular_top(self, prefijo: str, n: int) -> List[int]:
+        inicio = bisect_left(self.claves, prefijo)
+        fin = bisect_left(self.claves, prefijo + '\uffff')
+        # Un término puede casar por varias palabras: vale la mejor (inicio del término > palabra interior)
+        candidatos: Dict[int, bool] = {}
+        for i in range(inicio, fin):
+            pos = self.posiciones[i]
+            candidatos[pos] = candidatos.get(pos, True) and self.interior[i]
+        # Más peso primero; a igualdad, coincidencia al inicio, término más corto y alfabético
+        return heapq.nsmallest(n, candidatos, key=lambda pos: (
+            -self.pesos[pos], candidatos[pos], len(self.textos[pos]), self.textos[pos]))
+
+    def top(self, prefijo: str, n: int) -> List[int]:
+        if len(prefijo) <= LONGITUD_PREFIJO_PRECALCULADO and n <= MAX_SUGERENCIAS:
+            return self.top_corto.get(prefijo, [])[:n]
+        return self._calcular_top(prefijo, n)
+
+
+class Autocompletado:
+    """Sugerencias de búsqueda mientras se escribe.
+
+    Cubre nombres de medicamentos, principios activos y los términos de síntomas
+    del EnfermedadesLoader. Todo se indexa en la carga del motor; una consulta
+    es un bisect sobre un array ordenado (o una lectura de diccionario para
+    prefijos cortos).
+
+    Los pesos se normalizan a [0, 1] dentro de cada tipo para poder mezclar tipos:
+    - medicamento: comercializado 1.0, no comercializado 0.5, anulado 0.1
+    - principio: nº de medicamentos que lo contienen
+    - síntoma: nº de enfermedades a las que apunta el término
+    """
+
+    def __init__(self, medicamentos: Dict[str, Dict], principios_index=None,
+                 indice_sintomas: Optional[Dict[str, List[str]]] = None):
+        terminos: Dict[str, List[Tuple[str, float]]] = {tipo: [] for tipo in TIPOS}
+
+        for med in medicamentos.values():
+            if med.get('estado', '').lower() == 'anulado':
+                peso = 0.1
+            elif med.get('fecha_comercializado', 'Si') != 'Si':
+                peso = 0.5
+            else:
+                peso = 1.0
+            terminos['medicamento'].append((med.get('nombre', ''), peso))
+
+        if principios_index is not None:
+            for pid, nombre in self._originales_por_id(principios_index).items():
+                n_meds = len(principios_index.medicamentos_por_id[pid])
+                terminos['principio'].append((nombre, n_meds))
+
+        for termino, enfermedades in (indice_sintomas or {}).items():
+            terminos['sintoma'].append((termino, len(enfermedades)))
+
+        self.indices: Dict[str, _IndicePrefijos] = {tipo: self._indexar(lista) for tipo, lista in terminos.items()}
+        self._informar()
+
+    @classmethod
+    def desde_compilado(cls, grafo, indice_sintomas: Optional[Dict[str, List[str]]] = None) -> 'Autocompletado':
+        """Medicamentos y principios desde el .kgbin; los síntomas (del loader) se indexan aquí"""
+        autocompletado = cls.__new__(cls)
+        autocompletado.indices = {tipo: _IndicePrefijos.desde_compilado(grafo, prefijo)
+                                  for tipo, prefijo in SECCIONES_TIPO.items()}
+        autocompletado.indices['sintoma'] = cls._indexar(
+            [(termino, len(enfermedades)) for termino, enfermedades in (indice_sintomas or {}).items()])
+        autocompletado._informar()
+        return autocompletado
+
+    def secciones_compiladas(self) -> Dict[str, Any]:
+        secciones = {}
+        for tipo, prefijo in SECCIONES_TIPO.items():
+            secciones.update(self.indices[tipo].secciones_compiladas(prefijo))
+        return secciones
+
+    @staticmethod
+    def _indexar(lista: List[Tuple[str, float]]) -> _IndicePrefijos:
+        """Índice de un tipo con los pesos normalizados a [0, 1]"""
+        maximo = max((peso for _, peso in lista), default=1) or 1
+        return _IndicePrefijos((texto, peso / maximo) for texto, peso in lista)
+
+    def _informar(self):
+        logger.info("⌨️ Autocompletado: " + " | ".join(
+            f"{len(indice.textos)} {tipo}s" for tipo, indice in self.indices.items()))
+
+    @staticmethod
+    def _originales_por_id(principios_index) -> Dict[int, str]:
+        """Nombre a mostrar por principio (la grafía más corta de las que aparecen en el catálogo)"""
+        nombres: Dict[int, str] = {}
+        for original, pid in principios_index.id_por_original.items():
+            actual = nombres.get(pid)
+            if actual is None or (len(original), original) < (len(actual), actual):
+                nombres[pid] = original
+        return nombres
+
+    def sugerir(self, texto: str, n: int = 8, tipos: Iterable[str] = TIPOS) -> List[Dict[str, Any]]:
+        """Top-n sugerencias {'texto', 'tipo', 'peso'} para lo que se lleva escrito"""
+        prefijo = " ".join(tokenizar(texto))
+        if not prefijo or n <= 0:
+            return []
+
+        candidatos = []
+        for tipo in tipos:
+            indice = self.indices.get(tipo)
+            if indice is None:
+                continue
+            for pos in indice.top(prefijo, n):
+                candidatos.append((-indice.pesos[pos], len(indice.textos[pos]), indice.textos[pos], tipo))
+
+        return [{'texto': texto, 'tipo': tipo, 'peso': round(-peso, 3)}
+                for peso, _, texto, tipo in heapq.nsmallest(n, candidatos)]
+
+
+def ultima_palabra(texto: str) -> str:
+    """Palabra que se está escribiendo al final de un texto libre"""
+    partes = (texto or '').rstrip().rsplit(None, 1)
+    return partes[-1] if partes and not (texto or '').endswith((' ', '\n')) else ''
+
+
+def completar_texto(texto: str, sugerencia: str) -> str:
+    """Sustituye la palabra en curso por la sugerencia elegida"""
+    palabra = ultima_palabra(texto)
+    base = texto[:len(texto.rstrip()) - len(palabra)] if palabra else texto
+    return f"{base}{sugerencia} "
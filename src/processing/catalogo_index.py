@@ -0,0 +1,279 @@
+import re
+import logging
+from bisect import bisect_left
+from functools import lru_cache
+from typing import Dict, List, Any, Optional, Iterator
+
+from processing.principios_index import normalizar_texto
+from processing.grafo_compilado import bytes_bitset, entero
+
+logger = logging.getLogger(__name__)
+
+
+# Separa faceta y valor en las claves de la sección cat_facetas del .kgbin
+SEPARADOR_FACETA = '\x1f'
+
+
+def tokenizar(texto: str) -> List[str]:
+    """Tokens alfanuméricos normalizados ("Amoxicilina/Ác. Clavulánico" -> amoxicilina, ac, clavulanico)"""
+    return re.findall(r'[a-z0-9]+', normalizar_texto(texto))
+
+
+def posiciones_bits(bits: int, desde: int = 0, cuantos: Optional[int] = None) -> Iterator[int]:
+    """Posiciones de los bits a 1 (de menor a mayor), saltando los `desde` primeros.
+
+    Se recorre la representación binaria con str.find, que trabaja en C:
+    paginar sobre decenas de miles de bits no requiere un bucle Python por bit.
+    """
+    binario = bin(bits)[:1:-1]  # bit 0 primero
+    pos = binario.find('1')
+    saltados = 0
+    while pos != -1 and saltados < desde:
+        saltados += 1
+        pos = binario.find('1', pos + 1)
+    devueltos = 0
+    while pos != -1 and (cuantos is None or devueltos < cuantos):
+        yield pos
+        devueltos += 1
+        pos = binario.find('1', pos + 1)
+
+
+def bits_desde_posiciones(posiciones: List[int]) -> int:
+    """Bitset a partir de posiciones, sin crear un entero nuevo por cada OR"""
+    if len(posiciones) < 64:
+        bits = 0
+        for pos in posiciones:
+            bits |= 1 << pos
+        return bits
+    mapa = bytearray(max(posiciones) // 8 + 1)
+    for pos in posiciones:
+        mapa[pos >> 3] |= 1 << (pos & 7)
+    return int.from_bytes(mapa, 'little')
+
+
+class ResultadoBusqueda:
+    """Resultado perezoso: solo guarda el bitset y materializa las páginas pedidas"""
+
+    def __init__(self, indice: 'CatalogoIndex', bits: int):
+        self._indice = indice
+        self.bits = bits
+        self.total = bits.bit_count()
+
+    def paginas(self, tamano: int = 20) -> int:
+        return max(1, -(-self.total // tamano))
+
+    def pagina(self, numero: int = 1, tamano: int = 20) -> List[Dict[str, Any]]:
+        """Medicamentos de la página `numero` (empezando en 1)"""
+        desde = (max(1, numero) - 1) * tamano
+        return [self._indice.medicamento(pos) for pos in posiciones_bits(self.bits, desde, tamano)]
+
+    def ids(self) -> Iterator[str]:
+        return (self._indice.ids[pos] for pos in posiciones_bits(self.bits))
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return (self._indice.medicamento(pos) for pos in posiciones_bits(self.bits))
+
+    def __len__(self) -> int:
+        return self.total
+
+
+class CatalogoIndex:
+    """Índice invertido del vademécum con búsqueda por prefijo y filtros en bitsets.
+
+    Se construye una vez en la carga del motor:
+    - token -> bitset de medicamentos (nombre, principios activos y titular)
+    - lista ordenada de tokens para resolver prefijos con bisect
+    - bitsets de facetas: especie, prescripción, titular y comercialización
+
+    Una búsqueda es la intersección (AND) de bitsets; las páginas de resultados
+    se materializan bajo demanda. Los recuentos de cada faceta salen de
+    intersecar su bitset con el resto de filtros y contar bits.
+    """
+
+    def __init__(self, medicamentos: Dict[str, Dict]):
+        self.ids: List[str] = list(medicamentos)
+        self._medicamentos = medicamentos
+        self.todos = (1 << len(self.ids)) - 1
+
+        # Primero listas de posiciones; los bitsets se construyen al final de una vez
+        postings: Dict[str, List[int]] = {}
+        por_especie: Dict[str, List[int]] = {}
+        por_receta: Dict[bool, List[int]] = {True: [], False: []}
+        por_titular: Dict[str, List[int]] = {}
+        por_comercializado: Dict[bool, List[int]] = {True: [], False: []}
+
+        for pos, med_id in enumerate(self.ids):
+            med = medicamentos[med_id]
+
+            texto = " ".join([med.get('nombre', ''), " ".join(med.get('principios_activos', [])),
+                              med.get('titular', '') or ''])
+            for token in set(tokenizar(texto)):
+                postings.setdefault(token, []).append(pos)
+
+            por_especie.setdefault(normalizar_texto(med.get('especie', '')), []).append(pos)
+
+            presc = med.get('prescripcion', '')
+            if "Sujeto" in presc:
+                por_receta[True].append(pos)
+            elif "No sujeto" in presc:
+                por_receta[False].append(pos)
+
+            titular = (med.get('titular') or '').strip()
+            if titular:
+                por_titular.setdefault(titular, []).append(pos)
+            por_comercializado[med.get('fecha_comercializado', 'Si') == 'Si'].append(pos)
+
+        self.postings = {token: bits_desde_posiciones(p) for token, p in postings.items()}
+        self.tokens = sorted(self.postings)
+        self.bits_por_especie = {esp: bits_desde_posiciones(p) for esp, p in por_especie.items()}
+        self.bits_receta = {valor: bits_desde_posiciones(p) for valor, p in por_receta.items()}
+        self.bits_titular = {titular: bits_desde_posiciones(p) for titular, p in sorted(por_titular.items())}
+        self.bits_comercializado = {valor: bits_desde_posiciones(p) for valor, p in por_comercializado.items()}
+        self._preparar()
+
+    @classmethod
+    def desde_compilado(cls, grafo) -> 'CatalogoIndex':
+        """Índice sobre las secciones cat_* del .kgbin (ver secciones_compiladas).
+
+        Tokens y postings se leen del mmap compartido al consultarlos; solo las
+        facetas (unas decenas de bitsets) se cargan al abrir.
+        """
+        indice = cls.__new__(cls)
+        indice.ids = grafo.claves('medicamentos')
+        indice._medicamentos = grafo.medicamentos
+        indice.todos = (1 << len(indice.ids)) - 1
+        indice.postings = grafo.registros('cat_tokens', entero)
+        indice.tokens = grafo.claves('cat_tokens')
+
+        facetas = {'especie': {}, 'receta': {}, 'titular': {}, 'comercializado': {}}
+        for clave, bits in grafo.registros('cat_facetas', entero).items():
+            faceta, valor = clave.split(SEPARADOR_FACETA, 1)
+            facetas[faceta][valor == '1' if faceta in ('receta', 'comercializado') else valor] = bits
+        indice.bits_por_especie = facetas['especie']
+        indice.bits_receta = facetas['receta']
+        indice.bits_titular = facetas['titular']
+        indice.bits_comercializado = facetas['comercializado']
+        indice._preparar()
+        return indice
+
+    def secciones_compiladas(self) -> Dict[str, Dict[str, bytes]]:
+        """Secciones del .kgbin: postings por token (ya en orden) y bitsets de facetas"""
+        facetas = {}
+        for faceta, bitsets in (('especie', self.bits_por_especie), ('receta', self.bits_receta),
+                                ('titular', self.bits_titular), ('comercializado', self.bits_comercializado)):
+            for valor, bits in bitsets.items():
+                if isinstance(valor, bool):
+                    valor = '1' if valor else '0'
+                facetas[f"{faceta}{SEPARADOR_FACETA}{valor}"] = bytes_bitset(bits)
+        return {'cat_tokens': {token: bytes_bitset(self.postings[token]) for token in self.tokens},
+                'cat_facetas': facetas}
+
+    def _preparar(self):
+        # Opciones de especie que ofrece la interfaz (cada una incluye los 'Ambos')
+        self.especies = ["Perro", "Gato"]
+
+        # Uniones de prefijos ya calculadas (los prefijos cortos se repiten mucho)
+        self._bits_prefijo = lru_cache(maxsize=4096)(self._calcular_bits_prefijo)
+
+        logger.info(f"🔎 Catálogo indexado: {len(self.ids)} medicamentos | {len(self.tokens)} tokens")
+
+    # ========== BITSETS ==========
+
+    def _calcular_bits_prefijo(self, prefijo: str) -> int:
+        """OR de los postings de todos los tokens que empiezan por `prefijo`"""
+        bits = 0
+        i = bisect_left(self.tokens, prefijo)
+        while i < len(self.tokens) and self.tokens[i].startswith(prefijo):
+            bits |= self.postings[self.tokens[i]]
+            i += 1
+        return bits
+
+    def bits_texto(self, texto: str) -> int:
+        """Medicamentos que contienen TODOS los tokens del texto (cada uno como prefijo)"""
+        bits = self.todos
+        for token in tokenizar(texto):
+            bits &= self._bits_prefijo(token)
+            if not bits:
+                break
+        return bits
+
+    def bits_especie(self, especie: Optional[str]) -> int:
+        """Mismo criterio que el vademécum original: la especie o 'Ambos'"""
+        if not especie:
+            return self.todos
+        especie = normalizar_texto(especie)
+        bits = 0
+        for valor, bits_valor in self.bits_por_especie.items():
+            if especie in valor or 'ambos' in valor:
+                bits |= bits_valor
+        return bits
+
+    def _bits_filtros(self, especie: Optional[str] = None, receta: Optional[bool] = None,
+                      titular: Optional[str] = None, comercializado: Optional[bool] = None) -> Dict[str, int]:
+        """Bitset de cada filtro activo (los inactivos no aparecen)"""
+        filtros = {}
+        if especie:
+            filtros['especie'] = self.bits_especie(especie)
+        if receta is not None:
+            filtros['receta'] = self.bits_receta[receta]
+        if titular:
+            filtros['titular'] = self.bits_titular.get(titular, 0)
+        if comercializado is not None:
+            filtros['comercializado'] = self.bits_comercializado[comercializado]
+        return filtros
+
+    # ========== CONSULTA ==========
+
+    def buscar(self, texto: str = "", especie: Optional[str] = None,
+               receta: Optional[bool] = None, titular: Optional[str] = None,
+               comercializado: Optional[bool] = None) -> ResultadoBusqueda:
+        """Texto por prefijos + filtros de facetas, compuestos por intersección"""
+        bits = self.bits_texto(texto)
+        for bits_filtro in self._bits_filtros(especie, receta, titular, comercializado).values():
+            bits &= bits_filtro
+        return ResultadoBusqueda(self, bits)
+
+    def facetas(self, texto: str = "", especie: Optional[str] = None,
+                receta: Optional[bool] = None, titular: Optional[str] = None,
+                comercializado: Optional[bool] = None) -> Dict[str, Dict[Any, int]]:
+        """Recuento de resultados por opción de cada faceta.
+
+        Cada faceta se cuenta con el texto y el RESTO de filtros aplicados (no el
+        suyo), para que el recuento diga cuántos resultados habría al cambiar a
+        esa opción. Los titulares sin resultados se omiten.
+        """
+        base = self.bits_texto(texto)
+        filtros = self._bits_filtros(especie, receta, titular, comercializado)
+
+        def resto(faceta: str) -> int:
+            bits = base
+            for nombre, bits_filtro in filtros.items():
+                if nombre != faceta:
+                    bits &= bits_filtro
+            return bits
+
+        bits = resto('especie')
+        conteo_especie = {None: bits.bit_count()}
+        conteo_especie.update({esp: (bits & self.bits_especie(esp)).bit_count() for esp in self.especies})
+
+        bits = resto('receta')
+        conteo_receta = {None: bits.bit_count()}
+        conteo_receta.update({valor: (bits & b).bit_count() for valor, b in self.bits_receta.items()})
+
+        bits = resto('titular')
+        conteo_titular = {None: bits.bit_count()}
+        for nombre, b in self.bits_titular.items():
+            n = (bits & b).bit_count()
+            if n:
+                conteo_titular[nombre] = n
+
+        bits = resto('comercializado')
+        conteo_comercializado = {None: bits.bit_count()}
+        conteo_comercializado.update({valor: (bits & b).bit_count()
+                                      for valor, b in self.bits_comercializado.items()})
+
+        return {'especie': conteo_especie, 'receta': conteo_receta,
+                'titular': conteo_titular, 'comercializado': conteo_comercializado}
+
+    def medicamento(self, pos: int) -> Dict[str, Any]:
+        return self._medicamentos[self.ids[pos]]
@@ -0,0 +1,152 @@
+import logging
+from bisect import bisect_right
+from typing import Dict, List, Any, Optional
+
+from processing.principios_index import PrincipiosIndex
+
+logger = logging.getLogger(__name__)
+
+# Límites superiores (kg) de las bandas de peso. La última banda es abierta (> 60 kg).
+LIMITES_BANDAS_KG = [2, 5, 10, 20, 40, 60]
+
+
+class DosisEngine:
+    """Tablas de posología precalculadas por categoría terapéutica y banda de peso.
+
+    Todo el trabajo caro (resolver principios activos a categoría, interpretar
+    `dosis_medicamentos.json`) se hace una sola vez en la carga. En consulta,
+    obtener la dosis de un medicamento son dos accesos a diccionario y un bisect
+    sobre 6 límites.
+    """
+
+    def __init__(self, medicamentos: Dict, dosis: Dict, principios_index: PrincipiosIndex):
+        self.dosis = dosis or {}
+        self.principios_index = principios_index
+
+        # medicamento -> categoría (resuelto UNA vez)
+        self.categoria_por_med: Dict[str, Optional[str]] = dict(
+            principios_index.categorias_por_medicamento(medicamentos)
+        )
+
+        # categoría -> (peso mínimo, peso máximo) autorizados; se comparan con el peso real, no con la banda
+        self.limites_peso: Dict[str, tuple] = {
+            categoria: (datos.get('ajustes_peso', {}).get('peso_minimo_kg'),
+                        datos.get('ajustes_peso', {}).get('peso_maximo_kg'))
+            for categoria, datos in self.dosis.items()
+            if isinstance(datos, dict)
+        }
+
+        # categoría -> [ficha por banda de peso]
+        self.tabla: Dict[str, List[Dict[str, Any]]] = {
+            categoria: self._construir_fichas(categoria, datos)
+            for categoria, datos in self.dosis.items()
+            if isinstance(datos, dict)
+        }
+
+        con_dosis = sum(1 for c in self.categoria_por_med.values() if c in self.tabla)
+        logger.info(f"💉 Tablas de dosis: {len(self.tabla)} categorías | "
+                    f"{con_dosis}/{len(self.categoria_por_med)} medicamentos con posología")
+
+    def resolver_categoria(self, principios: List[str]) -> Optional[str]:
+        """Primera categoría conocida entre los principios activos del medicamento"""
+        return self.principios_index.categoria_medicamento(principios)
+
+    # ========== CONSTRUCCIÓN DE TABLAS ==========
+
+    @staticmethod
+    def _texto_frecuencia(datos: Dict) -> str:
+        if 'frecuencia_horas' in datos:
+            return f"Cada {datos['frecuencia_horas']}h"
+        frecuencia_dias = datos.get('frecuencia_dias')
+        if isinstance(frecuencia_dias, (int, float)):
+            return f"Cada {frecuencia_dias} días"
+        if frecuencia_dias:
+            return str(frecuencia_dias)
+        return str(datos.get('frecuencia', 'Según prospecto'))
+
+    @staticmethod
+    def _texto_duracion(datos: Dict) -> Optional[str]:
+        if 'duracion_dias' in datos:
+            return f"{datos['duracion_dias']} días"
+        if 'duracion_meses' in datos:
+            return f"{datos['duracion_meses']} meses"
+        if 'duracion_aplicaciones' in datos:
+            return f"{datos['duracion_aplicaciones']} aplicación(es)"
+        return None
+
+    def _construir_fichas(self, categoria: str, datos: Dict) -> List[Dict[str, Any]]:
+        """Una ficha por banda de peso con todo el texto ya resuelto"""
+        mg_kg = datos.get('dosis_mg_kg')
+
+        base = {
+            'categoria': categoria,
+            'via': datos.get('via_administracion', datos.get('via', '-')),
+            'frecuencia': self._texto_frecuencia(datos),
+            'duracion': self._texto_duracion(datos),
+            'dosis_mg_kg': mg_kg,
+            'notas': datos.get('notas', ''),
+            'advertencia': datos.get('advertencia'),
+        }
+
+        fichas = []
+        inferiores = [0] + LIMITES_BANDAS_KG
+        superiores = LIMITES_BANDAS_KG + [None]
+        for desde, hasta in zip(inferiores, superiores):
+            ficha = dict(base)
+            ficha['banda_kg'] = f"{desde}-{hasta} kg" if hasta else f">{desde} kg"
+            if mg_kg is not None:
+                ficha['dosis_min_mg'] = round(mg_kg * desde, 2)
+                ficha['dosis_max_mg'] = round(mg_kg * hasta, 2) if hasta else None
+            fichas.append(ficha)
+        return fichas
+
+    # ========== CONSULTA ==========
+
+    def obtener_dosis(self, med_id: str, peso: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Ficha de posología del medicamento para el peso dado (None si no hay tabla)"""
+        return self.obtener_dosis_categoria(self.categoria_por_med.get(med_id), peso)
+
+    def obtener_dosis_categoria(self, categoria: Optional[str],
+                                peso: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Ficha de posología de una categoría terapéutica para el peso dado"""
+        fichas = self.tabla.get(categoria)
+        if not fichas:
+            return None
+
+        if peso is None or peso <= 0:
+            ficha = dict(fichas[0])
+            ficha.update(banda_kg=None, dosis_min_mg=None, dosis_max_mg=None, fuera_de_rango=False)
+            ficha['dosis_mg'] = None
+            return ficha
+
+        ficha = dict(fichas[bisect_right(LIMITES_BANDAS_KG, peso)])
+        mg_kg = ficha.get('dosis_mg_kg')
+        ficha['dosis_mg'] = round(mg_kg * peso, 2) if mg_kg is not None else None
+        ficha['peso_kg'] = peso
+        peso_min, peso_max = self.limites_peso.get(categoria, (None, None))
+        ficha['fuera_de_rango'] = bool((peso_min is not None and peso < peso_min)
+                                       or (peso_max is not None and peso > peso_max))
+        return ficha
+
+    @staticmethod
+    def formatear(ficha: Optional[Dict[str, Any]]) -> str:
+        """Texto de posología listo para mostrar o pasar al LLM"""
+        if not ficha:
+            return "Dosis a consultar con veterinario."
+
+        partes = []
+        if ficha.get('dosis_mg') is not None:
+            partes.append(f"{ficha['dosis_mg']} mg ({ficha['dosis_mg_kg']} mg/kg x {ficha['peso_kg']} kg)")
+        elif ficha.get('dosis_mg_kg') is not None:
+            partes.append(f"{ficha['dosis_mg_kg']} mg/kg")
+        partes.append(ficha['frecuencia'])
+        if ficha.get('duracion'):
+            partes.append(f"durante {ficha['duracion']}")
+        partes.append(f"vía {ficha['via']}")
+
+        texto = " | ".join(partes)
+        if ficha.get('fuera_de_rango'):
+            texto += " | ⚠️ Peso fuera del rango autorizado"
+        if ficha.get('advertencia'):
+            texto += f" | ⚠️ {ficha['advertencia']}"
+        return texto
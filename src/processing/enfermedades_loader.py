@@ -1,10 +1,11 @@
-import json
 import re
 from typing import List, Dict, Tuple
 from pathlib import Path
 from difflib import SequenceMatcher
 import logging
 
+from database.journal import JournalCambios
+
 logger = logging.getLogger(__name__)
 
 class EnfermedadesLoader:
@@ -14,6 +15,10 @@ class EnfermedadesLoader:
         self.data_path = Path('data/knowledge_graph/enfermedades_42_completo.json')
         self.enfermedades = self._cargar_enfermedades()
         
+        # Orden fijo de enfermedades: los vectores por raza se alinean con él
+        self.claves = list(self.enfermedades)
+        self.posicion = {enf_key: pos for pos, enf_key in enumerate(self.claves)}
+        
         # 🔥 DICCIONARIOS DE SINÓNIMOS MASIVOS
         self.sinonimos_sintomas = self._construir_sinonimos_sintomas()
         
@@ -25,9 +30,8 @@ class EnfermedadesLoader:
     
     def _cargar_enfermedades(self) -> Dict:
         try:
-            with open(self.data_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            return data.get('enfermedades', {})
+            # JSON + cambios del panel de administración aún no compactados
+            return JournalCambios(self.data_path, 'enfermedades').estado()
         except Exception as e:
             logger.error(f"Error cargando enfermedades: {e}")
             return {}
@@ -174,8 +178,15 @@ class EnfermedadesLoader:
         
         return list(terminos_expandidos)
     
-    def buscar_enfermedades_fuzzy(self, texto_usuario: str, especie: str) -> List[str]:
+    def buscar_enfermedades_fuzzy(self, texto_usuario: str, especie: str,
+                                  multiplicadores: List[float] = None) -> List[str]:
         """Búsqueda ULTRA INTELIGENTE con scoring"""
+        return [enf_key for enf_key, score in
+                self.buscar_enfermedades_puntuadas(texto_usuario, especie, multiplicadores)]
+    
+    def buscar_enfermedades_puntuadas(self, texto_usuario: str, especie: str,
+                                      multiplicadores: List[float] = None) -> List[Tuple[str, float]]:
+        """Igual que buscar_enfermedades_fuzzy pero devolviendo (enf_key, score)"""
         texto_lower = texto_usuario.lower().strip()
         candidatos = {}
         
@@ -205,7 +216,13 @@ class EnfermedadesLoader:
                     for enf_key in self.indice_busqueda[termino_index]:
                         candidatos[enf_key] = candidatos.get(enf_key, 0) + 0.7
         
-        # 5. Filtrar por especie
+        # 5. Predisposición de raza: vector de scores x vector de multiplicadores
+        if multiplicadores:
+            scores = [candidatos.get(enf_key, 0) for enf_key in self.claves]
+            scores = [score * factor for score, factor in zip(scores, multiplicadores)]
+            candidatos = {enf_key: scores[self.posicion[enf_key]] for enf_key in candidatos}
+        
+        # 6. Filtrar por especie
         enfermedades_filtradas = {}
         for enf_key, score in candidatos.items():
             enf_data = self.enfermedades.get(enf_key)
@@ -214,14 +231,14 @@ class EnfermedadesLoader:
                 if especie.lower() in especie_enf or 'ambos' in especie_enf:
                     enfermedades_filtradas[enf_key] = score
         
-        # 6. Ordenar por score (descendente)
+        # 7. Ordenar por score (descendente)
         enfermedades_ordenadas = sorted(
             enfermedades_filtradas.items(),
             key=lambda x: x[1],
             reverse=True
         )
         
-        # 7. Umbral BAJO para ser más permisivo (0.5 en lugar de 0.6)
+        # 8. Umbral BAJO para ser más permisivo (0.5 en lugar de 0.6)
         enfermedades_relevantes = [
             (enf_key, score) for enf_key, score in enfermedades_ordenadas 
             if score >= 0.5
@@ -230,15 +247,19 @@ class EnfermedadesLoader:
         logger.info(f"🔍 '{texto_usuario}' → Candidatos: {len(candidatos)} | Relevantes: {len(enfermedades_relevantes)}")
         
         # Devolver top 3
-        return [enf_key for enf_key, score in enfermedades_relevantes[:3]]
+        return enfermedades_relevantes[:3]
     
-    def obtener_enfermedades_por_sintomas(self, sintomas: List[str], especie: str) -> List[Dict]:
+    def obtener_enfermedades_por_sintomas(self, sintomas: List[str], especie: str,
+                                          multiplicadores: List[float] = None) -> List[Dict]:
         """Método principal: Devuelve enfermedades con medicamentos"""
         texto_completo = " ".join(sintomas)
-        enfermedades_keys = self.buscar_enfermedades_fuzzy(texto_completo, especie)
+        enfermedades_puntuadas = self.buscar_enfermedades_puntuadas(texto_completo, especie, multiplicadores)
+        
+        # Confianza relativa a la mejor coincidencia (la mejor conserva 0.95)
+        score_max = enfermedades_puntuadas[0][1] if enfermedades_puntuadas else 1
         
         resultado = []
-        for enf_key in enfermedades_keys:
+        for enf_key, score in enfermedades_puntuadas:
             enf_data = self.enfermedades.get(enf_key)
             if enf_data:
                 resultado.append({
@@ -250,7 +271,8 @@ class EnfermedadesLoader:
                     'contraindicaciones': enf_data.get('contraindicaciones', ''),
                     'notas': enf_data.get('notas', ''),
                     'medicamentos_asociados': enf_data.get('medicamentos_asociados', []),
-                    'confianza': 0.95
+                    'confianza': round(0.95 * score / score_max, 2),
+                    'factor_raza': multiplicadores[self.posicion[enf_key]] if multiplicadores else 1.0
                 })
         
         logger.info(f"✅ Devolviendo {len(resultado)} enfermedades")
@@ -0,0 +1,91 @@
+import os
+import json
+import tempfile
+from pathlib import Path
+from typing import Any, Iterable, Tuple
+
+# Sangría del JSON generado (la misma que json.dump(..., indent=2) en el resto de scripts)
+SANGRIA = 2
+
+
+class EscritorJSON:
+    """Escribe un objeto JSON de primer nivel sección a sección, sin tenerlo entero en memoria.
+
+    Cada sección puede ser un valor normal o un objeto/lista que se va
+    consumiendo de un iterable y escribiendo registro a registro, de modo que
+    la memoria no crece con el tamaño del fichero. El resultado se escribe en
+    un temporal y se publica con rename atómico al cerrar sin errores.
+
+        with EscritorJSON(ruta) as escritor:
+            escritor.escribir('metadata', {...})
+            escritor.escribir_objeto('medicamentos', medicamentos.items())
+            escritor.escribir_lista('relaciones', generar_aristas())
+    """
+
+    def __init__(self, ruta, sangria: int = SANGRIA):
+        self.ruta = Path(ruta)
+        self.sangria = sangria
+        self._f = None
+        self._tmp = None
+        self._secciones = 0
+
+    def __enter__(self) -> 'EscritorJSON':
+        self.ruta.parent.mkdir(parents=True, exist_ok=True)
+        fd, self._tmp = tempfile.mkstemp(dir=self.ruta.parent, prefix=self.ruta.name, suffix='.tmp')
+        self._f = os.fdopen(fd, 'w', encoding='utf-8')
+        self._f.write('{')
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        try:
+            if tipo is None:
+                self._f.write('\n}\n' if self._secciones else '}\n')
+                self._f.flush()
+                os.fsync(self._f.fileno())
+            self._f.close()
+            if tipo is None:
+                os.replace(self._tmp, self.ruta)
+        finally:
+            if os.path.exists(self._tmp):
+                os.unlink(self._tmp)
+        return False
+
+    # ========== SERIALIZACIÓN ==========
+
+    def _json(self, valor: Any, nivel: int) -> str:
+        texto = json.dumps(valor, ensure_ascii=False, indent=self.sangria)
+        return texto.replace('\n', '\n' + ' ' * (self.sangria * nivel))
+
+    def _abrir_seccion(self, nombre: str):
+        self._f.write(',' if self._secciones else '')
+        self._f.write('\n' + ' ' * self.sangria + json.dumps(nombre, ensure_ascii=False) + ': ')
+        self._secciones += 1
+
+    # ========== SECCIONES ==========
+
+    def escribir(self, nombre: str, valor: Any):
+        """Sección con un valor ya construido (p. ej. metadata)"""
+        self._abrir_seccion(nombre)
+        self._f.write(self._json(valor, 1))
+
+    def escribir_objeto(self, nombre: str, items: Iterable[Tuple[str, Any]]) -> int:
+        """Sección objeto a partir de pares (clave, valor); devuelve cuántos"""
+        self._abrir_seccion(nombre)
+        return self._escribir_contenedor('{', '}', (
+            json.dumps(clave, ensure_ascii=False) + ': ' + self._json(valor, 2) for clave, valor in items
+        ))
+
+    def escribir_lista(self, nombre: str, valores: Iterable[Any]) -> int:
+        """Sección lista a partir de un iterable de valores; devuelve cuántos"""
+        self._abrir_seccion(nombre)
+        return self._escribir_contenedor('[', ']', (self._json(valor, 2) for valor in valores))
+
+    def _escribir_contenedor(self, apertura: str, cierre: str, elementos: Iterable[str]) -> int:
+        prefijo = '\n' + ' ' * (2 * self.sangria)
+        self._f.write(apertura)
+        n = 0
+        for elemento in elementos:
+            self._f.write((',' if n else '') + prefijo + elemento)
+            n += 1
+        self._f.write(('\n' + ' ' * self.sangria if n else '') + cierre)
+        return n
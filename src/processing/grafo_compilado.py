@@ -0,0 +1,410 @@
+import os
+import sys
+import json
+import mmap
+import struct
+import logging
+import tempfile
+from array import array
+from functools import lru_cache
+from pathlib import Path
+from collections.abc import Mapping, Sequence
+from typing import Dict, List, Any, Callable, Iterable, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'VETKG\x00\x00\x01'
+VERSION = 1
+SECCIONES = ('medicamentos', 'enfermedades', 'relaciones')
+
+# Cabecera: magic, versión, nº de secciones
+_CABECERA = struct.Struct('<8sII')
+# Directorio por sección: nombre, nº registros, offsets de (orden, claves_idx, claves, valores_idx, valores)
+_SECCION = struct.Struct('<16sQQQQQQ')
+# Registros decodificados que se guardan por proceso (los más consultados en ranking)
+CACHE_REGISTROS = 4096
+
+
+def ruta_compilada(grafo_path) -> Path:
+    """mapeo_enfermedades_medicamentos.json -> mapeo_enfermedades_medicamentos.kgbin"""
+    return Path(grafo_path).with_suffix('.kgbin')
+
+
+def esta_actualizado(grafo_path) -> bool:
+    """El binario existe y es posterior al JSON del que sale"""
+    binario = ruta_compilada(grafo_path)
+    try:
+        return binario.stat().st_mtime >= Path(grafo_path).stat().st_mtime
+    except FileNotFoundError:
+        return False
+
+
+# ========== ESCRITURA ==========
+
+def _alinear(f, multiplo: int = 8):
+    relleno = -f.tell() % multiplo
+    if relleno:
+        f.write(b'\x00' * relleno)
+
+
+def _escribir_tabla(f, blobs: List[bytes]) -> Tuple[int, int]:
+    """Escribe la tabla de offsets (n+1 uint64) y los blobs concatenados; devuelve ambas posiciones"""
+    _alinear(f)
+    pos_idx = f.tell()
+    offset = 0
+    offsets = [0]
+    for blob in blobs:
+        offset += len(blob)
+        offsets.append(offset)
+    f.write(struct.pack(f'<{len(offsets)}Q', *offsets))
+    pos_blob = f.tell()
+    for blob in blobs:
+        f.write(blob)
+    return pos_idx, pos_blob
+
+
+def _codificar(valor: Any) -> bytes:
+    """bytes tal cual, array con sus bytes little-endian y el resto como JSON UTF-8"""
+    if isinstance(valor, (bytes, bytearray)):
+        return bytes(valor)
+    if isinstance(valor, array):
+        if sys.byteorder != 'little':
+            valor = array(valor.typecode, valor)
+            valor.byteswap()
+        return valor.tobytes()
+    return json.dumps(valor, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _escribir_registros(f, valores: Iterable[Any]) -> Tuple[int, int, int]:
+    """Escribe cada registro según llega y después su tabla de offsets.
+
+    Solo se acumulan los offsets (8 bytes por registro), no los registros: una
+    sección puede venir de un generador. Devuelve (tabla, datos, nº registros).
+    """
+    _alinear(f)
+    pos_blob = f.tell()
+    offsets = array('Q', [0])
+    for valor in valores:
+        f.write(_codificar(valor))
+        offsets.append(f.tell() - pos_blob)
+    if sys.byteorder != 'little':
+        offsets.byteswap()
+    _alinear(f)
+    pos_idx = f.tell()
+    f.write(offsets.tobytes())
+    return pos_idx, pos_blob, len(offsets) - 1
+
+
+def _escribir_seccion(f, nombre: str, datos) -> bytes:
+    """Escribe una sección (Mapping con claves o iterable de registros) y devuelve su entrada de directorio"""
+    if isinstance(datos, Mapping):
+        claves = [clave.encode('utf-8') for clave in datos]
+        valores = datos.values()
+    else:
+        claves = []
+        valores = datos
+
+    pos_orden = pos_claves_idx = pos_claves = 0
+    if claves:
+        _alinear(f)
+        pos_orden = f.tell()
+        orden = sorted(range(len(claves)), key=claves.__getitem__)
+        f.write(struct.pack(f'<{len(orden)}I', *orden))
+        pos_claves_idx, pos_claves = _escribir_tabla(f, claves)
+    pos_valores_idx, pos_valores, n = _escribir_registros(f, valores)
+
+    return _SECCION.pack(nombre.encode('ascii'), n, pos_orden,
+                         pos_claves_idx, pos_claves, pos_valores_idx, pos_valores)
+
+
+def compilar(grafo: Dict[str, Any], salida, indices: bool = True) -> Path:
+    """Serializa el grafo a un binario de solo lectura con tablas de offsets.
+
+    Cada sección guarda sus registros como JSON UTF-8 en el orden original, con
+    una tabla de offsets para acceder al registro i sin leer los demás. Las
+    secciones con clave guardan además las claves y una permutación ordenada
+    (uint32) para buscar por clave con búsqueda binaria sobre el propio fichero.
+    `relaciones` puede ser un iterable cualquiera (p. ej. un generador sobre un
+    JSONL): se escribe en streaming. La escritura es atómica (temporal + rename).
+
+    Con `indices`, detrás van los índices de búsqueda que solo dependen del
+    grafo (ver processing.indices_compilados): los procesos que abren el
+    binario los usan sin construirlos.
+    """
+    constructor = None
+    if indices:
+        # Import aquí: indices_compilados usa los lectores de este módulo
+        from processing.indices_compilados import ConstructorIndices, SECCIONES_INDICES
+        constructor = ConstructorIndices(grafo.get('medicamentos') or {}, grafo.get('enfermedades') or {})
+    nombres = SECCIONES + (SECCIONES_INDICES if constructor else ())
+
+    salida = Path(salida)
+    salida.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=salida.parent, prefix=salida.name, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(_CABECERA.pack(MAGIC, VERSION, len(nombres)))
+            pos_directorio = f.tell()
+            f.write(b'\x00' * _SECCION.size * len(nombres))
+
+            directorio = []
+            for nombre in SECCIONES:
+                datos = grafo.get(nombre)
+                if datos is None:
+                    datos = {} if nombre != 'relaciones' else []
+                if nombre == 'relaciones' and constructor:
+                    # El ranking pondera cada arista según pasa: no hace falta una segunda lectura
+                    datos = map(constructor.relacion, datos)
+                directorio.append(_escribir_seccion(f, nombre, datos))
+            if constructor:
+                secciones = constructor.secciones()
+                for nombre in SECCIONES_INDICES:
+                    directorio.append(_escribir_seccion(f, nombre, secciones[nombre]))
+
+            f.seek(pos_directorio)
+            f.write(b''.join(directorio))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, salida)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+    logger.info(f"🧱 Grafo compilado en {salida} ({salida.stat().st_size / 1024:.0f} KB)")
+    return salida
+
+
+def compilar_desde_json(grafo_path, salida=None, indices: bool = True) -> Path:
+    with open(grafo_path, 'r', encoding='utf-8') as f:
+        grafo = json.load(f)
+    return compilar(grafo, salida or ruta_compilada(grafo_path), indices)
+
+
+# Decodificadores de registros que no son JSON (ver _codificar)
+def texto(crudo: memoryview) -> str:
+    return str(crudo, 'utf-8')
+
+
+def entero(crudo: memoryview) -> int:
+    """Bitset guardado como entero little-endian"""
+    return int.from_bytes(crudo, 'little')
+
+
+def bytes_bitset(bits: int) -> bytes:
+    return bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+
+
+# ========== LECTURA ==========
+
+class _Seccion:
+    """Vista de una sección sobre el mmap: solo tablas de offsets (memoryview), sin copiar datos"""
+
+    def __init__(self, buffer: memoryview, n: int, pos_orden: int, pos_claves_idx: int,
+                 pos_claves: int, pos_valores_idx: int, pos_valores: int):
+        self.n = n
+        self._buffer = buffer
+        self._valores_idx = buffer[pos_valores_idx:pos_valores_idx + 8 * (n + 1)].cast('Q')
+        self._pos_valores = pos_valores
+        self.con_claves = bool(pos_orden)
+        if self.con_claves:
+            self._orden = buffer[pos_orden:pos_orden + 4 * n].cast('I')
+            self._claves_idx = buffer[pos_claves_idx:pos_claves_idx + 8 * (n + 1)].cast('Q')
+            self._pos_claves = pos_claves
+        self.registro = lru_cache(maxsize=CACHE_REGISTROS)(self._decodificar)
+
+    def crudo(self, i: int) -> memoryview:
+        """Bytes del registro i sin copiar (vista sobre el mmap)"""
+        return self._buffer[self._pos_valores + self._valores_idx[i]:self._pos_valores + self._valores_idx[i + 1]]
+
+    def _decodificar(self, i: int) -> Any:
+        return json.loads(self.crudo(i).tobytes())
+
+    def clave_bytes(self, i: int) -> bytes:
+        return self._buffer[self._pos_claves + self._claves_idx[i]:
+                            self._pos_claves + self._claves_idx[i + 1]].tobytes()
+
+    def clave(self, i: int) -> str:
+        return self.clave_bytes(i).decode('utf-8')
+
+    def buscar(self, clave: str) -> int:
+        """Posición del registro con esa clave (búsqueda binaria sobre la permutación ordenada), -1 si no está"""
+        objetivo = clave.encode('utf-8')
+        lo, hi = 0, self.n
+        while lo < hi:
+            medio = (lo + hi) // 2
+            actual = self.clave_bytes(self._orden[medio])
+            if actual < objetivo:
+                lo = medio + 1
+            elif actual > objetivo:
+                hi = medio
+            else:
+                return self._orden[medio]
+        return -1
+
+
+def _lectores(seccion: _Seccion, decodificar) -> Tuple[Callable[[int], Any], Callable[[int], Any]]:
+    """(acceso puntual, recorrido). Los recorridos completos (validación, índices)
+    no pasan por la caché: dejarían en cada proceso una copia decodificada de la sección."""
+    if decodificar is None:
+        return seccion.registro, seccion._decodificar
+    leer = lambda i: decodificar(seccion.crudo(i))
+    return leer, leer
+
+
+class RegistrosCompilados(Mapping):
+    """Mapping de solo lectura clave -> registro; decodifica bajo demanda.
+
+    Los registros son JSON salvo que se indique `decodificar`, que recibe los
+    bytes del registro (p. ej. `entero` para bitsets).
+    """
+
+    def __init__(self, seccion: _Seccion, decodificar: Optional[Callable[[memoryview], Any]] = None):
+        self._seccion = seccion
+        self._registro, self._recorrido = _lectores(seccion, decodificar)
+
+    def __getitem__(self, clave: str) -> Dict:
+        if not isinstance(clave, str):
+            raise KeyError(clave)
+        i = self._seccion.buscar(clave)
+        if i < 0:
+            raise KeyError(clave)
+        return self._registro(i)
+
+    def __contains__(self, clave) -> bool:
+        return isinstance(clave, str) and self._seccion.buscar(clave) >= 0
+
+    def __iter__(self) -> Iterator[str]:
+        return (self._seccion.clave(i) for i in range(self._seccion.n))
+
+    def __len__(self) -> int:
+        return self._seccion.n
+
+    def values(self):
+        return (self._recorrido(i) for i in range(self._seccion.n))
+
+    def items(self):
+        return ((self._seccion.clave(i), self._recorrido(i)) for i in range(self._seccion.n))
+
+
+class ListaCompilada(Sequence):
+    """Secuencia de solo lectura (relaciones) sobre el mmap; `decodificar` como en RegistrosCompilados"""
+
+    def __init__(self, seccion: _Seccion, decodificar: Optional[Callable[[memoryview], Any]] = None):
+        self._seccion = seccion
+        self._registro, self._recorrido = _lectores(seccion, decodificar)
+
+    def __iter__(self) -> Iterator[Any]:
+        return (self._recorrido(i) for i in range(self._seccion.n))
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += self._seccion.n
+        if not 0 <= i < self._seccion.n:
+            raise IndexError(i)
+        return self._registro(i)
+
+    def __len__(self) -> int:
+        return self._seccion.n
+
+
+class ClavesCompiladas(Sequence):
+    """Claves de una sección en el orden en que se escribieron"""
+
+    def __init__(self, seccion: _Seccion):
+        self._seccion = seccion
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += self._seccion.n
+        if not 0 <= i < self._seccion.n:
+            raise IndexError(i)
+        return self._seccion.clave(i)
+
+    def __len__(self) -> int:
+        return self._seccion.n
+
+
+class PosicionesCompiladas(Mapping):
+    """Mapping clave -> posición de su registro en la sección"""
+
+    def __init__(self, seccion: _Seccion):
+        self._seccion = seccion
+
+    def __getitem__(self, clave: str) -> int:
+        i = self._seccion.buscar(clave) if isinstance(clave, str) else -1
+        if i < 0:
+            raise KeyError(clave)
+        return i
+
+    def __iter__(self) -> Iterator[str]:
+        return (self._seccion.clave(i) for i in range(self._seccion.n))
+
+    def __len__(self) -> int:
+        return self._seccion.n
+
+
+class GrafoCompilado:
+    """Grafo de conocimiento mapeado en memoria, de solo lectura.
+
+    Todos los procesos que abren el mismo fichero comparten sus páginas físicas
+    (caché de páginas del sistema operativo). Abrirlo solo lee la cabecera:
+    los registros se decodifican al accederlos.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buffer = memoryview(self._mmap)
+
+        magic, version, n_secciones = _CABECERA.unpack_from(buffer, 0)
+        if magic != MAGIC or version != VERSION:
+            buffer.release()
+            self._mmap.close()
+            raise ValueError(f"{self.path} no es un grafo compilado compatible")
+
+        self.secciones: Dict[str, _Seccion] = {}
+        for k in range(n_secciones):
+            campos = _SECCION.unpack_from(buffer, _CABECERA.size + k * _SECCION.size)
+            nombre = campos[0].rstrip(b'\x00').decode('ascii')
+            self.secciones[nombre] = _Seccion(buffer, *campos[1:])
+
+        self.medicamentos = RegistrosCompilados(self.secciones['medicamentos'])
+        self.enfermedades = RegistrosCompilados(self.secciones['enfermedades'])
+        self.relaciones = ListaCompilada(self.secciones['relaciones'])
+
+        logger.info(f"🧱 Grafo compilado abierto: {len(self.medicamentos)} medicamentos | "
+                    f"{len(self.enfermedades)} enfermedades | {len(self.relaciones)} relaciones")
+
+    # Acceso a cualquier sección (KeyError si el binario no la tiene)
+    def registros(self, nombre: str, decodificar=None) -> RegistrosCompilados:
+        return RegistrosCompilados(self.secciones[nombre], decodificar)
+
+    def lista(self, nombre: str, decodificar=None) -> ListaCompilada:
+        return ListaCompilada(self.secciones[nombre], decodificar)
+
+    def claves(self, nombre: str) -> ClavesCompiladas:
+        return ClavesCompiladas(self.secciones[nombre])
+
+    def posiciones(self, nombre: str) -> PosicionesCompiladas:
+        return PosicionesCompiladas(self.secciones[nombre])
+
+    def array(self, nombre: str, tipo: str) -> memoryview:
+        """Sección de un único registro escrito como array('tipo'): vista tipada sin copia"""
+        return self.secciones[nombre].crudo(0).cast(tipo)
+
+
+def abrir_si_actualizado(grafo_path) -> Optional[GrafoCompilado]:
+    """Grafo compilado junto al JSON si existe y está al día (None en otro caso)"""
+    if not esta_actualizado(grafo_path):
+        return None
+    try:
+        return GrafoCompilado(ruta_compilada(grafo_path))
+    except (OSError, ValueError, struct.error) as e:
+        logger.warning(f"⚠️ No se pudo abrir el grafo compilado, se usa el JSON: {e}")
+        return None
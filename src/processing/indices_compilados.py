@@ -0,0 +1,63 @@
+"""
+ÍNDICES DE BÚSQUEDA COMPILADOS EN EL .kgbin
+
+Los índices que solo dependen del grafo se calculan una vez al compilarlo y se
+guardan como secciones más del mismo binario:
+    pri_*   PrincipiosIndex: nombres canónicos, ids e índice inverso
+    cat_*   CatalogoIndex: postings por token y facetas, como bitsets
+    rank_*  MedicamentosRanking: factor comercial y adyacencia ponderada
+    ac_*    Autocompletado de medicamentos y principios: arrays ordenados
+
+Cada proceso que abre el binario los usa con `desde_compilado` sobre el mmap,
+sin recorrer el catálogo. Lo que depende de otros ficheros (categorías, tabla
+de dosis, overlay de relaciones, términos de síntomas del loader) se sigue
+calculando en el proceso sobre estos índices.
+"""
+
+from typing import Dict, Any
+
+from processing.principios_index import PrincipiosIndex
+from processing.catalogo_index import CatalogoIndex
+from processing.medicamentos_ranking import MedicamentosRanking
+from processing.autocompletado import Autocompletado, SECCIONES_TIPO
+
+# Se incrementa cuando cambia el formato o la forma de calcular algún índice
+VERSION_INDICES = 1
+
+SECCIONES_INDICES = (
+    ('indices', 'pri_nombres', 'pri_originales', 'pri_frecuencia', 'pri_por_med',
+     'cat_tokens', 'cat_facetas', 'rank_factor', 'rank_aristas')
+    + tuple(f'{prefijo}_{campo}' for prefijo in SECCIONES_TIPO.values()
+            for campo in ('textos', 'pesos', 'claves', 'posic', 'inter', 'top'))
+)
+
+
+class ConstructorIndices:
+    """Calcula en la compilación los índices de un grafo.
+
+    Medicamentos y enfermedades llegan enteros; las relaciones se pasan una a
+    una por `relacion` mientras se escriben (pueden venir de un generador).
+    """
+
+    def __init__(self, medicamentos: Dict, enfermedades: Dict):
+        self.medicamentos = medicamentos
+        self.principios_index = PrincipiosIndex(medicamentos, {})
+        self.ranking = MedicamentosRanking(medicamentos, enfermedades, [])
+
+    def relacion(self, rel: Dict) -> Dict:
+        return self.ranking.anadir_relacion(rel)
+
+    def secciones(self) -> Dict[str, Any]:
+        secciones = {'indices': [{'version': VERSION_INDICES}]}
+        secciones.update(self.principios_index.secciones_compiladas(self.medicamentos))
+        secciones.update(CatalogoIndex(self.medicamentos).secciones_compiladas())
+        secciones.update(self.ranking.secciones_compiladas())
+        secciones.update(Autocompletado(self.medicamentos, self.principios_index).secciones_compiladas())
+        return secciones
+
+
+def tiene_indices(grafo) -> bool:
+    """El binario trae todas las secciones de índices y en la versión actual"""
+    if not all(nombre in grafo.secciones for nombre in SECCIONES_INDICES):
+        return False
+    return grafo.lista('indices')[0].get('version') == VERSION_INDICES
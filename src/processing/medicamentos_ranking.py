@@ -0,0 +1,162 @@
+import copy
+import heapq
+import logging
+from typing import Dict, List, Tuple, Optional, FrozenSet
+
+from processing.principios_index import normalizar_texto
+
+logger = logging.getLogger(__name__)
+
+# Peso de un medicamento autorizado pero sin comercializar (no se encuentra en farmacia)
+FACTOR_NO_COMERCIALIZADO = 0.5
+# Fuerza por defecto si la enfermedad solo trae `medicamentos_asociados` sin aristas
+FUERZA_SIN_ARISTA = 0.5
+
+
+def clave_canonica(enf_key: str) -> str:
+    """El grafo usa 'Otitis externa_Perro' y el loader 'Otitis_externa_Perro'"""
+    return (enf_key or '').replace(' ', '_')
+
+
+def especie_compatible(especie_med: str, especie: str) -> bool:
+    """Mismo criterio de seguridad que el flujo de chat original"""
+    especie_med = (especie_med or '').upper()
+    especie = (especie or '').upper()
+    return (especie in especie_med or "AMBOS" in especie_med
+            or ("PERRO" in especie_med and "GATO" in especie_med))
+
+
+class MedicamentosRanking:
+    """Ranking global de medicamentos sobre todas las enfermedades detectadas.
+
+    Cada arista enfermedad -> medicamento de `relaciones` se pondera en la carga:
+    fuerza (fracción de principios del medicamento que coinciden con la
+    enfermedad) x estado de comercialización. En consulta se acumula
+    confianza_enfermedad x peso_arista por medicamento (sin duplicados) y se
+    eligen los k mejores con un heap.
+    """
+
+    def __init__(self, medicamentos: Dict, enfermedades: Dict, relaciones: List[Dict]):
+        self.medicamentos = medicamentos
+
+        # Factor de comercialización precalculado: anulados fuera, no comercializados a la mitad
+        self.factor_comercial: Dict[str, float] = {}
+        for med_id, med in medicamentos.items():
+            if med.get('estado', '').lower() == 'anulado':
+                factor = 0.0
+            elif med.get('fecha_comercializado', 'Si') != 'Si':
+                factor = FACTOR_NO_COMERCIALIZADO
+            else:
+                factor = 1.0
+            self.factor_comercial[med_id] = factor
+
+        # Lista de adyacencia ponderada: enfermedad -> {medicamento: peso}
+        self.aristas: Dict[str, Dict[str, float]] = {}
+        for rel in relaciones:
+            self.anadir_relacion(rel)
+
+        self.clave_por_nombre = self._claves_por_nombre(enfermedades)
+
+        logger.info(f"📈 Ranking de medicamentos: {len(self.aristas)} enfermedades | "
+                    f"{sum(len(a) for a in self.aristas.values())} aristas ponderadas")
+
+    @classmethod
+    def desde_compilado(cls, grafo, enfermedades: Dict) -> 'MedicamentosRanking':
+        """Ranking sobre las secciones rank_* del .kgbin (ver secciones_compiladas).
+
+        Factores y adyacencias se decodifican del mmap compartido al consultarlos.
+        Las aristas del overlay se aplican después con `con_enfermedad`.
+        """
+        ranking = cls.__new__(cls)
+        ranking.medicamentos = grafo.medicamentos
+        ranking.factor_comercial = grafo.registros('rank_factor')
+        ranking.aristas = grafo.registros('rank_aristas')
+        ranking.clave_por_nombre = cls._claves_por_nombre(enfermedades)
+        return ranking
+
+    def secciones_compiladas(self) -> Dict[str, Dict]:
+        return {'rank_factor': self.factor_comercial, 'rank_aristas': self.aristas}
+
+    @staticmethod
+    def _claves_por_nombre(enfermedades: Dict) -> Dict[Tuple[str, str], str]:
+        """(nombre, especie) -> enfermedad, para las consultas por nombre"""
+        claves: Dict[Tuple[str, str], str] = {}
+        for enf_key, enf in enfermedades.items():
+            nombre = normalizar_texto(enf.get('nombre', ''))
+            especie = normalizar_texto(enf.get('especie', ''))
+            claves.setdefault((nombre, especie), clave_canonica(enf_key))
+        return claves
+
+    def anadir_relacion(self, rel: Dict) -> Dict:
+        """Pondera una arista de `relaciones` y la añade al ranking (devuelve la arista)"""
+        self._anadir_arista(self.aristas, rel)
+        return rel
+
+    def _anadir_arista(self, aristas: Dict[str, Dict[str, float]], rel: Dict):
+        med_id = rel.get('hacia_medicamento')
+        med = self.medicamentos.get(med_id)
+        if not med:
+            return
+        n_principios = len(med.get('principios_activos', [])) or 1
+        fuerza = min(1.0, len(rel.get('principios_coincidentes', [])) / n_principios)
+        peso = fuerza * self.factor_comercial[med_id]
+        if peso <= 0:
+            return
+        adyacencia = aristas.setdefault(clave_canonica(rel.get('desde_enfermedad')), {})
+        adyacencia[med_id] = max(peso, adyacencia.get(med_id, 0.0))
+
+    def con_enfermedad(self, enf_key: str, relaciones: List[Dict],
+                       enfermedad: Optional[Dict] = None) -> 'MedicamentosRanking':
+        """Copia del ranking con la adyacencia de UNA enfermedad sustituida.
+
+        Solo se copian los diccionarios de primer nivel; el resto de listas de
+        adyacencia se comparten con el original, que no se modifica.
+        """
+        copia = copy.copy(self)
+        clave = clave_canonica(enf_key)
+        copia.aristas = {k: v for k, v in self.aristas.items() if k != clave}
+        for rel in relaciones:
+            copia._anadir_arista(copia.aristas, {**rel, 'desde_enfermedad': clave})
+        if enfermedad:
+            copia.clave_por_nombre = dict(self.clave_por_nombre)
+            copia.clave_por_nombre.setdefault(
+                (normalizar_texto(enfermedad.get('nombre', '')), normalizar_texto(enfermedad.get('especie', ''))),
+                clave
+            )
+        return copia
+
+    def clave_enfermedad(self, nombre: str, especie: str) -> Optional[str]:
+        """Clave canónica de la enfermedad a partir de su nombre y especie"""
+        return self.clave_por_nombre.get((normalizar_texto(nombre), normalizar_texto(especie)))
+
+    def peso(self, med_id: str, enf_key: str) -> float:
+        """Peso de la arista enfermedad -> medicamento (0 si no existe)"""
+        return self.aristas.get(clave_canonica(enf_key), {}).get(med_id, 0.0)
+
+    def rankear(self, enfermedades: List[Tuple[str, float, List[str]]], especie: str, k: int = 10,
+                excluidos: FrozenSet[str] = frozenset()) -> List[Tuple[str, float, List[str]]]:
+        """Top-k global (med_id, puntuación, claves de enfermedad que lo aportan).
+
+        `enfermedades` es una lista de (enf_key, confianza, medicamentos_asociados);
+        los asociados solo se usan si la enfermedad no tiene aristas en el grafo.
+        """
+        puntuaciones: Dict[str, float] = {}
+        origen: Dict[str, List[str]] = {}
+
+        for enf_key, confianza, asociados in enfermedades:
+            adyacencia = self.aristas.get(clave_canonica(enf_key))
+            if adyacencia is None:
+                adyacencia = {med_id: FUERZA_SIN_ARISTA * self.factor_comercial.get(med_id, 0.0)
+                              for med_id in asociados or []}
+            for med_id, peso in adyacencia.items():
+                if peso <= 0 or med_id in excluidos:
+                    continue
+                med = self.medicamentos.get(med_id)
+                if not med or not especie_compatible(med.get('especie'), especie):
+                    continue
+                puntuaciones[med_id] = puntuaciones.get(med_id, 0.0) + confianza * peso
+                origen.setdefault(med_id, []).append(enf_key)
+
+        # Empates resueltos por id para que el resultado no dependa del orden del JSON
+        mejores = heapq.nlargest(k, puntuaciones.items(), key=lambda item: (item[1], item[0]))
+        return [(med_id, round(score, 4), origen[med_id]) for med_id, score in mejores]
@@ -0,0 +1,239 @@
+import re
+import logging
+import unicodedata
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from typing import Dict, List, Any, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Sales, ésteres e hidratos que CIMAVet añade al nombre del principio activo
+# ("DEXAMETASONA FOSFATO SODIO", "AMOXICILINA TRIHIDRATO"...)
+SUFIJOS_SAL = {
+    'fosfato', 'sodio', 'sodica', 'sodico', 'disodico', 'potasio', 'potasico', 'calcio', 'calcica',
+    'magnesio', 'hidrocloruro', 'clorhidrato', 'hidrobromuro', 'bromhidrato', 'monohidrato',
+    'dihidrato', 'trihidrato', 'hidrato', 'anhidro', 'anhidra', 'maleato', 'embonato', 'pamoato',
+    'acetato', 'citrato', 'tartrato', 'nitrato', 'sulfato', 'hiclato', 'mesilato', 'besilato',
+    'succinato', 'propionato', 'dipropionato', 'valerato', 'fumarato', 'lactato', 'gluconato',
+    'estearato', 'bromuro', 'cloruro', 'sal', 'base',
+}
+
+# Longitud mínima para aceptar una coincidencia por prefijo ("FIPRONIL" -> "Fipronilo")
+MIN_PREFIJO = 5
+
+
+def normalizar_texto(texto: str) -> str:
+    """Minúsculas, sin acentos y con espacios colapsados"""
+    texto = unicodedata.normalize('NFKD', texto or '')
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return ' '.join(texto.lower().split())
+
+
+def normalizar_principio(texto: str) -> str:
+    """Forma canónica de un principio activo: sin acentos, paréntesis ni sufijos de sal"""
+    texto = normalizar_texto(re.sub(r'\(.*?\)', ' ', texto or ''))
+    palabras = re.sub(r'[^a-z0-9\- ]', ' ', texto).split()
+    base = [p for p in palabras if p not in SUFIJOS_SAL]
+    # "SODIO CLORURO" es el principio en sí: no dejarlo vacío
+    return ' '.join(base or palabras)
+
+
+class PrincipiosIndex:
+    """Índice denso principio activo -> id -> categoría terapéutica.
+
+    La normalización (acentos, mayúsculas, sufijos de sal y coincidencia por
+    prefijo) se hace una única vez en la carga para todos los principios del
+    catálogo. Después, cualquier consulta de categoría es un acceso a diccionario.
+    """
+
+    def __init__(self, medicamentos: Dict, categorias: Dict[str, str]):
+        self._preparar_categorias(categorias)
+        # Ids de principio de cada medicamento; solo los trae el índice compilado
+        self._pids_por_medicamento = None
+
+        # Tabla densa de principios: id -> nombre canónico / categoría
+        self.nombres: List[str] = []
+        self.categoria_por_id: List[Optional[str]] = []
+        self.id_por_nombre: Dict[str, int] = {}
+        # Atajo para el texto exacto del catálogo ("IMIDACLOPRID" -> id)
+        self.id_por_original: Dict[str, int] = {}
+        # Índice inverso: id de principio -> medicamentos que lo contienen
+        self.medicamentos_por_id: List[List[str]] = []
+
+        self._frecuencia = Counter()
+        for med_id, med in medicamentos.items():
+            for principio in med.get('principios_activos', []):
+                pid = self.registrar(principio)
+                self._frecuencia[pid] += 1
+                meds = self.medicamentos_por_id[pid]
+                if not meds or meds[-1] != med_id:
+                    meds.append(med_id)
+
+        self._total_medicamentos = len(medicamentos)
+        self._contar_cobertura(medicamentos)
+
+    @classmethod
+    def desde_compilado(cls, grafo, categorias: Dict[str, str]) -> 'PrincipiosIndex':
+        """Índice sobre las secciones pri_* del .kgbin (ver secciones_compiladas).
+
+        Nombres, ids e índice inverso se leen del mmap compartido; solo la
+        categoría de cada principio se resuelve aquí, porque depende de
+        categorias_medicamentos.json y no del grafo.
+        """
+        indice = cls.__new__(cls)
+        indice._preparar_categorias(categorias)
+        indice.nombres = grafo.claves('pri_nombres')
+        indice.id_por_nombre = grafo.posiciones('pri_nombres')
+        indice.id_por_original = grafo.registros('pri_originales')
+        indice.medicamentos_por_id = grafo.lista('pri_nombres')
+        indice._pids_por_medicamento = grafo.lista('pri_por_med', lambda crudo: crudo.cast('I'))
+        indice._frecuencia = Counter(dict(enumerate(grafo.array('pri_frecuencia', 'I'))))
+
+        indice.categoria_por_id = []
+        for nombre in indice.nombres:
+            clave = indice._resolver_clave(nombre)
+            indice.categoria_por_id.append(indice._categoria_por_nombre[clave] if clave else None)
+            if clave:
+                indice._claves_usadas.add(clave)
+
+        indice._total_medicamentos = len(grafo.medicamentos)
+        indice._contar_cobertura(grafo.medicamentos)
+        return indice
+
+    def secciones_compiladas(self, medicamentos: Dict) -> Dict[str, Any]:
+        """Secciones del .kgbin con lo que no depende de las categorías (por id de principio)"""
+        return {
+            'pri_nombres': dict(zip(self.nombres, self.medicamentos_por_id)),
+            'pri_originales': self.id_por_original,
+            'pri_frecuencia': [array('I', (self._frecuencia[pid] for pid in range(len(self.nombres))))],
+            'pri_por_med': (array('I', (self.id_por_original[p] for p in med.get('principios_activos', [])))
+                            for med in medicamentos.values()),
+        }
+
+    # ========== CONSTRUCCIÓN ==========
+
+    def _preparar_categorias(self, categorias: Dict[str, str]):
+        # Categorías canónicas ordenadas para buscar por prefijo con bisect
+        self._categoria_por_nombre: Dict[str, str] = {}
+        for nombre, categoria in (categorias or {}).items():
+            self._categoria_por_nombre.setdefault(normalizar_principio(nombre), categoria)
+        self._nombres_categoria = sorted(self._categoria_por_nombre)
+        self._claves_usadas = set()
+
+    def _contar_cobertura(self, medicamentos):
+        self._medicamentos_con_categoria = sum(1 for _, c in self.categorias_por_medicamento(medicamentos) if c)
+
+        informe = self.informe_cobertura()
+        logger.info(f"🧪 Principios activos indexados: {informe['total_principios']} | "
+                    f"con categoría: {informe['principios_con_categoria']} "
+                    f"({informe['porcentaje_medicamentos']}% de medicamentos)")
+
+    def _resolver_clave(self, nombre: str) -> Optional[str]:
+        """Nombre de categorias_medicamentos.json que corresponde (exacto o por prefijo)"""
+        if not nombre:
+            return None
+        if nombre in self._categoria_por_nombre:
+            return nombre
+
+        # Candidatos vecinos en el orden alfabético: la clave empieza por el
+        # nombre ("fipronil" -> "fipronilo") o el nombre empieza por la clave
+        pos = bisect_left(self._nombres_categoria, nombre)
+        if len(nombre) >= MIN_PREFIJO and pos < len(self._nombres_categoria):
+            candidato = self._nombres_categoria[pos]
+            if candidato.startswith(nombre):
+                return candidato
+        if pos > 0:
+            candidato = self._nombres_categoria[pos - 1]
+            if len(candidato) >= MIN_PREFIJO and nombre.startswith(candidato):
+                return candidato
+
+        # "milbemicina" frente a "milbemicina oxima": probar con la primera palabra
+        primera = nombre.split()[0]
+        if primera != nombre and len(primera) >= MIN_PREFIJO:
+            return self._resolver_clave(primera)
+        return None
+
+    def _resolver_categoria(self, nombre: str) -> Optional[str]:
+        clave = self._resolver_clave(nombre)
+        return self._categoria_por_nombre[clave] if clave else None
+
+    def registrar(self, principio: str) -> int:
+        """Devuelve el id del principio, dándolo de alta si es nuevo"""
+        pid = self.id_por_original.get(principio)
+        if pid is not None:
+            return pid
+
+        nombre = normalizar_principio(principio)
+        pid = self.id_por_nombre.get(nombre)
+        if pid is None:
+            pid = len(self.nombres)
+            clave = self._resolver_clave(nombre)
+            self.nombres.append(nombre)
+            self.medicamentos_por_id.append([])
+            self.categoria_por_id.append(self._categoria_por_nombre[clave] if clave else None)
+            if clave:
+                self._claves_usadas.add(clave)
+            self.id_por_nombre[nombre] = pid
+        self.id_por_original[principio] = pid
+        return pid
+
+    # ========== CONSULTA ==========
+
+    def id_principio(self, principio: str) -> Optional[int]:
+        """Id denso del principio (None si no aparece en el catálogo)"""
+        pid = self.id_por_original.get(principio)
+        if pid is None:
+            pid = self.id_por_nombre.get(normalizar_principio(principio))
+        return pid
+
+    def medicamentos_con(self, principio: str) -> List[str]:
+        """Medicamentos del catálogo que contienen el principio activo"""
+        pid = self.id_principio(principio)
+        return self.medicamentos_por_id[pid] if pid is not None else []
+
+    def categoria(self, principio: str) -> Optional[str]:
+        """Categoría terapéutica de un principio activo"""
+        pid = self.id_principio(principio)
+        if pid is not None:
+            return self.categoria_por_id[pid]
+        return self._resolver_categoria(normalizar_principio(principio))
+
+    def categoria_medicamento(self, principios: List[str]) -> Optional[str]:
+        """Primera categoría conocida entre los principios activos del medicamento"""
+        for principio in principios or []:
+            categoria = self.categoria(principio)
+            if categoria:
+                return categoria
+        return None
+
+    def categorias_por_medicamento(self, medicamentos) -> Iterator[Tuple[str, Optional[str]]]:
+        """(med_id, categoría) de cada medicamento del catálogo en su orden.
+
+        Con el índice compilado se usan los ids de principio ya guardados por
+        medicamento, sin decodificar las fichas.
+        """
+        if self._pids_por_medicamento is None:
+            for med_id, med in medicamentos.items():
+                yield med_id, self.categoria_medicamento(med.get('principios_activos', []))
+            return
+        for med_id, pids in zip(medicamentos, self._pids_por_medicamento):
+            yield med_id, next((self.categoria_por_id[pid] for pid in pids if self.categoria_por_id[pid]), None)
+
+    def informe_cobertura(self, top: int = 10) -> Dict[str, Any]:
+        """Cobertura del índice: qué parte del catálogo tiene categoría"""
+        con_categoria = [pid for pid, c in enumerate(self.categoria_por_id) if c]
+        sin_categoria = [
+            (self.nombres[pid], n) for pid, n in self._frecuencia.most_common()
+            if not self.categoria_por_id[pid]
+        ]
+        total_meds = self._total_medicamentos or 1
+        return {
+            'total_principios': len(self.nombres),
+            'principios_con_categoria': len(con_categoria),
+            'total_medicamentos': self._total_medicamentos,
+            'medicamentos_con_categoria': self._medicamentos_con_categoria,
+            'porcentaje_medicamentos': round(100 * self._medicamentos_con_categoria / total_meds, 1),
+            'claves_categoria_sin_uso': sorted(set(self._nombres_categoria) - self._claves_usadas),
+            'principios_sin_categoria_frecuentes': sin_categoria[:top],
+        }
@@ -0,0 +1,102 @@
+import logging
+from typing import Dict, List, Optional, FrozenSet
+
+from processing.principios_index import PrincipiosIndex, normalizar_texto
+
+logger = logging.getLogger(__name__)
+
+
+class RazasIndex:
+    """Predisposiciones por raza precalculadas como vectores sobre enfermedades.
+
+    En la carga, cada raza de `razas_predisposiciones.json` se convierte en un
+    vector de multiplicadores alineado con el orden de las enfermedades
+    (1.0 = sin predisposición) y en un conjunto de medicamentos a excluir por
+    sus `medicamentos_precaución`. En consulta solo hay que multiplicar vectores
+    y consultar un conjunto.
+    """
+
+    def __init__(self, razas: Dict, claves_enfermedades: List[str], enfermedades: Dict,
+                 principios_index: PrincipiosIndex):
+        self.claves_enfermedades = list(claves_enfermedades)
+        self.posicion = {clave: pos for pos, clave in enumerate(self.claves_enfermedades)}
+        n = len(self.claves_enfermedades)
+
+        # nombre normalizado -> posiciones (la misma enfermedad existe para Perro y Gato)
+        posiciones_por_nombre: Dict[str, List[int]] = {}
+        for pos, clave in enumerate(self.claves_enfermedades):
+            nombre = normalizar_texto(enfermedades.get(clave, {}).get('nombre', ''))
+            posiciones_por_nombre.setdefault(nombre, []).append(pos)
+
+        self.vectores: Dict[str, List[float]] = {}
+        self.excluidos_por_raza: Dict[str, FrozenSet[str]] = {}
+        self.nombres: Dict[str, str] = {}
+        self.no_encontradas: Dict[str, List[str]] = {}
+
+        for raza, datos in (razas or {}).items():
+            clave_raza = normalizar_texto(raza)
+            self.nombres[clave_raza] = raza
+
+            vector = [1.0] * n
+            for pred in datos.get('enfermedades_predisposicion', []):
+                posiciones = self._posiciones(pred.get('enfermedad', ''), posiciones_por_nombre)
+                if not posiciones:
+                    self.no_encontradas.setdefault(raza, []).append(pred.get('enfermedad'))
+                for pos in posiciones:
+                    vector[pos] = max(vector[pos], float(pred.get('factor', 1.0)))
+            self.vectores[clave_raza] = vector
+
+            excluidos = set()
+            for principio in datos.get('medicamentos_precaución', []):
+                excluidos.update(principios_index.medicamentos_con(principio))
+            self.excluidos_por_raza[clave_raza] = frozenset(excluidos)
+
+        # Alias para buscar dentro del texto libre: "gato persa" también como "persa".
+        # Más largos primero para que gane la coincidencia más específica
+        alias = {clave: clave for clave in self.vectores}
+        for clave in self.vectores:
+            if clave.startswith('gato '):
+                alias.setdefault(clave[len('gato '):], clave)
+        self._alias = sorted(alias.items(), key=lambda item: len(item[0]), reverse=True)
+
+        logger.info(f"🐕 Razas indexadas: {len(self.vectores)} | "
+                    f"predisposiciones sin enfermedad en BD: "
+                    f"{sum(len(v) for v in self.no_encontradas.values())}")
+
+    @staticmethod
+    def _posiciones(nombre: str, posiciones_por_nombre: Dict[str, List[int]]) -> List[int]:
+        """Posiciones de la enfermedad: nombre exacto o prefijo ("Problemas respiratorios" -> "...crónicos")"""
+        nombre = normalizar_texto(nombre)
+        if not nombre:
+            return []
+        if nombre in posiciones_por_nombre:
+            return posiciones_por_nombre[nombre]
+        return [pos for candidato, lista in posiciones_por_nombre.items()
+                if candidato.startswith(nombre) for pos in lista]
+
+    def resolver_raza(self, texto: Optional[str]) -> Optional[str]:
+        """Clave de raza conocida a partir del texto libre de Groq ("bulldog francés" -> "bulldog")"""
+        if not texto:
+            return None
+        texto = normalizar_texto(str(texto))
+        if texto in self.vectores:
+            return texto
+        palabras = f" {texto} "
+        for nombre, clave in self._alias:
+            if f" {nombre} " in palabras:
+                return clave
+        return None
+
+    def multiplicadores(self, raza: Optional[str]) -> Optional[List[float]]:
+        """Vector de multiplicadores por enfermedad (None si la raza no es conocida)"""
+        return self.vectores.get(self.resolver_raza(raza)) if raza else None
+
+    def factor(self, raza: Optional[str], enf_key: str) -> float:
+        """Multiplicador de la raza para una enfermedad concreta (1.0 si no aplica)"""
+        vector = self.multiplicadores(raza)
+        pos = self.posicion.get(enf_key)
+        return vector[pos] if vector and pos is not None else 1.0
+
+    def excluidos(self, raza: Optional[str]) -> FrozenSet[str]:
+        """Medicamentos a evitar en la raza por `medicamentos_precaución`"""
+        return self.excluidos_por_raza.get(self.resolver_raza(raza), frozenset()) if raza else frozenset()
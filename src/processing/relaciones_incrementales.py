@@ -0,0 +1,147 @@
+import time
+import logging
+from pathlib import Path
+from typing import Dict, List, Any, Sequence, Tuple
+
+from processing.principios_index import PrincipiosIndex, normalizar_texto
+from processing.medicamentos_ranking import clave_canonica
+
+logger = logging.getLogger(__name__)
+
+# Aristas recalculadas desde el panel de administración, junto al grafo principal
+NOMBRE_OVERLAY = 'relaciones_enfermedades_admin.json'
+SECCION_OVERLAY = 'relaciones_enfermedad'
+
+
+def ruta_overlay(grafo_path) -> Path:
+    """mapeo_enfermedades_medicamentos.json -> relaciones_enfermedades_admin.json (mismo directorio)"""
+    return Path(grafo_path).with_name(NOMBRE_OVERLAY)
+
+
+def especie_admitida(especie_med: str, especie_enf: str) -> bool:
+    """Mismo criterio que el generador del grafo: especie exacta ('Ambos' admite perro y gato)"""
+    especie_med = (especie_med or '').lower()
+    especie_enf = (especie_enf or '').lower()
+    if especie_enf == 'ambos':
+        return especie_med in ('perro', 'gato', 'ambos')
+    return especie_med == especie_enf or especie_med == 'ambos'
+
+
+class CalculadorRelaciones:
+    """Calcula las aristas enfermedad -> medicamento de UNA enfermedad.
+
+    Reproduce la regla con la que se generó `relaciones`: misma especie y, por
+    cada principio recomendado, el primer principio activo del medicamento que
+    lo contiene o está contenido en él ('Dexametasona Fosfato Sodio' coincide
+    con DEXAMETASONA). Las aristas salen en orden de catálogo. No se recorre el
+    catálogo: los nombres de principio se normalizan una vez y cada coincidencia
+    lleva directamente a sus medicamentos por el índice inverso de
+    `PrincipiosIndex`. Una enfermedad cuesta O(principios del catálogo), del
+    orden de milisegundos, así que puede hacerse al guardar el formulario.
+    """
+
+    def __init__(self, medicamentos, principios_index: PrincipiosIndex):
+        self.medicamentos = medicamentos
+        self.principios_index = principios_index
+        self._posicion = {med_id: pos for pos, med_id in enumerate(medicamentos)}
+        # (texto original normalizado, id) una vez por cada forma del catálogo
+        self._originales: List[Tuple[str, int]] = [
+            (normalizar_texto(original), pid) for original, pid in principios_index.id_por_original.items()
+        ]
+
+    def principios_enfermedad(self, enfermedad: Dict[str, Any]) -> List[str]:
+        """Principios recomendados; si no hay, los de sus medicamentos asociados"""
+        principios = [p for p in enfermedad.get('principios_recomendados') or [] if p and p.strip()]
+        if principios:
+            return principios
+        vistos = {}
+        for med_id in enfermedad.get('medicamentos_asociados') or []:
+            med = self.medicamentos.get(med_id)
+            for principio in (med or {}).get('principios_activos', []):
+                vistos.setdefault(principio, None)
+        return list(vistos)
+
+    def calcular(self, enf_key: str, enfermedad: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Aristas en el mismo formato que `relaciones` del grafo principal"""
+        buscados = [normalizar_texto(p) for p in self.principios_enfermedad(enfermedad)]
+        buscados = [p for p in buscados if p]
+        if not buscados:
+            return []
+
+        # 1. Ids de principio cuyo nombre contiene alguno de los buscados o está contenido en él
+        pids = {pid for texto, pid in self._originales if texto and any(_coinciden(b, texto) for b in buscados)}
+
+        # 2. Medicamentos candidatos por el índice inverso, en orden de catálogo
+        especie = enfermedad.get('especie', '')
+        candidatos = {}
+        for pid in sorted(pids):
+            for med_id in self.principios_index.medicamentos_por_id[pid]:
+                candidatos.setdefault(med_id, None)
+
+        aristas = []
+        for med_id in sorted(candidatos, key=lambda m: self._posicion.get(m, len(self._posicion))):
+            med = self.medicamentos.get(med_id)
+            if not med or not especie_admitida(med.get('especie'), especie):
+                continue
+            principios = [(p, normalizar_texto(p)) for p in med.get('principios_activos', [])]
+            # Uno por principio recomendado (puede repetirse si dos recomendados llevan al mismo)
+            coincidentes = [p for p in (next((p for p, texto in principios if texto and _coinciden(b, texto)), None)
+                                        for b in buscados) if p is not None]
+            if not coincidentes:
+                continue
+            aristas.append({
+                "desde_enfermedad": enf_key,
+                "hacia_medicamento": med_id,
+                "tipo": "TRATA",
+                "nombre_enfermedad": enfermedad.get('nombre', ''),
+                "nombre_medicamento": med.get('nombre', ''),
+                "especie": med.get('especie', ''),
+                "principios_coincidentes": coincidentes,
+                "indicaciones": enfermedad.get('indicaciones', ''),
+                "contraindicaciones": enfermedad.get('contraindicaciones', ''),
+                "notas": enfermedad.get('notas', ''),
+            })
+        return aristas
+
+
+def _coinciden(buscado: str, texto: str) -> bool:
+    """Un nombre de principio contiene al otro (ambos normalizados)"""
+    return buscado in texto or texto in buscado
+
+
+def aplicar_overlay(relaciones: Sequence[Dict], overlay: Dict[str, List[Dict]]) -> Sequence[Dict]:
+    """Relaciones del grafo con las de cada enfermedad del overlay sustituidas por las recalculadas"""
+    if not overlay:
+        return relaciones
+    sustituidas = {clave_canonica(enf_key) for enf_key in overlay}
+    resultado = [rel for rel in relaciones
+                 if clave_canonica(rel.get('desde_enfermedad')) not in sustituidas]
+    for aristas in overlay.values():
+        resultado.extend(aristas or [])
+    return resultado
+
+
+def recalcular_enfermedad(calculador: CalculadorRelaciones, journal, enf_key: str,
+                          enfermedad: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Calcula las aristas de la enfermedad y las guarda en el overlay (una línea de journal)"""
+    return recalcular_enfermedades(calculador, journal, {enf_key: enfermedad})[enf_key]
+
+
+def recalcular_enfermedades(calculador: CalculadorRelaciones, journal,
+                            enfermedades: Dict[str, Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """Aristas de varias enfermedades guardadas en el overlay en una sola escritura"""
+    inicio = time.perf_counter()
+    aristas = {enf_key: calculador.calcular(enf_key, enfermedad) for enf_key, enfermedad in enfermedades.items()}
+    journal.guardar_lote(aristas.items())
+    logger.info(f"🔗 Relaciones de {len(aristas)} enfermedades recalculadas: "
+                f"{sum(map(len, aristas.values()))} aristas en {1000 * (time.perf_counter() - inicio):.1f} ms")
+    return aristas
+
+
+def cargar_overlay(journal) -> Dict[str, List[Dict]]:
+    """Estado del overlay; vacío si el fichero no existe o no se puede leer"""
+    try:
+        return journal.estado()
+    except Exception as e:
+        logger.error(f"❌ Error cargando relaciones recalculadas: {e}")
+        return {}
@@ -1,10 +1,26 @@
 import json
+import time
 import logging
-from typing import Dict, List, Any
+import threading
+from typing import Dict, List, Any, Optional
 from pathlib import Path
 
 # Importamos la integración con Groq que acabamos de crear
 from processing.groq_integration import GroqIntegration
+from processing.principios_index import PrincipiosIndex, normalizar_texto
+from processing.dosis_engine import DosisEngine
+from processing.razas_index import RazasIndex
+from processing.medicamentos_ranking import MedicamentosRanking
+from processing.catalogo_index import CatalogoIndex
+from processing.autocompletado import Autocompletado, TIPOS
+from processing.grafo_compilado import abrir_si_actualizado
+from processing.indices_compilados import tiene_indices
+from processing.snapshot_grafo import SnapshotGrafo, VigilanteGrafo, firma_directorio, INTERVALO_VIGILANCIA
+from processing.relaciones_incrementales import (
+    CalculadorRelaciones, aplicar_overlay, cargar_overlay, recalcular_enfermedad, ruta_overlay, SECCION_OVERLAY
+)
+from processing.validador_grafo import validar_grafo, ErrorValidacionGrafo
+from database.journal import JournalCambios
 
 # Configuración de Logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -23,6 +39,9 @@ except ImportError:
         ENFERMEDADES_DISPONIBLES = False
         logger.warning("⚠️ No se pudo cargar EnfermedadesLoader. La búsqueda será limitada.")
 
+# Medicamentos que se pasan al LLM y a la interfaz por consulta
+TOP_MEDICAMENTOS = 10
+
 class SmartRecommendationEngine:
     def __init__(self, 
                  grafo_path: str = "data/knowledge_graph/mapeo_enfermedades_medicamentos.json",
@@ -31,30 +50,172 @@ class SmartRecommendationEngine:
                  categorias_path: str = "data/knowledge_graph/categorias_medicamentos.json"):
         
         logger.info("🚀 Inicializando SmartRecommendationEngine con Cerebro Groq...")
-        
-        # 1. Cargar Datos JSON (Tu "Grafo de Conocimiento")
-        self.medicamentos, self.enfermedades_data, self.relaciones = self._cargar_grafo(grafo_path)
-        self.dosis = self._cargar_json_simple(dosis_path)
-        self.razas = self._cargar_json_simple(razas_path)
-        self.categorias = self._cargar_json_simple(categorias_path).get('categorias', {})
-        
-        # 2. Inicializar componentes inteligentes
+        self.rutas = {'grafo': grafo_path, 'dosis': dosis_path, 'razas': razas_path,
+                      'categorias': categorias_path}
+        self.directorio_datos = Path(grafo_path).parent
+        # Aristas recalculadas por enfermedad desde el panel de administración
+        self.journal_relaciones = JournalCambios(ruta_overlay(grafo_path), SECCION_OVERLAY)
+        self._lock_recarga = threading.Lock()
+        self._vigilante = None
+
+        # Inicializar componentes inteligentes (no dependen de los datos)
         self.groq = GroqIntegration()
+
+        # Datos + índices en una foto inmutable; las consultas leen self.snapshot una vez
+        self.snapshot = self._construir_snapshot(version=1)
+        self.validar()
+
+    def _construir_snapshot(self, version: int, firma=()) -> SnapshotGrafo:
+        """Carga los JSON y construye todos los índices de una versión del grafo"""
+        # 1. Cargar Datos JSON (Tu "Grafo de Conocimiento")
+        firma = firma or firma_directorio(self.directorio_datos)
+        medicamentos, enfermedades_data, relaciones, compilado = self._cargar_grafo(self.rutas['grafo'])
+        overlay = cargar_overlay(self.journal_relaciones)
+        relaciones = aplicar_overlay(relaciones, overlay)
+        dosis = self._cargar_json_simple(self.rutas['dosis'])
+        razas = self._cargar_json_simple(self.rutas['razas'])
+        categorias = self._cargar_json_simple(self.rutas['categorias']).get('categorias', {})
         
-        self.enfermedades_loader = None
+        # 2. Índices precalculados: principio activo -> categoría y tablas de dosis.
+        # Si el .kgbin los trae se abren sobre el mmap (compartido entre procesos);
+        # si no, se construyen recorriendo el catálogo.
+        indices = compilado if compilado is not None and tiene_indices(compilado) else None
+        if indices is not None:
+            principios_index = PrincipiosIndex.desde_compilado(indices, categorias)
+            medicamentos_ranking = MedicamentosRanking.desde_compilado(indices, enfermedades_data)
+            for enf_key, aristas in overlay.items():
+                medicamentos_ranking = medicamentos_ranking.con_enfermedad(enf_key, aristas or [])
+            catalogo_index = CatalogoIndex.desde_compilado(indices)
+        else:
+            principios_index = PrincipiosIndex(medicamentos, categorias)
+            medicamentos_ranking = MedicamentosRanking(medicamentos, enfermedades_data, relaciones)
+            catalogo_index = CatalogoIndex(medicamentos)
+        dosis_engine = DosisEngine(medicamentos, dosis, principios_index)
+        calculador_relaciones = CalculadorRelaciones(medicamentos, principios_index)
+
+        # 3. Loader de enfermedades
+        enfermedades_loader = None
         if ENFERMEDADES_DISPONIBLES:
-            self.enfermedades_loader = EnfermedadesLoader()
+            enfermedades_loader = EnfermedadesLoader()
             logger.info("✅ Loader de enfermedades activado y listo.")
 
+        # 4. Predisposiciones por raza, alineadas con el orden de enfermedades del loader
+        enfermedades_ref = enfermedades_loader.enfermedades if enfermedades_loader else enfermedades_data
+        razas_index = RazasIndex(razas, list(enfermedades_ref), enfermedades_ref, principios_index)
+
+        # 5. Autocompletado: medicamentos, principios activos y términos de síntomas
+        indice_sintomas = enfermedades_loader.indice_busqueda if enfermedades_loader else None
+        if indices is not None:
+            autocompletado = Autocompletado.desde_compilado(indices, indice_sintomas)
+        else:
+            autocompletado = Autocompletado(medicamentos, principios_index, indice_sintomas)
+
+        return SnapshotGrafo(
+            version=version, firma=firma,
+            medicamentos=medicamentos, enfermedades_data=enfermedades_data, relaciones=relaciones,
+            dosis=dosis, razas=razas, categorias=categorias,
+            principios_index=principios_index, dosis_engine=dosis_engine,
+            medicamentos_ranking=medicamentos_ranking, catalogo_index=catalogo_index,
+            enfermedades_loader=enfermedades_loader, razas_index=razas_index,
+            autocompletado=autocompletado, calculador_relaciones=calculador_relaciones
+        )
+
+    # ========== RECARGA EN CALIENTE ==========
+
+    def recargar(self, firma=()) -> SnapshotGrafo:
+        """Construye la siguiente foto del grafo y la publica con un cambio atómico de referencia.
+
+        Solo se serializan las recargas entre sí; las consultas en curso siguen con la
+        foto que ya tenían y las nuevas ven la nueva en cuanto se asigna.
+        """
+        with self._lock_recarga:
+            inicio = time.perf_counter()
+            nuevo = self._construir_snapshot(self.snapshot.version + 1, firma)
+            # Puerta de carga: con referencias rotas se sigue sirviendo la foto anterior
+            informe = self.validar(nuevo)
+            if not informe.valido:
+                raise ErrorValidacionGrafo(informe)
+            self.snapshot = nuevo
+            logger.info(f"🔄 Grafo recargado: versión {nuevo.version} en {time.perf_counter() - inicio:.2f}s")
+            return nuevo
+
+    def validar(self, snap: Optional[SnapshotGrafo] = None):
+        """Integridad referencial de una foto del grafo (la vigente por defecto)"""
+        snap = snap or self.snapshot
+        informe = validar_grafo(
+            snap.medicamentos, snap.enfermedades_data, snap.relaciones,
+            enfermedades_loader=snap.enfermedades_loader.enfermedades if snap.enfermedades_loader else None,
+            razas=snap.razas, categorias=snap.categorias, dosis=snap.dosis
+        )
+        if informe.valido:
+            logger.info(f"🩺 Grafo v{snap.version} validado en {informe.segundos * 1000:.0f} ms "
+                        f"({sum(informe.totales.values())} avisos)")
+        else:
+            logger.error(f"❌ {informe.resumen()}")
+        return informe
+
+    def recalcular_relaciones(self, enf_key: str, enfermedad: Dict[str, Any],
+                              guardar: bool = True) -> List[Dict[str, Any]]:
+        """Recalcula las aristas de UNA enfermedad nueva o editada y las publica.
+
+        Solo se toca la adyacencia de esa enfermedad: se guardan en el overlay
+        (si `guardar`) y se publica una foto que comparte todo lo demás con la
+        vigente. Una recarga completa posterior reaplica el overlay y da lo mismo.
+        """
+        with self._lock_recarga:
+            snap = self.snapshot
+            if guardar:
+                aristas = recalcular_enfermedad(snap.calculador_relaciones, self.journal_relaciones,
+                                                enf_key, enfermedad)
+            else:
+                aristas = snap.calculador_relaciones.calcular(enf_key, enfermedad)
+            self.snapshot = snap.reemplazar(
+                version=snap.version + 1,
+                relaciones=aplicar_overlay(snap.relaciones, {enf_key: aristas}),
+                medicamentos_ranking=snap.medicamentos_ranking.con_enfermedad(enf_key, aristas, enfermedad)
+            )
+            return aristas
+
+    def vigilar(self, intervalo: float = INTERVALO_VIGILANCIA) -> VigilanteGrafo:
+        """Arranca (una vez) el vigilante de `data/knowledge_graph/` que recarga al cambiar"""
+        if self._vigilante is None:
+            self._vigilante = VigilanteGrafo(self.directorio_datos, self.recargar, intervalo,
+                                             firma_inicial=self.snapshot.firma).iniciar()
+        return self._vigilante
+
+    # Acceso de compatibilidad a la foto vigente (motor.medicamentos, motor.catalogo_index...)
+    medicamentos = property(lambda self: self.snapshot.medicamentos)
+    enfermedades_data = property(lambda self: self.snapshot.enfermedades_data)
+    relaciones = property(lambda self: self.snapshot.relaciones)
+    dosis = property(lambda self: self.snapshot.dosis)
+    razas = property(lambda self: self.snapshot.razas)
+    categorias = property(lambda self: self.snapshot.categorias)
+    principios_index = property(lambda self: self.snapshot.principios_index)
+    dosis_engine = property(lambda self: self.snapshot.dosis_engine)
+    medicamentos_ranking = property(lambda self: self.snapshot.medicamentos_ranking)
+    catalogo_index = property(lambda self: self.snapshot.catalogo_index)
+    enfermedades_loader = property(lambda self: self.snapshot.enfermedades_loader)
+    razas_index = property(lambda self: self.snapshot.razas_index)
+    autocompletado = property(lambda self: self.snapshot.autocompletado)
+    calculador_relaciones = property(lambda self: self.snapshot.calculador_relaciones)
+
     def _cargar_grafo(self, path: str):
-        """Carga el archivo principal mapeo_enfermedades_medicamentos.json"""
+        """Carga el archivo principal mapeo_enfermedades_medicamentos.json.
+
+        Si existe su versión compilada (.kgbin) al día, se mapea en memoria en lugar
+        de parsear el JSON: los procesos comparten las páginas y no se copia nada.
+        Devuelve también el GrafoCompilado (None si se leyó el JSON) para abrir sus índices.
+        """
+        compilado = abrir_si_actualizado(path)
+        if compilado is not None:
+            return compilado.medicamentos, compilado.enfermedades, compilado.relaciones, compilado
         try:
             with open(path, 'r', encoding='utf-8') as f:
                 data = json.load(f)
-                return data.get('medicamentos', {}), data.get('enfermedades', {}), data.get('relaciones', [])
+                return data.get('medicamentos', {}), data.get('enfermedades', {}), data.get('relaciones', []), None
         except Exception as e:
             logger.error(f"❌ Error cargando grafo principal: {e}")
-            return {}, {}, []
+            return {}, {}, [], None
 
     def _cargar_json_simple(self, path: str):
         """Helper para cargar JSONs simples"""
@@ -65,6 +226,20 @@ class SmartRecommendationEngine:
             logger.error(f"❌ Error cargando {path}: {e}")
             return {}
 
+    @staticmethod
+    def _normalizar_texto(texto: str) -> str:
+        """Minúsculas y sin acentos ("Pastor Alemán" -> "pastor aleman")"""
+        return normalizar_texto(texto)
+
+    @staticmethod
+    def _peso_a_float(peso) -> Optional[float]:
+        """Groq puede devolver el peso como número, texto o null"""
+        try:
+            peso = float(str(peso).lower().replace('kg', '').replace(',', '.').strip())
+        except (TypeError, ValueError):
+            return None
+        return peso if peso > 0 else None
+
     def procesar_consulta_chat(self, texto_consulta: str) -> Dict[str, Any]:
         """
         FLUJO PRINCIPAL INTELIGENTE:
@@ -73,6 +248,8 @@ class SmartRecommendationEngine:
         3. Groq redacta la respuesta final (Datos -> Texto).
         """
         logger.info(f"🧠 Procesando consulta: {texto_consulta}")
+        # Toda la consulta trabaja sobre la misma foto del grafo aunque llegue una recarga
+        snap = self.snapshot
 
         # PASO 1: INTERPRETACIÓN (GROQ)
         # Le pedimos a Groq que estandarice la consulta (ej: "pota" -> "Vómito")
@@ -82,23 +259,31 @@ class SmartRecommendationEngine:
         sintomas_ia = datos_estructurados.get("sintomas_clave", [])
         especie_ia = datos_estructurados.get("especie", "Perro")
         raza_ia = datos_estructurados.get("raza_detectada")
-        peso_ia = datos_estructurados.get("peso_detectado_kg")
+        peso_ia = self._peso_a_float(datos_estructurados.get("peso_detectado_kg"))
+        
+        # Raza: multiplicadores por enfermedad y medicamentos a evitar (precalculados)
+        raza = snap.razas_index.resolver_raza(raza_ia)
+        multiplicadores_raza = snap.razas_index.multiplicadores(raza)
+        excluidos_raza = snap.razas_index.excluidos(raza)
         
-        logger.info(f"🔍 Datos extraídos por IA: {sintomas_ia} | Especie: {especie_ia}")
+        logger.info(f"🔍 Datos extraídos por IA: {sintomas_ia} | Especie: {especie_ia} | Raza: {raza}")
 
         # PASO 2: BÚSQUEDA EN BASE DE DATOS LOCAL (USANDO DATOS DE IA)
         hallazgos_medicos = {
             "parametros_paciente": datos_estructurados,
+            "raza_reconocida": snap.razas_index.nombres.get(raza),
             "enfermedades": [],
-            "medicamentos": []
+            "medicamentos": [],
+            "medicamentos_excluidos_por_raza": []
         }
 
         # 2.1 Buscar Enfermedades coincidentes en tus JSON
-        if self.enfermedades_loader and sintomas_ia:
+        if snap.enfermedades_loader and sintomas_ia:
             # Usamos tu loader existente pero con los síntomas LIMPIOS que nos dio Groq
-            enfermedades_match = self.enfermedades_loader.obtener_enfermedades_por_sintomas(
+            enfermedades_match = snap.enfermedades_loader.obtener_enfermedades_por_sintomas(
                 sintomas_ia, 
-                especie_ia
+                especie_ia,
+                multiplicadores_raza
             )
             
             # Formatear enfermedades para el contexto
@@ -106,28 +291,30 @@ class SmartRecommendationEngine:
                 hallazgos_medicos["enfermedades"].append({
                     "nombre": enf.get("nombre"),
                     "confianza": enf.get("confianza"),
+                    "factor_raza": enf.get("factor_raza"),
                     "descripcion": enf.get("indicaciones"),
                     "notas": enf.get("notas")
                 })
-                
-                # 2.2 Buscar Medicamentos asociados a esas enfermedades
-                ids_meds = enf.get("medicamentos_asociados", [])
-                
-                # Tomamos solo los top 5 medicamentos por enfermedad para no saturar
-                for med_id in ids_meds[:5]: 
-                    if med_id in self.medicamentos:
-                        med_data = self.medicamentos[med_id]
-                        
-                        # Filtrar por especie (Seguridad)
-                        especie_med = med_data.get("especie", "").upper()
-                        if especie_ia.upper() in especie_med or "AMBOS" in especie_med or "PERRO" in especie_med and "GATO" in especie_med:
-                            
-                            hallazgos_medicos["medicamentos"].append({
-                                "nombre": med_data.get("nombre"),
-                                "principios_activos": med_data.get("principios_activos"),
-                                "prescripcion": med_data.get("prescripcion"),
-                                "forma_farmaceutica": med_data.get("presentacion")
-                            })
+            
+            # 2.2 Ranking global de medicamentos sobre TODAS las enfermedades detectadas
+            # (sin duplicados y con trabajo acotado por consulta)
+            candidatas = [
+                (enf.get("key"), enf.get("confianza") or 0.0, enf.get("medicamentos_asociados", []))
+                for enf in enfermedades_match
+            ]
+            ranking = snap.medicamentos_ranking.rankear(
+                candidatas, especie_ia, k=TOP_MEDICAMENTOS, excluidos=excluidos_raza
+            )
+            nombres_enf = {enf.get("key"): enf.get("nombre") for enf in enfermedades_match}
+            for med_id, puntuacion, origen in ranking:
+                ficha = self._ficha_medicamento(med_id, peso_ia, puntuacion, snap)
+                ficha["enfermedades"] = [nombres_enf.get(k, k) for k in origen]
+                hallazgos_medicos["medicamentos"].append(ficha)
+            
+            hallazgos_medicos["medicamentos_excluidos_por_raza"] = sorted(
+                snap.medicamentos[med_id].get("nombre") for med_id in excluidos_raza
+                if any(snap.medicamentos_ranking.peso(med_id, enf_key) for enf_key, _, _ in candidatas)
+            )
 
         # PASO 3: GENERACIÓN DE RESPUESTA (GROQ)
         # Enviamos los hallazgos de tus JSON a Groq para que redacte la respuesta final
@@ -140,9 +327,72 @@ class SmartRecommendationEngine:
             "parametros_ia": datos_estructurados   # Lo que entendió la IA
         }
 
+    def _ficha_medicamento(self, med_id: str, peso: Optional[float], puntuacion: float = None,
+                           snap: SnapshotGrafo = None) -> Dict[str, Any]:
+        """Datos del medicamento para el contexto del LLM y la interfaz"""
+        snap = snap or self.snapshot
+        med_data = snap.medicamentos[med_id]
+        # Posología: búsqueda en tabla precalculada, sin llamada extra al LLM
+        ficha_dosis = snap.dosis_engine.obtener_dosis(med_id, peso)
+        return {
+            "id": med_id,
+            "nombre": med_data.get("nombre"),
+            "principios_activos": med_data.get("principios_activos"),
+            "prescripcion": med_data.get("prescripcion"),
+            "forma_farmaceutica": med_data.get("presentacion"),
+            "puntuacion": puntuacion,
+            "dosis": ficha_dosis,
+            "posologia": DosisEngine.formatear(ficha_dosis)
+        }
+
+    def autocompletar(self, texto: str, n: int = 8, tipos=TIPOS) -> List[Dict[str, Any]]:
+        """Sugerencias mientras se escribe ({'texto', 'tipo', 'peso'})"""
+        return self.autocompletado.sugerir(texto, n, tipos)
+
     # Métodos legacy para compatibilidad con la interfaz antigua si se necesitan
     # (Mantener estos evita que se rompa la pestaña "Base de Datos" si la usas)
+    def buscar_medicamento(self, texto: str, especie: str = None, receta: bool = None,
+                           limite: int = 50) -> List[Dict[str, Any]]:
+        """Búsqueda en el vademécum por nombre, principio activo o titular"""
+        return self.catalogo_index.buscar(texto, especie, receta).pagina(1, limite)
+
+    def calcular_puntuacion(self, med_id: str, enfermedad: str, especie: str,
+                            peso: float = None, raza: str = None) -> float:
+        """Puntuación de un medicamento para una enfermedad (nombre) y especie"""
+        snap = self.snapshot
+        enf_key = snap.medicamentos_ranking.clave_enfermedad(enfermedad, especie)
+        if not enf_key or med_id not in snap.medicamentos:
+            return 0
+        if med_id in snap.razas_index.excluidos(raza):
+            return 0
+        return snap.medicamentos_ranking.peso(med_id, enf_key) * snap.razas_index.factor(raza, enf_key)
+
+    def recomendar_top_10(self, enfermedad: str, especie: str,
+                          peso: float = None, raza: str = None) -> List[Dict[str, Any]]:
+        """TOP 10 medicamentos para una enfermedad concreta"""
+        snap = self.snapshot
+        enf_key = snap.medicamentos_ranking.clave_enfermedad(enfermedad, especie)
+        if not enf_key:
+            return []
+        ranking = snap.medicamentos_ranking.rankear(
+            [(enf_key, snap.razas_index.factor(raza, enf_key), [])], especie,
+            k=10, excluidos=snap.razas_index.excluidos(raza)
+        )
+        peso = self._peso_a_float(peso)
+        return [self._ficha_medicamento(med_id, peso, puntuacion, snap) for med_id, puntuacion, _ in ranking]
+
+    def obtener_categoria_medicamento(self, principios: List[str]) -> str:
+        """Categoría terapéutica de un medicamento a partir de sus principios activos"""
+        return self.principios_index.categoria_medicamento(principios) or 'Generico'
+
     def calcular_dosis_texto(self, med_data, peso):
-        # ... Tu lógica original de calcular dosis puede mantenerse aquí si se usa en otro lado ...
-        return "Dosis a consultar con veterinario."
+        """Texto de posología para un medicamento del catálogo y un peso en kg"""
+        dosis_engine = self.dosis_engine
+        med_id = med_data.get("id")
+        categoria = dosis_engine.categoria_por_med.get(med_id)
+        if med_id not in dosis_engine.categoria_por_med:
+            # Medicamento fuera del catálogo cargado: categoría al vuelo (sin tocar la foto compartida)
+            categoria = dosis_engine.resolver_categoria(med_data.get("principios_activos", []))
+        ficha = dosis_engine.obtener_dosis_categoria(categoria, self._peso_a_float(peso))
+        return DosisEngine.formatear(ficha)
 
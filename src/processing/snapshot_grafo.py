@@ -0,0 +1,112 @@
+import time
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Callable, Optional, Iterable, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Segundos entre dos comprobaciones del directorio vigilado
+INTERVALO_VIGILANCIA = 5.0
+# Extensiones cuyos cambios provocan una recarga
+EXTENSIONES_VIGILADAS = ('.json', '.jsonl', '.kgbin')
+
+
+class SnapshotGrafo:
+    """Foto inmutable del grafo de conocimiento y de todo lo que se deriva de él.
+
+    Agrupa datos, índices y cachés de una misma versión de `data/knowledge_graph/`.
+    No se modifica después de construirse: una recarga construye otra foto y la
+    publica con una única asignación de referencia, así que una consulta que ya
+    tenía la anterior termina con ella sin necesidad de locks.
+    """
+
+    __slots__ = ('version', 'firma', 'creado', 'medicamentos', 'enfermedades_data', 'relaciones',
+                 'dosis', 'razas', 'categorias', 'principios_index', 'dosis_engine',
+                 'medicamentos_ranking', 'catalogo_index', 'enfermedades_loader', 'razas_index',
+                 'autocompletado', 'calculador_relaciones')
+
+    def __init__(self, **componentes):
+        for nombre in self.__slots__:
+            object.__setattr__(self, nombre, componentes.get(nombre))
+        object.__setattr__(self, 'creado', time.time())
+
+    def __setattr__(self, nombre, valor):
+        raise AttributeError(f"SnapshotGrafo es inmutable (no se puede asignar '{nombre}')")
+
+    def reemplazar(self, **cambios) -> 'SnapshotGrafo':
+        """Foto nueva con algunos componentes sustituidos y el resto compartidos"""
+        componentes = {nombre: getattr(self, nombre) for nombre in self.__slots__}
+        componentes.update(cambios)
+        return SnapshotGrafo(**componentes)
+
+    def __repr__(self):
+        return f"SnapshotGrafo(version={self.version}, medicamentos={len(self.medicamentos or {})})"
+
+
+def firma_directorio(directorio, extensiones: Iterable[str] = EXTENSIONES_VIGILADAS) -> Tuple:
+    """(nombre, mtime_ns, tamaño) de los ficheros vigilados; cambia si cambia cualquiera"""
+    directorio = Path(directorio)
+    if not directorio.is_dir():
+        return ()
+    firma = []
+    for ruta in sorted(directorio.iterdir()):
+        if ruta.suffix in extensiones and ruta.is_file():
+            try:
+                stat = ruta.stat()
+            except FileNotFoundError:
+                continue
+            firma.append((ruta.name, stat.st_mtime_ns, stat.st_size))
+    return tuple(firma)
+
+
+class VigilanteGrafo:
+    """Hilo que sondea `data/knowledge_graph/` y avisa cuando sus ficheros cambian.
+
+    Se espera a que la firma se mantenga igual entre dos sondeos seguidos antes de
+    avisar, para no recargar a mitad de una escritura. El aviso (`al_cambiar`)
+    se ejecuta en este mismo hilo, fuera del camino de las consultas.
+    """
+
+    def __init__(self, directorio, al_cambiar: Callable[[Tuple], Any],
+                 intervalo: float = INTERVALO_VIGILANCIA, firma_inicial: Optional[Tuple] = None):
+        self.directorio = Path(directorio)
+        self.al_cambiar = al_cambiar
+        self.intervalo = intervalo
+        self.firma = firma_inicial if firma_inicial is not None else firma_directorio(self.directorio)
+        self._parar = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+
+    def comprobar(self, pendiente: Optional[Tuple] = None) -> Optional[Tuple]:
+        """Un sondeo. Devuelve la firma nueva si ha cambiado pero aún no es estable"""
+        actual = firma_directorio(self.directorio)
+        if actual == self.firma:
+            return None
+        if actual != pendiente:
+            return actual
+        try:
+            self.al_cambiar(actual)
+            self.firma = actual
+        except Exception as e:
+            # Se reintenta en el siguiente cambio; la foto publicada sigue siendo válida
+            logger.error(f"❌ Error recargando el grafo: {e}")
+            self.firma = actual
+        return None
+
+    def _bucle(self):
+        pendiente = None
+        while not self._parar.wait(self.intervalo):
+            pendiente = self.comprobar(pendiente)
+
+    def iniciar(self) -> 'VigilanteGrafo':
+        if self._hilo is None:
+            self._hilo = threading.Thread(target=self._bucle, name="vigilante-grafo", daemon=True)
+            self._hilo.start()
+            logger.info(f"👀 Vigilando cambios en {self.directorio} cada {self.intervalo}s")
+        return self
+
+    def parar(self):
+        self._parar.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout=self.intervalo + 1)
+            self._hilo = None
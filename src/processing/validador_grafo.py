@@ -0,0 +1,205 @@
+import json
+import time
+import logging
+from bisect import bisect_left
+from pathlib import Path
+from typing import Dict, List, Any, Iterable, Mapping, Optional, Sequence, Set
+
+from processing.principios_index import normalizar_texto, normalizar_principio
+from processing.medicamentos_ranking import clave_canonica
+
+logger = logging.getLogger(__name__)
+
+# Ejemplos que se guardan por comprobación (el recuento es siempre el total)
+MAX_EJEMPLOS = 20
+
+
+class ErrorValidacionGrafo(Exception):
+    """El grafo tiene referencias rotas: no se debe publicar"""
+
+    def __init__(self, informe: 'InformeValidacion'):
+        super().__init__(informe.resumen())
+        self.informe = informe
+
+
+class InformeValidacion:
+    """Resultado de validar el grafo: errores (referencias rotas) y avisos (deriva de datos)"""
+
+    def __init__(self):
+        self.errores: Dict[str, List[Any]] = {}
+        self.avisos: Dict[str, List[Any]] = {}
+        self.totales: Dict[str, int] = {}
+        self.segundos = 0.0
+
+    def _anotar(self, destino: Dict[str, List[Any]], comprobacion: str, problemas: Iterable[Any]):
+        problemas = list(problemas)
+        if problemas:
+            destino[comprobacion] = problemas[:MAX_EJEMPLOS]
+            self.totales[comprobacion] = len(problemas)
+
+    def error(self, comprobacion: str, problemas: Iterable[Any]):
+        self._anotar(self.errores, comprobacion, problemas)
+
+    def aviso(self, comprobacion: str, problemas: Iterable[Any]):
+        self._anotar(self.avisos, comprobacion, problemas)
+
+    @property
+    def valido(self) -> bool:
+        return not self.errores
+
+    def resumen(self) -> str:
+        partes = [f"{nombre}: {self.totales[nombre]}" for nombre in self.errores]
+        estado = "válido" if self.valido else f"{len(self.errores)} comprobaciones con errores"
+        return f"Grafo {estado}" + (f" ({', '.join(partes)})" if partes else "")
+
+    def como_dict(self) -> Dict[str, Any]:
+        return {'valido': self.valido, 'errores': self.errores, 'avisos': self.avisos,
+                'totales': self.totales, 'segundos': round(self.segundos, 3)}
+
+
+def _ids_sin_medicamento(enfermedades: Mapping[str, Dict], ids_medicamentos: Set[str]) -> List[tuple]:
+    rotos = []
+    for enf_key, enf in enfermedades.items():
+        desconocidos = set(enf.get('medicamentos_asociados') or []) - ids_medicamentos
+        rotos.extend((enf_key, med_id) for med_id in sorted(desconocidos))
+    return rotos
+
+
+def validar_grafo(medicamentos: Mapping[str, Dict], enfermedades: Mapping[str, Dict],
+                  relaciones: Sequence[Dict], enfermedades_loader: Optional[Mapping[str, Dict]] = None,
+                  sintomas: Optional[Mapping[str, List[str]]] = None, razas: Optional[Dict] = None,
+                  categorias: Optional[Dict[str, str]] = None,
+                  dosis: Optional[Dict] = None) -> InformeValidacion:
+    """Comprueba todas las referencias cruzadas del grafo en una pasada por fichero.
+
+    Cada comprobación es una diferencia de conjuntos contra el conjunto de
+    claves válidas, construido una sola vez. Son errores las referencias que
+    el motor ignora en silencio al consultar (ids de medicamento o de
+    enfermedad inexistentes); son avisos las incoherencias de los datos
+    (duplicados, nombres de enfermedad que no resuelven, categorías sin dosis...).
+    Las entradas opcionales que se pasan como None no se comprueban.
+    """
+    inicio = time.perf_counter()
+    informe = InformeValidacion()
+
+    # Conjuntos de referencia
+    ids_medicamentos = set(medicamentos)
+    principios_por_med = {med_id: set(med.get('principios_activos') or []) for med_id, med in medicamentos.items()}
+    claves_mapeo = {clave_canonica(k) for k in enfermedades}
+    # Las enfermedades añadidas desde el panel (ENF_NNN) solo existen en el loader y sus aristas en el overlay
+    claves_enfermedad = claves_mapeo | {clave_canonica(k) for k in enfermedades_loader or {}}
+    principios_catalogo = {normalizar_principio(p) for ps in principios_por_med.values() for p in ps}
+
+    if not ids_medicamentos:
+        informe.error('catalogo_vacio', ['El grafo no tiene medicamentos'])
+
+    # 1. Enfermedad -> medicamentos (mapeo)
+    informe.error('enfermedad_medicamento_inexistente', _ids_sin_medicamento(enfermedades, ids_medicamentos))
+
+    # 2. Relaciones: extremos y principios coincidentes
+    sin_enfermedad, sin_medicamento, principios_ajenos = [], [], []
+    aristas_por_enfermedad: Dict[str, Set[str]] = {}
+    for i, rel in enumerate(relaciones):
+        enf_key, med_id = rel.get('desde_enfermedad'), rel.get('hacia_medicamento')
+        if clave_canonica(enf_key) not in claves_enfermedad:
+            sin_enfermedad.append((i, enf_key))
+        if med_id not in ids_medicamentos:
+            sin_medicamento.append((i, med_id))
+            continue
+        ajenos = set(rel.get('principios_coincidentes') or []) - principios_por_med[med_id]
+        if ajenos:
+            principios_ajenos.append((i, med_id, sorted(ajenos)))
+        aristas_por_enfermedad.setdefault(clave_canonica(enf_key), set()).add(med_id)
+    informe.error('relacion_enfermedad_inexistente', sin_enfermedad)
+    informe.error('relacion_medicamento_inexistente', sin_medicamento)
+    informe.aviso('principios_coincidentes_ajenos', principios_ajenos)
+
+    # 3. Enfermedades del loader (enfermedades_42 + journal)
+    nombres_enfermedad: Set[str] = set()
+    if enfermedades_loader is not None:
+        informe.error('loader_medicamento_inexistente',
+                      _ids_sin_medicamento(enfermedades_loader, ids_medicamentos))
+        nombres_enfermedad = {normalizar_texto(e.get('nombre', '')) for e in enfermedades_loader.values()}
+        informe.aviso('asociados_sin_relacion', [
+            (enf_key, sorted(set(enf.get('medicamentos_asociados') or [])
+                             - aristas_por_enfermedad.get(clave_canonica(enf_key), set())))
+            for enf_key, enf in enfermedades_loader.items()
+            if clave_canonica(enf_key) in aristas_por_enfermedad
+            and set(enf.get('medicamentos_asociados') or []) - aristas_por_enfermedad[clave_canonica(enf_key)]
+        ])
+        # Sin enfermedad en el mapeo no hay aristas: el ranking cae a `medicamentos_asociados`
+        informe.aviso('enfermedad_sin_mapeo', sorted(
+            enf_key for enf_key in enfermedades_loader
+            if clave_canonica(enf_key) not in claves_mapeo and clave_canonica(enf_key) not in aristas_por_enfermedad
+        ))
+    nombres_enfermedad |= {normalizar_texto(e.get('nombre', '')) for e in enfermedades.values()}
+
+    # 4. Síntoma -> nombres de enfermedad
+    if sintomas is not None:
+        rotos, duplicados = [], []
+        for sintoma, nombres in sintomas.items():
+            normalizados = [normalizar_texto(n) for n in nombres or []]
+            desconocidos = set(normalizados) - nombres_enfermedad
+            if desconocidos:
+                rotos.append((sintoma, sorted(desconocidos)))
+            if len(normalizados) != len(set(normalizados)):
+                duplicados.append(sintoma)
+        informe.error('sintoma_enfermedad_inexistente', rotos)
+        informe.aviso('sintoma_enfermedades_duplicadas', duplicados)
+
+    # 5. Raza -> enfermedades (exacto o prefijo, como RazasIndex) y principios a evitar
+    if razas is not None:
+        ordenados = sorted(nombres_enfermedad)
+        sin_enfermedad, sin_principio = [], []
+        for raza, datos in razas.items():
+            for pred in datos.get('enfermedades_predisposicion', []):
+                nombre = normalizar_texto(pred.get('enfermedad', ''))
+                pos = bisect_left(ordenados, nombre)
+                if pos == len(ordenados) or not ordenados[pos].startswith(nombre):
+                    sin_enfermedad.append((raza, pred.get('enfermedad')))
+            for principio in datos.get('medicamentos_precaución', []):
+                if normalizar_principio(principio) not in principios_catalogo:
+                    sin_principio.append((raza, principio))
+        informe.aviso('raza_enfermedad_inexistente', sin_enfermedad)
+        informe.aviso('raza_principio_inexistente', sin_principio)
+
+    # 6. Principio -> categoría -> tabla de dosis
+    if categorias is not None:
+        if dosis is not None:
+            # El motor muestra el medicamento sin pauta: aviso, no error
+            informe.aviso('categoria_sin_dosis', sorted(
+                {(principio, categoria) for principio, categoria in categorias.items() if categoria not in dosis}
+            ))
+        informe.aviso('categoria_principio_fuera_de_catalogo', sorted(
+            principio for principio in categorias if normalizar_principio(principio) not in principios_catalogo
+        ))
+
+    informe.segundos = time.perf_counter() - inicio
+    return informe
+
+
+# ========== CARGA DESDE FICHEROS ==========
+
+def _cargar(ruta: Path) -> Dict:
+    with open(ruta, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def validar_directorio(directorio='data/knowledge_graph') -> InformeValidacion:
+    """Valida los JSON de `data/knowledge_graph/` tal como los carga el motor (journals y overlay incluidos)"""
+    from database.journal import JournalCambios
+    from processing.relaciones_incrementales import aplicar_overlay, cargar_overlay, ruta_overlay, SECCION_OVERLAY
+
+    directorio = Path(directorio)
+    ruta_grafo = directorio / 'mapeo_enfermedades_medicamentos.json'
+    grafo = _cargar(ruta_grafo)
+    relaciones = aplicar_overlay(grafo.get('relaciones', []),
+                                 cargar_overlay(JournalCambios(ruta_overlay(ruta_grafo), SECCION_OVERLAY)))
+    return validar_grafo(
+        grafo.get('medicamentos', {}), grafo.get('enfermedades', {}), relaciones,
+        enfermedades_loader=JournalCambios(directorio / 'enfermedades_42_completo.json', 'enfermedades').estado(),
+        sintomas=JournalCambios(directorio / 'sintomas_enfermedades_mapping.json', 'sintomas_enfermedades').estado(),
+        razas=_cargar(directorio / 'razas_predisposiciones.json'),
+        categorias=_cargar(directorio / 'categorias_medicamentos.json').get('categorias', {}),
+        dosis=_cargar(directorio / 'dosis_medicamentos.json'),
+    )
@@ -0,0 +1,138 @@
+import time
+import logging
+import threading
+from typing import Dict, Any, Optional, Callable
+
+logger = logging.getLogger(__name__)
+
+# Consultas de calentamiento: recorren los índices sin llamar a Groq
+CONSULTAS_CALENTAMIENTO = [
+    {"sintomas": ["picor", "otitis"], "especie": "Perro", "raza": "Cocker", "peso": 12},
+    {"sintomas": ["vomitos", "diarrea"], "especie": "Gato", "raza": "Persa", "peso": 4},
+    {"sintomas": ["pulgas"], "especie": "Perro", "raza": None, "peso": 30},
+]
+BUSQUEDAS_CALENTAMIENTO = ["amox", "meloxicam", "otic", "a", "p"]
+
+
+class EstadoMotor:
+    """Sonda de disponibilidad del motor (compartida por todas las sesiones del proceso).
+
+    Fases: 'pendiente' -> 'cargando' -> 'calentando' -> 'listo' (o 'error').
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._listo = threading.Event()
+        self.fase = 'pendiente'
+        self.error: Optional[str] = None
+        self.inicio: Optional[float] = None
+        self._inicio_fase: Optional[float] = None
+        self.tiempos: Dict[str, float] = {}
+
+    def marcar(self, fase: str, error: Optional[str] = None):
+        """Pasa a la fase `fase` y anota lo que ha durado la anterior"""
+        with self._lock:
+            ahora = time.perf_counter()
+            if self.inicio is None:
+                self.inicio = ahora
+            elif self._inicio_fase is not None:
+                self.tiempos[self.fase] = round(ahora - self._inicio_fase, 3)
+            self._inicio_fase = ahora
+            self.fase = fase
+            self.error = error
+        if fase in ('listo', 'error'):
+            self._listo.set()
+
+    @property
+    def listo(self) -> bool:
+        return self.fase == 'listo'
+
+    def esperar(self, timeout: Optional[float] = None) -> bool:
+        """Bloquea hasta que la carga termina (bien o mal); True si el motor está listo"""
+        self._listo.wait(timeout)
+        return self.listo
+
+    def informe(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'listo': self.fase == 'listo',
+                'fase': self.fase,
+                'error': self.error,
+                'segundos': round(time.perf_counter() - self.inicio, 3) if self.inicio else 0.0,
+                'tiempos': dict(self.tiempos),
+            }
+
+
+def calentar(motor) -> Dict[str, int]:
+    """Ejecuta consultas de ejemplo sobre los caminos locales del motor (sin Groq)"""
+    hechas = {'enfermedades': 0, 'ranking': 0, 'catalogo': 0, 'autocompletado': 0}
+
+    for consulta in CONSULTAS_CALENTAMIENTO:
+        multiplicadores = motor.razas_index.multiplicadores(consulta['raza'])
+        enfermedades = []
+        if motor.enfermedades_loader:
+            enfermedades = motor.enfermedades_loader.obtener_enfermedades_por_sintomas(
+                consulta['sintomas'], consulta['especie'], multiplicadores)
+            hechas['enfermedades'] += 1
+        candidatas = [(e.get('key'), e.get('confianza') or 0.0, e.get('medicamentos_asociados', []))
+                      for e in enfermedades]
+        for med_id, puntuacion, _ in motor.medicamentos_ranking.rankear(
+                candidatas, consulta['especie'], excluidos=motor.razas_index.excluidos(consulta['raza'])):
+            motor._ficha_medicamento(med_id, consulta['peso'], puntuacion)
+        hechas['ranking'] += 1
+
+    for texto in BUSQUEDAS_CALENTAMIENTO:
+        motor.catalogo_index.facetas(texto)
+        motor.catalogo_index.buscar(texto).pagina(1)
+        hechas['catalogo'] += 1
+        motor.autocompletar(texto)
+        hechas['autocompletado'] += 1
+
+    return hechas
+
+
+# ========== PRECARGA EN SEGUNDO PLANO ==========
+
+estado = EstadoMotor()
+_motor = None
+_hilo: Optional[threading.Thread] = None
+_lock_precarga = threading.Lock()
+
+
+def _cargar(fabrica: Callable[[], Any]):
+    global _motor
+    try:
+        estado.marcar('cargando')
+        motor = fabrica()
+        estado.marcar('calentando')
+        calentar(motor)
+        _motor = motor
+        estado.marcar('listo')
+        logger.info(f"🔥 Motor precargado y caliente: {estado.informe()['tiempos']}")
+    except Exception as e:
+        logger.error(f"❌ Error precargando el motor: {e}")
+        estado.marcar('error', str(e))
+
+
+def _fabrica_por_defecto():
+    from processing.smart_recommendation_engine import SmartRecommendationEngine
+    return SmartRecommendationEngine()
+
+
+def iniciar_precarga(fabrica: Callable[[], Any] = None) -> EstadoMotor:
+    """Arranca (una sola vez por proceso) la construcción del motor en un hilo"""
+    global _hilo
+    with _lock_precarga:
+        if _hilo is None:
+            _hilo = threading.Thread(target=_cargar, args=(fabrica or _fabrica_por_defecto,),
+                                     name="precarga-motor", daemon=True)
+            _hilo.start()
+    return estado
+
+
+def obtener_motor(timeout: Optional[float] = None):
+    """Motor precargado; espera a que termine la carga si todavía está en curso"""
+    iniciar_precarga()
+    if not estado.esperar(timeout):
+        raise RuntimeError(f"Motor no disponible: {estado.fase} {estado.error or ''}".strip())
+    return _motor
@@ -0,0 +1,236 @@
+"""
+CHECKPOINTS DEL SCRAPING - ALMACÉN SQLITE REANUDABLE E INCREMENTAL
+
+Cada partición (especie × letra) que termina se guarda al momento, con sus
+medicamentos, en una base SQLite (una transacción por partición). Si el proceso
+se cae, la siguiente ejecución reanuda la misma pasada con las particiones
+pendientes en lugar de empezar de cero.
+
+Por medicamento (clave: numero_registro) se guarda el hash del registro del
+listado, la ficha de detalle y sus validadores HTTP (ETag / Last-Modified):
+en un refresco nocturno solo se descarga la ficha de los medicamentos nuevos o
+cuyo listado ha cambiado, y esa descarga es condicional (304 si no cambió).
+"""
+
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from scraping.parser_cimavet import clave_medicamento
+
+RUTA_POR_DEFECTO = 'data/raw/cimavet_checkpoints.sqlite'
+
+# Estados
+PARTICION_PENDIENTE = 'pendiente'
+PARTICION_HECHA = 'hecha'
+EJECUCION_EN_CURSO = 'en_curso'
+EJECUCION_COMPLETADA = 'completada'
+PRODUCTO_LISTADO = 'listado'      # visto en la búsqueda, falta la ficha
+PRODUCTO_COMPLETO = 'completo'    # ficha al día
+
+# Filas que se leen de cada vez al recorrer los medicamentos de una pasada
+LOTE_LECTURA = 500
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS ejecuciones (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    inicio REAL NOT NULL,
+    fin REAL,
+    estado TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS particiones (
+    ejecucion INTEGER NOT NULL,
+    especie TEXT NOT NULL,
+    letra TEXT NOT NULL,
+    estado TEXT NOT NULL,
+    medicamentos INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (ejecucion, especie, letra)
+);
+CREATE TABLE IF NOT EXISTS productos (
+    numero_registro TEXT PRIMARY KEY,
+    datos TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    detalle TEXT,
+    etag TEXT,
+    last_modified TEXT,
+    estado TEXT NOT NULL,
+    ultima_ejecucion INTEGER NOT NULL,
+    descargado REAL NOT NULL,
+    cambiado REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS productos_ejecucion ON productos (ultima_ejecucion, estado);
+"""
+
+
+def hash_registro(med: Dict) -> str:
+    """Hash estable del contenido (independiente del orden de las claves)"""
+    return hashlib.sha1(json.dumps(med, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+class AlmacenCheckpoints:
+    """Estado persistente del scraping; seguro entre hilos de un mismo proceso"""
+
+    def __init__(self, ruta=RUTA_POR_DEFECTO):
+        self.ruta = Path(ruta)
+        self.ruta.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.ruta), check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(ESQUEMA)
+        self._lock = threading.Lock()
+
+    def cerrar(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+    def _transaccion(self, sentencias: Iterable[Tuple[str, tuple]]):
+        with self._lock:
+            self._conn.execute('BEGIN')
+            try:
+                for sql, params in sentencias:
+                    self._conn.execute(sql, params)
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+
+    def _consulta(self, sql: str, params: tuple = ()) -> List[tuple]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    # ========== EJECUCIONES Y PARTICIONES ==========
+
+    def iniciar(self, trabajos: List[Tuple[str, str]], reanudar: bool = True) -> int:
+        """Id de la pasada: la última sin terminar si `reanudar`, o una nueva con todo pendiente"""
+        filas = self._consulta('SELECT id FROM ejecuciones WHERE estado = ? ORDER BY id DESC LIMIT 1',
+                               (EJECUCION_EN_CURSO,)) if reanudar else []
+        with self._lock:
+            if filas:
+                ejecucion = filas[0][0]
+            else:
+                ejecucion = self._conn.execute('INSERT INTO ejecuciones (inicio, estado) VALUES (?, ?)',
+                                               (time.time(), EJECUCION_EN_CURSO)).lastrowid
+            # Particiones nuevas (p. ej. se amplían las letras al reanudar); las existentes se conservan
+            self._conn.executemany(
+                'INSERT OR IGNORE INTO particiones (ejecucion, especie, letra, estado) VALUES (?, ?, ?, ?)',
+                [(ejecucion, especie, letra, PARTICION_PENDIENTE) for especie, letra in trabajos])
+        return ejecucion
+
+    def pendientes(self, ejecucion: int, trabajos: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+        """Particiones de `trabajos` que aún no se han completado en esta pasada (en el mismo orden)"""
+        hechas = set(self._consulta('SELECT especie, letra FROM particiones WHERE ejecucion = ? AND estado = ?',
+                                    (ejecucion, PARTICION_HECHA)))
+        return [p for p in trabajos if tuple(p) not in hechas]
+
+    def finalizar(self, ejecucion: int):
+        self._transaccion([('UPDATE ejecuciones SET fin = ?, estado = ? WHERE id = ?',
+                            (time.time(), EJECUCION_COMPLETADA, ejecucion))])
+
+    # ========== PRODUCTOS ==========
+
+    def registrar_particion(self, ejecucion: int, particion: Tuple[str, str],
+                            medicamentos: List[Dict]) -> List[str]:
+        """Guarda el listado de una partición y la marca hecha, todo en una transacción.
+
+        Devuelve los nº de registro nuevos o cuyo listado ha cambiado (su
+        ficha hay que volver a pedirla). Los que no cambian solo se marcan como
+        vistos en esta pasada.
+        """
+        claves = [clave_medicamento(m) for m in medicamentos]
+        previos = {}
+        for inicio in range(0, len(claves), 500):
+            bloque = claves[inicio:inicio + 500]
+            previos.update((fila[0], fila[1:]) for fila in self._consulta(
+                f"SELECT numero_registro, hash, estado FROM productos "
+                f"WHERE numero_registro IN ({','.join('?' * len(bloque))})", tuple(bloque)))
+
+        ahora = time.time()
+        sentencias, cambiados = [], []
+        for clave, med in zip(claves, medicamentos):
+            nuevo_hash = hash_registro(med)
+            anterior = previos.get(clave)
+            if anterior is not None and anterior[0] == nuevo_hash:
+                sentencias.append(('UPDATE productos SET ultima_ejecucion = ? WHERE numero_registro = ?',
+                                   (ejecucion, clave)))
+                if anterior[1] != PRODUCTO_COMPLETO:
+                    cambiados.append(clave)
+                continue
+            cambiados.append(clave)
+            sentencias.append((
+                'INSERT INTO productos (numero_registro, datos, hash, estado, ultima_ejecucion, descargado, cambiado) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT(numero_registro) DO UPDATE SET '
+                'datos = excluded.datos, hash = excluded.hash, estado = excluded.estado, '
+                'ultima_ejecucion = excluded.ultima_ejecucion, descargado = excluded.descargado, '
+                'cambiado = excluded.cambiado',
+                (clave, json.dumps(med, ensure_ascii=False), nuevo_hash, PRODUCTO_LISTADO, ejecucion, ahora, ahora)))
+        sentencias.append(('UPDATE particiones SET estado = ?, medicamentos = ? '
+                           'WHERE ejecucion = ? AND especie = ? AND letra = ?',
+                           (PARTICION_HECHA, len(medicamentos), ejecucion, particion[0], particion[1])))
+        self._transaccion(sentencias)
+        return cambiados
+
+    def pendientes_detalle(self, ejecucion: int) -> List[str]:
+        """Medicamentos vistos en esta pasada cuya ficha falta o está desactualizada"""
+        return [fila[0] for fila in self._consulta(
+            'SELECT numero_registro FROM productos WHERE ultima_ejecucion = ? AND estado != ? '
+            'ORDER BY numero_registro', (ejecucion, PRODUCTO_COMPLETO))]
+
+    def validadores(self, numero_registro: str) -> Tuple[Optional[str], Optional[str]]:
+        """(ETag, Last-Modified) de la última ficha descargada"""
+        filas = self._consulta('SELECT etag, last_modified FROM productos WHERE numero_registro = ?',
+                               (numero_registro,))
+        return filas[0] if filas else (None, None)
+
+    def guardar_detalle(self, numero_registro: str, detalle: Optional[Dict],
+                        etag: Optional[str] = None, last_modified: Optional[str] = None):
+        """Guarda la ficha; con `detalle=None` (304) solo se confirma que la guardada sigue vigente"""
+        if detalle is None:
+            self._transaccion([('UPDATE productos SET estado = ?, descargado = ? WHERE numero_registro = ?',
+                                (PRODUCTO_COMPLETO, time.time(), numero_registro))])
+            return
+        self._transaccion([(
+            'UPDATE productos SET detalle = ?, etag = ?, last_modified = ?, estado = ?, descargado = ?, '
+            'cambiado = ? WHERE numero_registro = ?',
+            (json.dumps(detalle, ensure_ascii=False), etag, last_modified, PRODUCTO_COMPLETO,
+             time.time(), time.time(), numero_registro))])
+
+    def medicamentos(self, ejecucion: int) -> Iterator[Dict]:
+        """Medicamentos vistos en la pasada: la ficha si está al día; si no, el listado.
+
+        Si el listado cambia, la ficha anterior se conserva (con sus
+        validadores, para revalidarla con 304) pero no se devuelve hasta que
+        se confirme o se descargue de nuevo. Se recorren con un cursor por
+        lotes de LOTE_LECTURA filas: la pasada no se carga entera en memoria.
+        """
+        with self._lock:
+            cursor = self._conn.execute('SELECT datos, detalle, estado FROM productos WHERE ultima_ejecucion = ? '
+                                        'ORDER BY numero_registro', (ejecucion,))
+        try:
+            while True:
+                with self._lock:
+                    filas = cursor.fetchmany(LOTE_LECTURA)
+                if not filas:
+                    return
+                for datos, detalle, estado in filas:
+                    yield json.loads(detalle if estado == PRODUCTO_COMPLETO and detalle else datos)
+        finally:
+            cursor.close()
+
+    def resumen(self, ejecucion: int) -> Dict[str, int]:
+        particiones = dict(self._consulta('SELECT estado, COUNT(*) FROM particiones WHERE ejecucion = ? '
+                                          'GROUP BY estado', (ejecucion,)))
+        productos = dict(self._consulta('SELECT estado, COUNT(*) FROM productos WHERE ultima_ejecucion = ? '
+                                        'GROUP BY estado', (ejecucion,)))
+        return {'particiones_hechas': particiones.get(PARTICION_HECHA, 0),
+                'particiones_pendientes': particiones.get(PARTICION_PENDIENTE, 0),
+                'medicamentos': sum(productos.values()),
+                'fichas_pendientes': productos.get(PRODUCTO_LISTADO, 0)}
@@ -1,6 +1,11 @@
 """
 SCRAPER CIMAVET - INTERACCIÓN MANUAL CON FORMULARIO
 Simula exactamente lo que haces en el navegador
+
+Cada paso espera a una condición explícita (banner de cookies, botón clicable,
+modal visible, resultados presentes) en lugar de dormir un tiempo fijo, y
+`main` resuelve las especies en paralelo con el pool de Chrome headless de
+pool_drivers.py (una partición por especie, sin filtro de letra).
 """
 
 from selenium import webdriver
@@ -8,11 +13,14 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from bs4 import BeautifulSoup
-import pandas as pd
-import time
+import sys
 import os
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from scraping.pool_drivers import recorrer_paginas, ejecutar, URL_CIMAVET, TIMEOUT_POR_DEFECTO
+from scraping.salida_registros import SalidaRegistros, guardar_registros
+
 def crear_driver(headless=False):
     """Crea el driver de Chrome"""
     print("🚀 Iniciando Chrome...")
@@ -36,32 +44,29 @@ def crear_driver(headless=False):
         print(f"❌ Error: {e}")
         raise
 
-def aceptar_cookies(driver):
-    """Acepta cookies"""
+def aceptar_cookies(driver, timeout=2):
+    """Acepta cookies si el banner aparece en `timeout` segundos"""
+    selectores = [
+        "//a[@class='cc-btn cc-allow']",
+        "//button[contains(text(), 'Aceptar')]",
+    ]
     try:
-        time.sleep(1)
-        selectores = [
-            "//a[@class='cc-btn cc-allow']",
-            "//button[contains(text(), 'Aceptar')]",
-        ]
-        
-        for selector in selectores:
-            try:
-                boton = driver.find_element(By.XPATH, selector)
-                boton.click()
-                print("🍪 Cookies aceptadas")
-                time.sleep(1)
-                return True
-            except:
-                pass
-        return False
-    except:
+        boton = WebDriverWait(driver, timeout).until(
+            EC.element_to_be_clickable((By.XPATH, " | ".join(selectores)))
+        )
+        boton.click()
+        # El banner está cerrado cuando el botón deja de verse
+        WebDriverWait(driver, timeout).until(EC.invisibility_of_element(boton))
+        print("🍪 Cookies aceptadas")
+        return True
+    except Exception:
+        # Sin banner (o ya aceptado): se sigue sin esperar más
         return False
 
-def buscar_con_formulario_avanzado(driver, especie):
+def buscar_con_formulario_avanzado(driver, especie, timeout=TIMEOUT_POR_DEFECTO):
     """Usa el formulario avanzado: abre el modal, rellena y busca"""
     print(f"\n🔍 Buscando: {especie}")
-    wait = WebDriverWait(driver, 20)
+    wait = WebDriverWait(driver, timeout)
 
     try:
         # Paso 1️⃣ - Clic en “Búsqueda avanzada”
@@ -70,12 +75,11 @@ def buscar_con_formulario_avanzado(driver, especie):
             EC.element_to_be_clickable((By.ID, "m_buscadoravanzado"))
         )
         driver.execute_script("arguments[0].click();", boton_avanzado)
-        time.sleep(2)
 
         # Paso 2️⃣ - Esperar el modal del formulario
         print("   2️⃣ Esperando formulario avanzado...")
         wait.until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, "div.modal-content"))
+            EC.visibility_of_element_located((By.CSS_SELECTOR, "div.modal-content"))
         )
         print("   ✅ Formulario avanzado visible")
 
@@ -118,7 +122,6 @@ def buscar_con_formulario_avanzado(driver, especie):
         wait.until(
             EC.presence_of_element_located((By.CSS_SELECTOR, "div#resultados, table"))
         )
-        time.sleep(2)
         return True
 
     except Exception as e:
@@ -127,92 +130,17 @@ def buscar_con_formulario_avanzado(driver, especie):
 
 
 def extraer_medicamentos_resultados(driver):
-    """Extrae medicamentos de la página de resultados"""
+    """Extrae medicamentos de todas las páginas de resultados (no solo de la primera)"""
     
     print("   📦 Extrayendo medicamentos...")
     
     try:
-        soup = BeautifulSoup(driver.page_source, 'html.parser')
-        medicamentos = []
-        
-        # Buscar divs que contengan info de medicamentos
-        # Estructura vista en capturas: tarjetas con h4 o divs específicos
+        medicamentos = recorrer_paginas(driver)
         
-        # Intentar encontrar por diferentes estructuras
-        elementos = soup.find_all(['div', 'article'], class_=['card', 'medication', 'result'])
-        
-        if not elementos:
-            # Buscar divs que contengan patrones característicos
-            todos_divs = soup.find_all('div')
-            elementos = [d for d in todos_divs 
-                        if 'PRINCIPIOS ACTIVOS' in d.get_text().upper()
-                        or ('ESPECIE' in d.get_text().upper() and 'LABORATORIO' in d.get_text().upper())]
-        
-        if not elementos:
+        if not medicamentos:
             print("   ⚠️ No se encontraron elementos de medicamentos")
             return []
         
-        for elem in elementos:
-            try:
-                texto_completo = elem.get_text()
-                
-                # Saltar si es muy corto
-                if len(texto_completo) < 20:
-                    continue
-                
-                lineas = [l.strip() for l in texto_completo.split('\n') if l.strip() and len(l.strip()) > 2]
-                
-                med = {
-                    'nombre': '',
-                    'laboratorio': '',
-                    'principios_activos': '',
-                    'especies': '',
-                    'numero_registro': '',
-                    'estado': '',
-                }
-                
-                # Extraer información línea por línea
-                i = 0
-                while i < len(lineas):
-                    linea = lineas[i]
-                    
-                    # Nombre (generalmente la primera línea larga en mayúsculas)
-                    if not med['nombre'] and len(linea) > 15 and linea.isupper():
-                        med['nombre'] = linea[:150]
-                    
-                    # Laboratorio
-                    elif 'LABORATORIO' in linea.upper() or 'LABIANA' in linea or 'AXIENCE' in linea or 'CHANELLE' in linea:
-                        if not med['laboratorio']:
-                            med['laboratorio'] = linea[:100]
-                    
-                    # Principios activos
-                    elif 'PRINCIPIOS ACTIVOS' in linea.upper():
-                        if i + 1 < len(lineas):
-                            med['principios_activos'] = lineas[i + 1][:150]
-                    
-                    # Especies
-                    elif 'ESPECIE' in linea.upper() and 'DESTINO' in linea.upper():
-                        if i + 1 < len(lineas):
-                            med['especies'] = lineas[i + 1][:100]
-                    
-                    # Registro
-                    elif 'Nº REGISTRO' in linea or 'N° REGISTRO' in linea:
-                        if i + 1 < len(lineas):
-                            med['numero_registro'] = lineas[i + 1][:50]
-                    
-                    # Estado
-                    elif 'AUTORIZADO' in linea.upper() or 'COMERCIALIZADO' in linea.upper():
-                        med['estado'] = linea[:50]
-                    
-                    i += 1
-                
-                # Agregar si tiene nombre
-                if med['nombre'] and len(med['nombre']) > 5:
-                    medicamentos.append(med)
-            
-            except Exception as e:
-                continue
-        
         print(f"   ✅ {len(medicamentos)} medicamentos extraídos")
         return medicamentos
         
@@ -221,23 +149,28 @@ def extraer_medicamentos_resultados(driver):
         return []
 
 def guardar_csv(medicamentos, filename):
-    """Guarda medicamentos en CSV"""
-    if not medicamentos:
-        print(f"   ⚠️ No hay medicamentos")
-        return False
-    
-    df = pd.DataFrame(medicamentos)
-    df = df.drop_duplicates(subset=['nombre'])
-    df = df[df['nombre'].str.len() > 5]  # Filtrar nombres inválidos
-    
-    if len(df) == 0:
+    """Guarda medicamentos en CSV (sin duplicados por nº de registro)"""
+    escritos = guardar_registros(medicamentos, filename)
+    if not escritos:
         print(f"   ⚠️ No hay datos válidos")
         return False
-    
-    df.to_csv(filename, index=False, encoding='utf-8')
-    print(f"   ✅ Guardado: {os.path.basename(filename)} ({len(df)} medicamentos)")
+    print(f"   ✅ Guardado: {os.path.basename(filename)} ({escritos} medicamentos)")
     return True
 
+def buscar_especie(driver, url, especie, letra='', timeout=TIMEOUT_POR_DEFECTO):
+    """Partición del pool: una especie entera por el formulario avanzado, guardada también en su CSV"""
+    driver.get(url)
+    aceptar_cookies(driver)
+    if not buscar_con_formulario_avanzado(driver, especie, timeout):
+        raise RuntimeError(f"Búsqueda avanzada fallida para '{especie}'")
+    # Los errores al recorrer páginas se propagan: el pool descarta el driver y la especie queda fallida
+    meds = recorrer_paginas(driver, timeout)
+    print(f"   ✅ {especie}: {len(meds)} medicamentos extraídos")
+    with SalidaRegistros(f'data/raw/cimavet_{especie}.csv', continuar=False) as salida:
+        salida.escribir_lote(meds)
+        print(f"   ✅ Guardado: {salida.resumen()}")
+    return meds
+
 def main():
     """Función principal"""
     
@@ -246,88 +179,29 @@ def main():
     print("╚" + "═" * 78 + "╝\n")
     
     os.makedirs('data/raw', exist_ok=True)
-    driver = None
     
-    # Especies a buscar
+    # Especies a buscar: una partición cada una, en paralelo con un Chrome headless por especie
     especies = ['perros', 'gatos']
-    todos_medicamentos = {}
     
-    try:
-        driver = crear_driver(headless=False)
-        
-        print("\n" + "=" * 80)
-        print("EXTRAYENDO MEDICAMENTOS POR ESPECIE")
-        print("=" * 80)
-        
-        # Abrir página principal
-        print(f"\n🌐 Abriendo página principal...")
-        driver.get("https://cimavet.aemps.es/cimavet/publico/home.html")
-        time.sleep(2)
-        
-        # Aceptar cookies
-        aceptar_cookies(driver)
-        time.sleep(1)
-        
-        # Para cada especie
-        for especie in especies:
-            print("\n" + "─" * 80)
-            print(f"ESPECIE: {especie.upper()}")
-            print("─" * 80)
-            
-            # Buscar usando formulario avanzado
-            if buscar_con_formulario_avanzado(driver, especie):
-                # Extraer medicamentos
-                meds = extraer_medicamentos_resultados(driver)
-                
-                if meds:
-                    todos_medicamentos[especie] = meds
-                    
-                    print(f"\n   📋 Primeros 3 medicamentos:")
-                    for i, med in enumerate(meds[:3]):
-                        print(f"      {i+1}. {med['nombre'][:70]}")
-                    
-                    # Guardar
-                    guardar_csv(meds, f'data/raw/cimavet_{especie}.csv')
-            
-            # Volver a inicio para siguiente búsqueda
-            print("   🔄 Volviendo a página principal...")
-            driver.get("https://cimavet.aemps.es/cimavet/publico/home.html")
-            time.sleep(2)
+    print("\n" + "=" * 80)
+    print("EXTRAYENDO MEDICAMENTOS POR ESPECIE")
+    print("=" * 80)
+    
+    # Cada especie va a su CSV y al combinado según termina
+    with SalidaRegistros('data/raw/cimavet_completo.csv', continuar=False) as completo:
+        _, fallidas = ejecutar(URL_CIMAVET, especies, [''], tamano=len(especies),
+                               buscar=buscar_especie, salida=completo)
         
         # Resumen
         print("\n" + "=" * 80)
         print("RESUMEN FINAL")
         print("=" * 80)
-        
-        total_unico = 0
-        for especie, meds in todos_medicamentos.items():
-            print(f"   • {especie.upper()}: {len(meds)} medicamentos")
-            total_unico += len(meds)
-        
-        # Combinar todos
-        todos_combinados = []
-        nombres_vistos = set()
-        
-        for meds in todos_medicamentos.values():
-            for med in meds:
-                if med['nombre'] not in nombres_vistos:
-                    todos_combinados.append(med)
-                    nombres_vistos.add(med['nombre'])
-        
-        if todos_combinados:
-            guardar_csv(todos_combinados, 'data/raw/cimavet_completo.csv')
-            print(f"\n✅ Total de medicamentos únicos: {len(todos_combinados)}")
+        if completo.escritos:
+            print(f"\n✅ Total de medicamentos únicos: {completo.escritos}")
             print(f"   📁 Archivos guardados en: data/raw/")
-        
-    except Exception as e:
-        print(f"\n❌ ERROR: {e}")
-        import traceback
-        traceback.print_exc()
-        
-    finally:
-        if driver:
-            driver.quit()
-            print("\n🔒 Chrome cerrado")
+    
+    if fallidas:
+        print(f"⚠️ Especies fallidas: {', '.join(especie for especie, _ in fallidas)}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
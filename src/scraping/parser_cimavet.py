@@ -0,0 +1,243 @@
+"""
+Extracción de medicamentos del HTML de resultados de CIMAVet.
+
+Compartido por el scraper de formulario (cimavet_final_scraper.py) y por el
+pool de drivers (pool_drivers.py): recibe el HTML, no el driver.
+
+Con lxml el documento se procesa en streaming (HTMLPullParser, por bloques) y
+en tiempo lineal: cada nodo de texto se mira una vez, las marcas ("PRINCIPIOS
+ACTIVOS", "ESPECIE", "LABORATORIO") se propagan hacia arriba al cerrar cada
+elemento y solo se extrae el texto de la ficha más interna que contiene al
+menos dos de ellas, que después se vacía para liberar memoria. Así no salen
+como medicamentos ni los divs de un solo campo ni los contenedores que
+agrupan varias fichas. Sin lxml se usa BeautifulSoup con el mismo recorrido
+(un solo paso, también lineal).
+"""
+
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+
+from bs4 import BeautifulSoup, NavigableString, Tag
+
+try:
+    from lxml import etree
+except ImportError:  # sin lxml: BeautifulSoup con html.parser
+    etree = None
+
+# Tarjetas de resultado con clase conocida (según las capturas)
+ETIQUETAS_TARJETA = {'div', 'article'}
+CLASES_TARJETA = {'card', 'medication', 'result'}
+
+# Marcas de texto, propagadas como bits hacia los ancestros
+MARCA_PRINCIPIOS = 1
+MARCA_ESPECIE = 2
+MARCA_LABORATORIO = 4
+CONTIENE_TARJETA = 8    # hay una tarjeta con clase más abajo
+CONTIENE_FICHA = 16     # hay un div con las marcas más abajo
+
+TAMANO_BLOQUE = 64 * 1024
+
+
+def _marcas(texto: Optional[str]) -> int:
+    if not texto:
+        return 0
+    texto = texto.upper()
+    return ((MARCA_PRINCIPIOS if 'PRINCIPIOS ACTIVOS' in texto else 0)
+            | (MARCA_ESPECIE if 'ESPECIE' in texto else 0)
+            | (MARCA_LABORATORIO if 'LABORATORIO' in texto else 0))
+
+
+def _es_ficha(marcas: int) -> bool:
+    """Al menos dos de las tres marcas: un div con solo "PRINCIPIOS ACTIVOS" es un campo, no la ficha"""
+    marcas &= MARCA_PRINCIPIOS | MARCA_ESPECIE | MARCA_LABORATORIO
+    return bool(marcas & (marcas - 1))
+
+
+def clave_medicamento(med: Dict[str, str]) -> str:
+    """Clave de deduplicación: nº de registro si lo hay; si no, el nombre"""
+    return med.get('numero_registro') or med.get('nombre', '')
+
+
+def _medicamento(texto_completo: str) -> Optional[Dict[str, str]]:
+    """Campos de una tarjeta a partir de su texto (None si no parece un medicamento)"""
+    # Saltar si es muy corto
+    if len(texto_completo) < 20:
+        return None
+
+    lineas = [l.strip() for l in texto_completo.split('\n') if l.strip() and len(l.strip()) > 2]
+
+    med = {
+        'nombre': '',
+        'laboratorio': '',
+        'principios_activos': '',
+        'especies': '',
+        'numero_registro': '',
+        'estado': '',
+    }
+
+    # Extraer información línea por línea
+    for i, linea in enumerate(lineas):
+        siguiente = lineas[i + 1] if i + 1 < len(lineas) else None
+
+        # Nombre (generalmente la primera línea larga en mayúsculas)
+        if not med['nombre'] and len(linea) > 15 and linea.isupper():
+            med['nombre'] = linea[:150]
+
+        # Laboratorio
+        elif 'LABORATORIO' in linea.upper() or 'LABIANA' in linea or 'AXIENCE' in linea or 'CHANELLE' in linea:
+            if not med['laboratorio']:
+                med['laboratorio'] = linea[:100]
+
+        # Principios activos
+        elif 'PRINCIPIOS ACTIVOS' in linea.upper():
+            if siguiente is not None:
+                med['principios_activos'] = siguiente[:150]
+
+        # Especies
+        elif 'ESPECIE' in linea.upper() and 'DESTINO' in linea.upper():
+            if siguiente is not None:
+                med['especies'] = siguiente[:100]
+
+        # Registro
+        elif 'Nº REGISTRO' in linea or 'N° REGISTRO' in linea:
+            if siguiente is not None:
+                med['numero_registro'] = siguiente[:50]
+
+        # Estado
+        elif 'AUTORIZADO' in linea.upper() or 'COMERCIALIZADO' in linea.upper():
+            med['estado'] = linea[:50]
+
+    # Agregar si tiene nombre
+    return med if med['nombre'] and len(med['nombre']) > 5 else None
+
+
+# ========== LXML (STREAMING) ==========
+
+class _ExtractorStreaming:
+    """Consume eventos start/end de HTMLPullParser y produce medicamentos.
+
+    Las tarjetas con clase se emiten al cerrarse. Las fichas por marcas solo se
+    usan si el documento no tiene ninguna tarjeta con clase, así que se
+    guardan (ya extraídas, son diccionarios pequeños) hasta el final.
+    """
+
+    def __init__(self):
+        self.marcas = {}
+        self.tarjetas_abiertas = 0
+        self.hay_tarjetas = False
+        self.fichas = []
+
+    @staticmethod
+    def _es_tarjeta(elem) -> bool:
+        return elem.tag in ETIQUETAS_TARJETA and not CLASES_TARJETA.isdisjoint((elem.get('class') or '').split())
+
+    @staticmethod
+    def _texto(elem) -> str:
+        return ''.join(elem.itertext(tag=etree.Element))
+
+    def procesar(self, eventos) -> Iterator[Dict[str, str]]:
+        for evento, elem in eventos:
+            if not isinstance(elem.tag, str):
+                continue  # comentarios e instrucciones: solo cuenta su tail (lo suma el padre)
+            tarjeta = self._es_tarjeta(elem)
+            if evento == 'start':
+                self.tarjetas_abiertas += tarjeta
+                continue
+
+            marcas = _marcas(elem.text)
+            for hijo in elem:
+                marcas |= self.marcas.pop(hijo, 0) | _marcas(hijo.tail)
+            if tarjeta:
+                self.tarjetas_abiertas -= 1
+
+            if tarjeta and not marcas & CONTIENE_TARJETA:
+                marcas |= CONTIENE_TARJETA
+                self.hay_tarjetas = True
+                med = _medicamento(self._texto(elem))
+                elem.clear(keep_tail=True)
+                if med:
+                    yield med
+            elif elem.tag == 'div' and _es_ficha(marcas) and not marcas & CONTIENE_FICHA:
+                marcas |= CONTIENE_FICHA
+                if not self.hay_tarjetas:
+                    med = _medicamento(self._texto(elem))
+                    if med:
+                        self.fichas.append(med)
+                # Dentro de una tarjeta abierta el texto aún hace falta
+                if not self.tarjetas_abiertas:
+                    elem.clear(keep_tail=True)
+            self.marcas[elem] = marcas
+
+    def finalizar(self) -> Iterator[Dict[str, str]]:
+        if not self.hay_tarjetas:
+            yield from self.fichas
+
+
+def _bloques(fuente, tamano: int) -> Iterable[Union[str, bytes]]:
+    if isinstance(fuente, (str, bytes)):
+        for inicio in range(0, len(fuente), tamano):
+            yield fuente[inicio:inicio + tamano]
+    else:
+        while True:
+            bloque = fuente.read(tamano)
+            if not bloque:
+                return
+            yield bloque
+
+
+def iterar_medicamentos(fuente, tamano_bloque: int = TAMANO_BLOQUE,
+                        encoding: str = 'utf-8') -> Iterator[Dict[str, str]]:
+    """Medicamentos de una página de resultados (str, bytes o fichero abierto) según se van leyendo
+
+    `encoding` solo se usa si llegan bytes (las páginas guardadas no siempre
+    declaran el charset y libxml2 supondría latin-1).
+    """
+    if etree is None:
+        html = fuente if isinstance(fuente, (str, bytes)) else fuente.read()
+        yield from _parsear_bs4(html)
+        return
+
+    parser = None
+    extractor = _ExtractorStreaming()
+    for bloque in _bloques(fuente, tamano_bloque):
+        if parser is None:
+            parser = etree.HTMLPullParser(events=('start', 'end'),
+                                          encoding=encoding if isinstance(bloque, bytes) else None)
+        parser.feed(bloque)
+        yield from extractor.procesar(parser.read_events())
+    if parser is None:
+        return
+    parser.close()
+    yield from extractor.procesar(parser.read_events())
+    yield from extractor.finalizar()
+
+
+# ========== BEAUTIFULSOUP (RESPALDO) ==========
+
+def _parsear_bs4(html) -> List[Dict[str, str]]:
+    """Mismo recorrido en un paso sobre el árbol de html.parser"""
+    soup = BeautifulSoup(html, 'html.parser')
+    tarjetas, fichas = [], []
+
+    def visitar(nodo: Tag) -> int:
+        marcas = 0
+        for hijo in nodo.children:
+            if isinstance(hijo, Tag):
+                marcas |= visitar(hijo)
+            elif type(hijo) is NavigableString:  # sin comentarios ni doctype
+                marcas |= _marcas(hijo)
+        tarjeta = nodo.name in ETIQUETAS_TARJETA and not CLASES_TARJETA.isdisjoint(nodo.get('class') or [])
+        if tarjeta and not marcas & CONTIENE_TARJETA:
+            marcas |= CONTIENE_TARJETA
+            tarjetas.append(_medicamento(nodo.get_text()))
+        elif nodo.name == 'div' and _es_ficha(marcas) and not marcas & CONTIENE_FICHA:
+            marcas |= CONTIENE_FICHA
+            fichas.append(_medicamento(nodo.get_text()))
+        return marcas
+
+    visitar(soup)
+    return [med for med in (tarjetas or fichas) if med]
+
+
+def parsear_medicamentos(html) -> List[Dict[str, str]]:
+    """Medicamentos de una página de resultados (lista vacía si no hay)"""
+    return list(iterar_medicamentos(html))
@@ -0,0 +1,315 @@
+"""
+SCRAPER CIMAVET CONCURRENTE - POOL DE DRIVERS HEADLESS
+
+Reparte el espacio de búsqueda en particiones (especie × letra inicial del
+nombre) y las resuelve con un pool acotado de Chrome headless. Cada paso espera
+a una condición explícita (botón clicable, modal visible, resultados presentes,
+página anterior obsoleta) en lugar de dormir un tiempo fijo.
+
+Uso (desde la raíz del proyecto):
+    python src/scraping/pool_drivers.py --workers 4
+    python src/scraping/pool_drivers.py --especies perros --letras ABC --url http://localhost:8000/home.html
+
+Selenium se importa solo al crear drivers o buscar: el pool y la fusión de
+resultados se pueden usar (y probar) sin él.
+"""
+
+import os
+import sys
+import queue
+import argparse
+import tempfile
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from scraping.parser_cimavet import parsear_medicamentos, clave_medicamento
+
+URL_CIMAVET = "https://cimavet.aemps.es/cimavet/publico/home.html"
+ESPECIES_POR_DEFECTO = ('perros', 'gatos')
+LETRAS_POR_DEFECTO = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+TIMEOUT_POR_DEFECTO = 20
+
+# Selectores CSS de cada paso (los mismos que usa cimavet_final_scraper.py)
+SELECTORES = {
+    'cookies': "a.cc-btn.cc-allow",
+    'avanzado': "#m_buscadoravanzado",
+    'modal': "div.modal-content",
+    'especie': "select#especie",
+    'nombre': "input#nombre",
+    'buscar': "button[type='submit']",
+    'resultados': "div#resultados, table",
+    'siguiente': "a[rel='next']",
+}
+
+
+# ========== PARTICIONES ==========
+
+def particiones(especies: Iterable[str] = ESPECIES_POR_DEFECTO,
+                letras: Iterable[str] = LETRAS_POR_DEFECTO) -> List[Tuple[str, str]]:
+    """(especie, letra) para cada búsqueda independiente"""
+    return [(especie, letra) for especie in especies for letra in letras]
+
+
+def fusionar(lotes: Iterable[List[Dict[str, str]]]) -> List[Dict[str, str]]:
+    """Une los lotes de todas las particiones sin repetir medicamentos (gana el primero)"""
+    vistos = {}
+    for lote in lotes:
+        for med in lote:
+            vistos.setdefault(clave_medicamento(med), med)
+    return list(vistos.values())
+
+
+# ========== DRIVERS ==========
+
+def crear_driver_headless():
+    """Chrome headless con perfil propio (varios en paralelo no comparten directorio)"""
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+
+    options = Options()
+    options.add_argument('--headless=new')
+    options.add_argument('--no-sandbox')
+    options.add_argument('--disable-dev-shm-usage')
+    options.add_argument('--disable-gpu')
+    options.add_argument('--window-size=1366,900')
+    options.add_argument(f'--user-data-dir={tempfile.mkdtemp(prefix="cimavet_chrome_")}')
+    options.add_argument('user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36')
+    return webdriver.Chrome(options=options)
+
+
+class PoolDrivers:
+    """Pool acotado de drivers: se crean bajo demanda, se reutilizan y se reponen si fallan"""
+
+    def __init__(self, tamano: int = 4, fabrica: Callable = crear_driver_headless):
+        self.tamano = max(1, tamano)
+        self.fabrica = fabrica
+        self._libres = queue.Queue()
+        self._creados = 0
+        self._todos = []
+        self._lock = threading.Lock()
+
+    def _adquirir(self):
+        espera = 0
+        while True:
+            try:
+                return self._libres.get(timeout=espera) if espera else self._libres.get_nowait()
+            except queue.Empty:
+                pass
+            # Sin libres: crear uno si queda hueco (también el que deja un driver descartado)
+            with self._lock:
+                if self._creados < self.tamano:
+                    self._creados += 1
+                    break
+            espera = 0.05
+        try:
+            driver = self.fabrica()
+        except Exception:
+            with self._lock:
+                self._creados -= 1
+            raise
+        with self._lock:
+            self._todos.append(driver)
+        return driver
+
+    def _descartar(self, driver):
+        with self._lock:
+            self._creados -= 1
+            if driver in self._todos:
+                self._todos.remove(driver)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    @contextmanager
+    def driver(self):
+        """Presta un driver; si la búsqueda falla se cierra y el hueco queda libre para otro nuevo"""
+        driver = self._adquirir()
+        try:
+            yield driver
+        except Exception:
+            self._descartar(driver)
+            raise
+        self._libres.put(driver)
+
+    def cerrar(self):
+        with self._lock:
+            drivers, self._todos = self._todos, []
+            self._creados = 0
+        for driver in drivers:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+
+# ========== BÚSQUEDA DE UNA PARTICIÓN ==========
+
+def _seleccionar_especie(select_elem, especie: str):
+    from selenium.webdriver.support.ui import Select
+
+    selector = Select(select_elem)
+    for opcion in selector.options:
+        if especie.lower() in opcion.text.lower():
+            selector.select_by_visible_text(opcion.text)
+            return
+    raise ValueError(f"No hay opción para la especie '{especie}'")
+
+
+def buscar_particion(driver, url: str, especie: str, letra: str,
+                     timeout: float = TIMEOUT_POR_DEFECTO) -> List[Dict[str, str]]:
+    """Busca (especie, letra) en el formulario avanzado y recorre todas las páginas de resultados"""
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+
+    wait = WebDriverWait(driver, timeout)
+    driver.get(url)
+
+    # Cookies: solo si el banner está (no se espera a que aparezca)
+    for boton in driver.find_elements(By.CSS_SELECTOR, SELECTORES['cookies']):
+        if boton.is_displayed():
+            boton.click()
+
+    # 1. Formulario avanzado
+    boton = wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, SELECTORES['avanzado'])))
+    driver.execute_script("arguments[0].click();", boton)
+    wait.until(EC.visibility_of_element_located((By.CSS_SELECTOR, SELECTORES['modal'])))
+
+    # 2. Especie y letra inicial
+    _seleccionar_especie(wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, SELECTORES['especie']))),
+                         especie)
+    campo = wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, SELECTORES['nombre'])))
+    campo.clear()
+    campo.send_keys(letra)
+
+    # 3. Buscar y recorrer páginas
+    boton = wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, SELECTORES['buscar'])))
+    driver.execute_script("arguments[0].click();", boton)
+
+    return recorrer_paginas(driver, timeout)
+
+
+def recorrer_paginas(driver, timeout: float = TIMEOUT_POR_DEFECTO) -> List[Dict[str, str]]:
+    """Medicamentos de todas las páginas de resultados, desde la que está cargada y en orden"""
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+
+    wait = WebDriverWait(driver, timeout)
+    medicamentos = []
+    while True:
+        contenedor = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, SELECTORES['resultados'])))
+        medicamentos.extend(parsear_medicamentos(driver.page_source))
+
+        siguiente = driver.find_elements(By.CSS_SELECTOR, SELECTORES['siguiente'])
+        if not siguiente:
+            return medicamentos
+        driver.execute_script("arguments[0].click();", siguiente[0])
+        # La página siguiente está cargada cuando el contenedor anterior deja de existir
+        wait.until(EC.staleness_of(contenedor))
+
+
+# ========== EJECUCIÓN ==========
+
+def ejecutar(url: str = URL_CIMAVET, especies: Iterable[str] = ESPECIES_POR_DEFECTO,
+             letras: Iterable[str] = LETRAS_POR_DEFECTO, tamano: int = 4,
+             fabrica: Callable = crear_driver_headless, buscar: Callable = buscar_particion,
+             timeout: float = TIMEOUT_POR_DEFECTO, trabajos: Optional[List[Tuple[str, str]]] = None,
+             checkpoints: Optional[str] = None, reanudar: bool = True,
+             salida=None) -> Tuple[List[Dict[str, str]], List[Tuple[str, str]]]:
+    """Resuelve todas las particiones con `tamano` drivers. Devuelve (medicamentos únicos, particiones fallidas)
+
+    `trabajos` sustituye al producto especies × letras (p. ej. las particiones
+    que no pudo resolver el scraper HTTP). Con `checkpoints` (ruta SQLite)
+    cada partición se guarda al terminar y una pasada cortada se reanuda.
+    Con `salida` (SalidaRegistros) cada partición se escribe al llegar y no se
+    acumula en memoria: la lista devuelta queda vacía.
+    """
+    trabajos = trabajos if trabajos is not None else particiones(especies, letras)
+    almacen = ejecucion = None
+    if checkpoints is not None:
+        from scraping.checkpoints import AlmacenCheckpoints
+
+        almacen = AlmacenCheckpoints(checkpoints)
+        ejecucion = almacen.iniciar(trabajos, reanudar)
+        trabajos = almacen.pendientes(ejecucion, trabajos)
+    lotes = {}
+    fallidas = []
+
+    try:
+        with PoolDrivers(tamano, fabrica) as pool:
+            def tarea(particion):
+                with pool.driver() as driver:
+                    medicamentos = buscar(driver, url, particion[0], particion[1], timeout)
+                if almacen is not None:
+                    almacen.registrar_particion(ejecucion, particion, medicamentos)
+                return medicamentos
+
+            with ThreadPoolExecutor(max_workers=pool.tamano) as executor:
+                futuros = {executor.submit(tarea, p): p for p in trabajos}
+                for futuro in as_completed(futuros):
+                    particion = futuros[futuro]
+                    try:
+                        medicamentos = futuro.result()
+                        print(f"   ✅ {particion[0]}/{particion[1]}: {len(medicamentos)} medicamentos")
+                        if salida is not None:
+                            salida.escribir_lote(medicamentos)
+                        else:
+                            lotes[particion] = medicamentos
+                    except Exception as e:
+                        fallidas.append(particion)
+                        print(f"   ❌ {particion[0]}/{particion[1]}: {str(e)[:150]}")
+
+        if almacen is not None:
+            if not fallidas:
+                almacen.finalizar(ejecucion)
+            return ([] if salida is not None else list(almacen.medicamentos(ejecucion))), sorted(fallidas)
+    finally:
+        if almacen is not None:
+            almacen.cerrar()
+
+    # Orden de las particiones, no de llegada: la salida no depende de qué hilo acabó antes
+    return fusionar(lotes[p] for p in trabajos if p in lotes), sorted(fallidas)
+
+
+def main():
+    """Función principal"""
+    from scraping.salida_registros import SalidaRegistros
+
+    parser = argparse.ArgumentParser(description="Scraper CIMAVet con pool de drivers headless")
+    parser.add_argument("--workers", type=int, default=4, help="Número de Chrome en paralelo")
+    parser.add_argument("--especies", nargs="+", default=list(ESPECIES_POR_DEFECTO))
+    parser.add_argument("--letras", default=LETRAS_POR_DEFECTO, help="Letras iniciales a buscar")
+    parser.add_argument("--url", default=URL_CIMAVET)
+    parser.add_argument("--timeout", type=float, default=TIMEOUT_POR_DEFECTO, help="Espera máxima por paso (s)")
+    parser.add_argument("--checkpoints", default=None, help="SQLite de checkpoints para reanudar pasadas cortadas")
+    parser.add_argument("--salida", default="data/raw/cimavet_completo.csv", help="Fichero .csv o .jsonl")
+    args = parser.parse_args()
+
+    print("\n" + "="*70)
+    print(f"🚀 SCRAPER CIMAVET CONCURRENTE ({args.workers} drivers)")
+    print("="*70)
+
+    # Con checkpoints se continúa el fichero de la pasada cortada
+    with SalidaRegistros(args.salida, continuar=args.checkpoints is not None) as salida:
+        _, fallidas = ejecutar(args.url, args.especies, args.letras, args.workers, timeout=args.timeout,
+                               checkpoints=args.checkpoints, salida=salida)
+        print(f"\n✅ {salida.resumen()}")
+    if fallidas:
+        print(f"⚠️ Particiones fallidas ({len(fallidas)}): {', '.join(f'{e}/{l}' for e, l in fallidas)}")
+    print("="*70 + "\n")
+
+
+if __name__ == "__main__":
+    main()
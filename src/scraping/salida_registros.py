@@ -0,0 +1,180 @@
+"""
+SALIDA EN STREAMING DE LOS MEDICAMENTOS SCRAPEADOS
+
+Cada registro se añade al fichero (JSONL o CSV) en cuanto se obtiene y se
+vuelca al sistema operativo, así que una caída a mitad deja en disco todo lo
+obtenido hasta ese momento. Los duplicados se descartan por número de registro
+(o por nombre si no lo hay) con un conjunto en memoria o, para catálogos muy
+grandes, en un SQLite junto al fichero: la memoria no crece con los registros.
+
+Al reabrir un fichero existente se continúa: se leen sus claves y los
+registros ya escritos no se repiten.
+"""
+
+import os
+import csv
+import json
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterable, Sequence
+
+from scraping.parser_cimavet import clave_medicamento
+
+CAMPOS_POR_DEFECTO = ('nombre', 'laboratorio', 'principios_activos', 'especies', 'numero_registro', 'estado',
+                      'prescripcion', 'comercializado')
+# Mismo filtro que aplicaba guardar_csv: nombres de 5 caracteres o menos son restos del HTML
+LONGITUD_MINIMA_NOMBRE = 6
+
+
+class VistosMemoria:
+    """Claves ya escritas en un set"""
+
+    def __init__(self):
+        self._claves = set()
+
+    def anadir(self, clave: str) -> bool:
+        """True si la clave es nueva"""
+        if clave in self._claves:
+            return False
+        self._claves.add(clave)
+        return True
+
+    def __len__(self):
+        return len(self._claves)
+
+    def cerrar(self):
+        self._claves.clear()
+
+
+class VistosDisco:
+    """Claves ya escritas en una tabla SQLite (memoria constante)"""
+
+    def __init__(self, ruta):
+        self.ruta = Path(ruta)
+        self._conn = sqlite3.connect(str(self.ruta), isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=OFF')
+        self._conn.execute('CREATE TABLE IF NOT EXISTS vistos (clave TEXT PRIMARY KEY) WITHOUT ROWID')
+
+    def anadir(self, clave: str) -> bool:
+        return self._conn.execute('INSERT OR IGNORE INTO vistos (clave) VALUES (?)', (clave,)).rowcount == 1
+
+    def __len__(self):
+        return self._conn.execute('SELECT COUNT(*) FROM vistos').fetchone()[0]
+
+    def cerrar(self):
+        self._conn.close()
+
+
+class SalidaRegistros:
+    """Sumidero append-only de medicamentos con deduplicación por número de registro.
+
+    El formato sale de la extensión (.jsonl o .csv). Con `continuar=False` el
+    fichero se vacía al abrir.
+    """
+
+    def __init__(self, ruta, campos: Sequence[str] = CAMPOS_POR_DEFECTO, continuar: bool = True,
+                 vistos_en_disco: bool = False):
+        self.ruta = Path(ruta)
+        self.formato = 'csv' if self.ruta.suffix.lower() == '.csv' else 'jsonl'
+        self.campos = list(campos)
+        self.escritos = 0
+        self.duplicados = 0
+        self.descartados = 0
+
+        self.ruta.parent.mkdir(parents=True, exist_ok=True)
+        existe = continuar and self.ruta.exists() and self.ruta.stat().st_size > 0
+        if existe:
+            self._descartar_linea_incompleta()
+            existe = self.ruta.stat().st_size > 0
+        if vistos_en_disco:
+            # Se reconstruye siempre desde el fichero: tras una caída los dos podrían no coincidir
+            ruta_vistos = self.ruta.with_name(self.ruta.name + '.vistos.sqlite')
+            for sufijo in ('', '-wal', '-shm'):
+                Path(str(ruta_vistos) + sufijo).unlink(missing_ok=True)
+            self.vistos = VistosDisco(ruta_vistos)
+        else:
+            self.vistos = VistosMemoria()
+
+        if existe:
+            self._cargar_existente()
+        self._fichero = open(self.ruta, 'a' if existe else 'w', encoding='utf-8', newline='')
+        if self.formato == 'csv':
+            self._csv = csv.DictWriter(self._fichero, fieldnames=self.campos, restval='', extrasaction='ignore')
+            if not existe:
+                self._csv.writeheader()
+
+    def _descartar_linea_incompleta(self):
+        """Una caída a mitad de escritura puede dejar la última línea sin terminar"""
+        with open(self.ruta, 'rb+') as f:
+            f.seek(0, os.SEEK_END)
+            tamano = f.tell()
+            f.seek(max(0, tamano - 65536))
+            cola = f.read()
+            if cola.endswith(b'\n'):
+                return
+            fin = cola.rfind(b'\n')
+            f.truncate(tamano - len(cola) + fin + 1 if fin >= 0 else 0)
+
+    def _cargar_existente(self):
+        """Lee el fichero previo en streaming: cabecera (CSV) y claves ya escritas"""
+        with open(self.ruta, 'r', encoding='utf-8', newline='') as f:
+            if self.formato == 'csv':
+                lector = csv.DictReader(f)
+                self.campos = list(lector.fieldnames or self.campos)
+                registros = lector
+            else:
+                registros = (json.loads(linea) for linea in f if linea.strip())
+            for med in registros:
+                self.vistos.anadir(clave_medicamento(med))
+                self.escritos += 1
+
+    # ========== ESCRITURA ==========
+
+    def escribir(self, med: Dict[str, str]) -> bool:
+        """Añade el registro si es válido y nuevo; True si se ha escrito"""
+        if len(med.get('nombre') or '') < LONGITUD_MINIMA_NOMBRE:
+            self.descartados += 1
+            return False
+        if not self.vistos.anadir(clave_medicamento(med)):
+            self.duplicados += 1
+            return False
+        if self.formato == 'csv':
+            self._csv.writerow(med)
+        else:
+            self._fichero.write(json.dumps(med, ensure_ascii=False) + '\n')
+        self.escritos += 1
+        return True
+
+    def escribir_lote(self, medicamentos: Iterable[Dict[str, str]]) -> int:
+        """Escribe un lote y lo vuelca a disco; devuelve cuántos eran nuevos"""
+        nuevos = sum(self.escribir(med) for med in medicamentos)
+        self._fichero.flush()
+        return nuevos
+
+    def cerrar(self):
+        if not self._fichero.closed:
+            self._fichero.flush()
+            os.fsync(self._fichero.fileno())
+            self._fichero.close()
+            self.vistos.cerrar()
+            if isinstance(self.vistos, VistosDisco):
+                for sufijo in ('', '-wal', '-shm'):
+                    Path(str(self.vistos.ruta) + sufijo).unlink(missing_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+    def resumen(self) -> str:
+        return (f"{self.escritos} medicamentos en {self.ruta.name} "
+                f"({self.duplicados} duplicados y {self.descartados} inválidos descartados)")
+
+
+def guardar_registros(medicamentos: Iterable[Dict[str, str]], ruta, **opciones) -> int:
+    """Escribe un iterable completo en un fichero nuevo; devuelve los registros escritos"""
+    with SalidaRegistros(ruta, continuar=False, **opciones) as salida:
+        salida.escribir_lote(medicamentos)
+        return salida.escritos
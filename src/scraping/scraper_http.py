@@ -0,0 +1,410 @@
+"""
+SCRAPER CIMAVET SIN NAVEGADOR - CLIENTE HTTP ASÍNCRONO
+
+Descarga las búsquedas (y opcionalmente las fichas) de la API REST de CIMAVet
+con un único httpx.AsyncClient: conexiones reutilizadas, un semáforo que
+limita las peticiones en vuelo y un limitador de tasa para no saturar el
+servidor. De cada búsqueda se lee en la primera página cuántas hay y el resto
+se piden en paralelo. Las particiones (especie × letra) que fallan tras los
+reintentos se pueden pasar al pool de Chrome (pool_drivers.py) como último
+recurso.
+
+Uso (desde la raíz del proyecto):
+    python src/scraping/scraper_http.py --concurrencia 8 --por-segundo 10
+    python src/scraping/scraper_http.py --url http://127.0.0.1:8765 --detalles
+    python src/scraping/scraper_http.py --fallback-selenium
+    python src/scraping/scraper_http.py --detalles --checkpoints data/raw/cimavet_checkpoints.sqlite
+"""
+
+import os
+import sys
+import math
+import time
+import asyncio
+import argparse
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import httpx
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from scraping.checkpoints import AlmacenCheckpoints
+from scraping.pool_drivers import (ESPECIES_POR_DEFECTO, LETRAS_POR_DEFECTO, URL_CIMAVET,
+                                   particiones, fusionar)
+
+URL_API = "https://cimavet.aemps.es"
+RUTA_BUSQUEDA = '/cimavet/rest/medicamentos'
+RUTA_DETALLE = '/cimavet/rest/medicamento'
+# Respuestas que merece la pena repetir (el resto de 4xx no cambian al reintentar)
+CODIGOS_REINTENTABLES = {429, 500, 502, 503, 504}
+ESPERA_MAXIMA = 30.0
+
+
+class ErrorCimavetHTTP(Exception):
+    """La API no respondió con datos válidos tras los reintentos"""
+
+
+def normalizar(item: Dict) -> Dict[str, str]:
+    """Resultado de la API -> mismo registro que produce parser_cimavet"""
+    med = {
+        'nombre': item.get('nombre', ''),
+        'laboratorio': item.get('labtitular', ''),
+        'principios_activos': item.get('pactivos', ''),
+        'especies': ', '.join(item.get('especies') or []),
+        'numero_registro': item.get('nregistro', ''),
+        'estado': item.get('estado', ''),
+    }
+    # Campos que solo trae la ficha de detalle
+    if 'cpresc' in item:
+        med['prescripcion'] = item['cpresc']
+    if 'comerc' in item:
+        med['comercializado'] = 'Si' if item['comerc'] else 'No'
+    return med
+
+
+class LimitadorTasa:
+    """Espacia el inicio de las peticiones para no superar `por_segundo`"""
+
+    def __init__(self, por_segundo: float):
+        self.intervalo = 1.0 / por_segundo if por_segundo and por_segundo > 0 else 0.0
+        self._siguiente = 0.0
+        self._lock = asyncio.Lock()
+
+    async def esperar(self):
+        if not self.intervalo:
+            return
+        async with self._lock:
+            ahora = time.monotonic()
+            espera = self._siguiente - ahora
+            self._siguiente = max(ahora, self._siguiente) + self.intervalo
+        if espera > 0:
+            await asyncio.sleep(espera)
+
+
+class ClienteCimavet:
+    """Cliente asíncrono de la API de CIMAVet (usar con `async with`)"""
+
+    def __init__(self, base_url: str = URL_API, concurrencia: int = 8, por_segundo: float = 10.0,
+                 reintentos: int = 3, timeout: float = 20.0, transporte: Optional[httpx.AsyncBaseTransport] = None):
+        self.base_url = base_url
+        self.concurrencia = max(1, concurrencia)
+        self.reintentos = reintentos
+        self.timeout = timeout
+        self.transporte = transporte
+        self.limitador = LimitadorTasa(por_segundo)
+        self.peticiones = 0
+        # (especie, letra) -> {'paginas', 'registros', 'esperados'} de cada partición resuelta
+        self.paginacion = {}
+        self._semaforo = None
+        self._http = None
+
+    async def __aenter__(self):
+        self._semaforo = asyncio.Semaphore(self.concurrencia)
+        self._http = httpx.AsyncClient(
+            base_url=self.base_url, timeout=self.timeout, transport=self.transporte,
+            limits=httpx.Limits(max_connections=self.concurrencia, max_keepalive_connections=self.concurrencia),
+            headers={'User-Agent': 'Mozilla/5.0 (compatible; RecomendacionMedicamentosVetIA)',
+                     'Accept': 'application/json'},
+        )
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._http.aclose()
+
+    # ========== PETICIONES ==========
+
+    async def pedir(self, ruta: str, params: Dict, cabeceras: Optional[Dict[str, str]] = None) -> httpx.Response:
+        """GET con semáforo, limitador de tasa y reintentos con espera exponencial (o Retry-After).
+
+        Devuelve la respuesta 200, o la 304 de una petición condicional.
+        """
+        ultimo_error = None
+        for intento in range(self.reintentos + 1):
+            async with self._semaforo:
+                await self.limitador.esperar()
+                self.peticiones += 1
+                try:
+                    respuesta = await self._http.get(ruta, params=params, headers=cabeceras)
+                except httpx.TransportError as e:
+                    respuesta, ultimo_error = None, e
+
+            if respuesta is not None:
+                if respuesta.status_code in (200, 304):
+                    return respuesta
+                if respuesta.status_code not in CODIGOS_REINTENTABLES:
+                    raise ErrorCimavetHTTP(f"{ruta}: HTTP {respuesta.status_code}")
+                ultimo_error = f"HTTP {respuesta.status_code}"
+
+            if intento < self.reintentos:
+                await asyncio.sleep(self._espera(respuesta, intento))
+        raise ErrorCimavetHTTP(f"{ruta}: {ultimo_error} tras {self.reintentos + 1} intentos")
+
+    async def obtener_json(self, ruta: str, params: Dict) -> Dict:
+        respuesta = await self.pedir(ruta, params)
+        try:
+            return respuesta.json()
+        except ValueError as e:
+            # HTML en lugar de JSON: la API no está disponible en esa URL
+            raise ErrorCimavetHTTP(f"{ruta}: respuesta no es JSON") from e
+
+    @staticmethod
+    def _espera(respuesta: Optional[httpx.Response], intento: int) -> float:
+        cabecera = respuesta.headers.get('Retry-After') if respuesta is not None else None
+        if cabecera is not None:
+            try:
+                return min(float(cabecera), ESPERA_MAXIMA)
+            except ValueError:
+                pass
+        return min(0.5 * 2 ** intento, ESPERA_MAXIMA)
+
+    # ========== CONSULTAS ==========
+
+    async def buscar_particion(self, especie: str, letra: str) -> List[Dict[str, str]]:
+        """Todos los medicamentos de (especie, letra), con las páginas pedidas en paralelo
+
+        La página 1 da el total (totalFilas / tamanioPagina); las demás se
+        piden a la vez, cada una con sus reintentos, y se unen en orden de
+        página. Lo obtenido frente a lo anunciado queda en `self.paginacion`; si
+        faltan registros la partición se da por fallida (ErrorCimavetHTTP).
+        """
+        primera = await self._pagina(especie, letra, 1)
+        total = int(primera.get('totalFilas') or 0)
+        tamano = int(primera.get('tamanioPagina') or len(primera.get('resultados') or []) or 1)
+        paginas = max(1, math.ceil(total / tamano))
+
+        resto = await asyncio.gather(*(self._pagina(especie, letra, pagina, min(tamano, total - (pagina - 1) * tamano))
+                                       for pagina in range(2, paginas + 1)), return_exceptions=True)
+        errores = [r for r in resto if isinstance(r, Exception)]
+        if errores:
+            raise errores[0]
+
+        medicamentos = [normalizar(item) for datos in [primera, *resto] for item in datos.get('resultados') or []]
+        self.paginacion[(especie, letra)] = {'paginas': paginas, 'registros': len(medicamentos), 'esperados': total}
+        if len(medicamentos) < total:
+            # Incompleta cuenta como fallida: no se marca hecha y la reintenta el fallback o la próxima pasada
+            raise ErrorCimavetHTTP(f"{especie}/{letra}: {len(medicamentos)} de {total} registros")
+        return medicamentos
+
+    async def _pagina(self, especie: str, letra: str, pagina: int, filas: Optional[int] = None) -> Dict:
+        """Una página de la búsqueda (con los reintentos HTTP de `pedir`).
+
+        Si trae menos de las `filas` esperadas (página cortada) se vuelve a
+        pedir; si sigue incompleta se devuelve y la diferencia sale en el informe.
+        """
+        params = {'nombre': letra, 'especie': especie, 'pagina': pagina}
+        for intento in range(self.reintentos + 1):
+            datos = await self.obtener_json(RUTA_BUSQUEDA, params)
+            if filas is None or len(datos.get('resultados') or []) >= filas:
+                break
+            if intento < self.reintentos:
+                await asyncio.sleep(self._espera(None, intento))
+        return datos
+
+    async def detalle(self, numero_registro: str) -> Dict[str, str]:
+        return normalizar(await self.obtener_json(RUTA_DETALLE, {'nregistro': numero_registro}))
+
+    async def detalle_condicional(self, numero_registro: str, etag: Optional[str] = None,
+                                  last_modified: Optional[str] = None) -> Tuple[Optional[Dict[str, str]], Dict]:
+        """(ficha, validadores); la ficha es None si el servidor responde 304 (no ha cambiado)"""
+        cabeceras = {}
+        if etag:
+            cabeceras['If-None-Match'] = etag
+        if last_modified:
+            cabeceras['If-Modified-Since'] = last_modified
+        respuesta = await self.pedir(RUTA_DETALLE, {'nregistro': numero_registro}, cabeceras)
+        validadores = {'etag': respuesta.headers.get('ETag'), 'last_modified': respuesta.headers.get('Last-Modified')}
+        if respuesta.status_code == 304:
+            return None, validadores
+        try:
+            return normalizar(respuesta.json()), validadores
+        except ValueError as e:
+            raise ErrorCimavetHTTP(f"{RUTA_DETALLE}: respuesta no es JSON") from e
+
+    async def scrapear(self, trabajos: List[Tuple[str, str]], detalles: bool = False, almacen=None,
+                       ejecucion: Optional[int] = None,
+                       salida=None) -> Tuple[Iterable[Dict[str, str]], List[Tuple[str, str]]]:
+        """Resuelve las particiones en paralelo. Devuelve (medicamentos únicos, particiones fallidas)
+
+        Con `almacen` (AlmacenCheckpoints) cada partición se guarda al terminar
+        y no se acumula, las fichas solo se piden para medicamentos nuevos o
+        cambiados (con petición condicional) y el resultado es un iterador
+        sobre toda la pasada `ejecucion` en el almacén.
+        Sin almacén y con `salida` (SalidaRegistros) cada partición, con sus
+        fichas si se piden, se escribe al llegar y no se acumula: la lista
+        devuelta queda vacía.
+        """
+        async def resolver(especie, letra):
+            medicamentos = await self.buscar_particion(especie, letra)
+            if almacen is not None:
+                almacen.registrar_particion(ejecucion, (especie, letra), medicamentos)
+                return []
+            if salida is not None:
+                if detalles:
+                    medicamentos = await self._con_fichas(medicamentos)
+                salida.escribir_lote(medicamentos)
+                return []
+            return medicamentos
+
+        resultados = await asyncio.gather(*(resolver(e, l) for e, l in trabajos), return_exceptions=True)
+        lotes, fallidas = [], []
+        for (especie, letra), resultado in zip(trabajos, resultados):
+            if isinstance(resultado, Exception):
+                fallidas.append((especie, letra))
+                print(f"   ❌ {especie}/{letra}: {str(resultado)[:150]}")
+            else:
+                lotes.append(resultado)
+
+        if almacen is not None:
+            if detalles:
+                await self._actualizar_fichas(almacen, ejecucion)
+            return almacen.medicamentos(ejecucion), fallidas
+
+        medicamentos = fusionar(lotes)
+        if detalles and salida is None:
+            medicamentos = await self._con_fichas(medicamentos)
+        return medicamentos, fallidas
+
+    async def _con_fichas(self, medicamentos: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """Sustituye cada registro del listado por su ficha (se queda el del listado si falla)"""
+        fichas = await asyncio.gather(*(self.detalle(m['numero_registro']) for m in medicamentos),
+                                      return_exceptions=True)
+        return [ficha if not isinstance(ficha, Exception) else med for med, ficha in zip(medicamentos, fichas)]
+
+    async def _actualizar_fichas(self, almacen, ejecucion: int):
+        """Descarga condicional de las fichas pendientes; cada una se guarda al llegar"""
+        async def actualizar(numero_registro):
+            etag, last_modified = almacen.validadores(numero_registro)
+            ficha, validadores = await self.detalle_condicional(numero_registro, etag, last_modified)
+            almacen.guardar_detalle(numero_registro, ficha, **validadores)
+
+        resultados = await asyncio.gather(*(actualizar(r) for r in almacen.pendientes_detalle(ejecucion)),
+                                          return_exceptions=True)
+        errores = [r for r in resultados if isinstance(r, Exception)]
+        if errores:
+            # Quedan pendientes en el almacén: la próxima ejecución las reintenta
+            print(f"   ⚠️ {len(errores)} fichas sin descargar: {str(errores[0])[:150]}")
+
+
+# ========== EJECUCIÓN ==========
+
+def resumen_paginacion(paginacion: Dict[Tuple[str, str], Dict[str, int]]) -> Dict:
+    """Totales de páginas y registros frente a los anunciados por la API, y particiones incompletas"""
+    return {'particiones': len(paginacion),
+            'paginas': sum(p['paginas'] for p in paginacion.values()),
+            'registros': sum(p['registros'] for p in paginacion.values()),
+            'esperados': sum(p['esperados'] for p in paginacion.values()),
+            'incompletas': sorted(particion for particion, p in paginacion.items()
+                                  if p['registros'] != p['esperados'])}
+
+
+def mostrar_paginacion(paginacion: Dict[Tuple[str, str], Dict[str, int]]):
+    resumen = resumen_paginacion(paginacion)
+    print(f"   📄 {resumen['paginas']} páginas en {resumen['particiones']} particiones: "
+          f"{resumen['registros']} de {resumen['esperados']} registros esperados")
+    for especie, letra in resumen['incompletas']:
+        p = paginacion[(especie, letra)]
+        print(f"   ⚠️ {especie}/{letra}: {p['registros']} de {p['esperados']} registros")
+
+
+def ejecutar(base_url: str = URL_API, especies: Iterable[str] = ESPECIES_POR_DEFECTO,
+             letras: Iterable[str] = LETRAS_POR_DEFECTO, concurrencia: int = 8, por_segundo: float = 10.0,
+             detalles: bool = False, fallback: Optional[Callable] = None, checkpoints: Optional[str] = None,
+             reanudar: bool = True, salida=None, **opciones) -> Tuple[List[Dict[str, str]], List[Tuple[str, str]]]:
+    """Scraping HTTP completo; las particiones fallidas se reintentan con `fallback(trabajos)` si se da.
+
+    Con `checkpoints` (ruta SQLite) la pasada es reanudable e incremental: solo
+    se piden las particiones pendientes y las fichas de lo que ha cambiado.
+    Con `salida` (SalidaRegistros) los medicamentos van al fichero en lugar de
+    devolverse (lista vacía).
+    """
+    trabajos = particiones(especies, letras)
+    almacen = ejecucion = None
+    if checkpoints is not None:
+        almacen = AlmacenCheckpoints(checkpoints)
+        ejecucion = almacen.iniciar(trabajos, reanudar)
+        pendientes = almacen.pendientes(ejecucion, trabajos)
+        if len(pendientes) < len(trabajos):
+            print(f"   ⏩ Reanudando pasada {ejecucion}: {len(trabajos) - len(pendientes)} particiones ya hechas")
+        trabajos = pendientes
+
+    paginacion = {}
+
+    async def _scrapear():
+        async with ClienteCimavet(base_url, concurrencia, por_segundo, **opciones) as cliente:
+            try:
+                return await cliente.scrapear(trabajos, detalles, almacen, ejecucion, salida)
+            finally:
+                paginacion.update(cliente.paginacion)
+
+    try:
+        medicamentos, fallidas = asyncio.run(_scrapear())
+        mostrar_paginacion(paginacion)
+        if fallidas and fallback is not None:
+            print(f"   🔁 {len(fallidas)} particiones al fallback con navegador...")
+            if almacen is not None:
+                _, fallidas = fallback(fallidas, checkpoints=checkpoints)
+                medicamentos = almacen.medicamentos(ejecucion)
+            else:
+                rescatados, fallidas = fallback(fallidas)
+                medicamentos = fusionar([medicamentos, rescatados])
+        if almacen is not None and not fallidas:
+            almacen.finalizar(ejecucion)
+        if salida is not None:
+            # Sin almacén ya se ha escrito todo salvo lo rescatado; con almacén se vuelca
+            # la pasada leyéndola del almacén por lotes, sin tenerla entera en memoria
+            salida.escribir_lote(medicamentos)
+            medicamentos = []
+        elif almacen is not None:
+            medicamentos = list(medicamentos)
+    finally:
+        if almacen is not None:
+            almacen.cerrar()
+    return medicamentos, fallidas
+
+
+def fallback_selenium(tamano: int = 2, url: str = URL_CIMAVET) -> Callable:
+    """Fallback que resuelve las particiones con el pool de Chrome headless"""
+    from scraping import pool_drivers
+
+    def resolver(trabajos, checkpoints=None):
+        return pool_drivers.ejecutar(url, tamano=tamano, trabajos=trabajos, checkpoints=checkpoints)
+    return resolver
+
+
+def main():
+    """Función principal"""
+    from scraping.salida_registros import SalidaRegistros
+
+    parser = argparse.ArgumentParser(description="Scraper CIMAVet por HTTP (sin navegador)")
+    parser.add_argument("--url", default=URL_API, help="Base de la API (p. ej. el servidor local)")
+    parser.add_argument("--concurrencia", type=int, default=8, help="Peticiones simultáneas máximas")
+    parser.add_argument("--por-segundo", type=float, default=10.0, help="Peticiones por segundo (0 = sin límite)")
+    parser.add_argument("--especies", nargs="+", default=list(ESPECIES_POR_DEFECTO))
+    parser.add_argument("--letras", default=LETRAS_POR_DEFECTO, help="Letras iniciales a buscar")
+    parser.add_argument("--detalles", action="store_true", help="Descarga también la ficha de cada medicamento")
+    parser.add_argument("--fallback-selenium", action="store_true",
+                        help="Reintenta con Chrome headless las particiones que fallen")
+    parser.add_argument("--checkpoints", default=None,
+                        help="SQLite de checkpoints: reanuda pasadas cortadas y solo descarga lo que cambia")
+    parser.add_argument("--nueva", action="store_true", help="Empieza una pasada nueva aunque haya una sin terminar")
+    parser.add_argument("--salida", default="data/raw/cimavet_completo.csv", help="Fichero .csv o .jsonl")
+    args = parser.parse_args()
+
+    print("\n" + "="*70)
+    print(f"⚡ SCRAPER CIMAVET HTTP ({args.concurrencia} en vuelo, {args.por_segundo:g} pet/s)")
+    print("="*70)
+
+    inicio = time.perf_counter()
+    # Con checkpoints la pasada se vuelca al final desde el almacén; sin ellos se escribe según llega
+    with SalidaRegistros(args.salida, continuar=False) as salida:
+        _, fallidas = ejecutar(args.url, args.especies, args.letras, args.concurrencia, args.por_segundo,
+                               args.detalles, fallback_selenium() if args.fallback_selenium else None,
+                               checkpoints=args.checkpoints, reanudar=not args.nueva, salida=salida)
+        print(f"\n✅ {salida.resumen()} ({time.perf_counter() - inicio:.2f}s)")
+    if fallidas:
+        print(f"⚠️ Particiones fallidas ({len(fallidas)}): {', '.join(f'{e}/{l}' for e, l in fallidas)}")
+    print("="*70 + "\n")
+
+
+if __name__ == "__main__":
+    main()
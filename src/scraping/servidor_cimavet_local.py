@@ -0,0 +1,229 @@
+"""
+SERVIDOR CIMAVET LOCAL - SUSTITUTO SIN RED PARA TESTS Y BENCHMARKS
+
+Sirve un catálogo grabado (JSON) con los mismos endpoints REST que consume
+scraper_http.py y una latencia configurable, para medir el rendimiento del
+scraper sin tocar CIMAVet.
+
+Uso (desde la raíz del proyecto):
+    python src/scraping/servidor_cimavet_local.py --puerto 8765 --latencia 0.05
+
+Endpoints:
+    GET /cimavet/rest/medicamentos?nombre=<prefijo>&especie=<texto>&pagina=<n>
+    GET /cimavet/rest/medicamento?nregistro=<nº registro>
+        (con ETag y Last-Modified; responde 304 a If-None-Match / If-Modified-Since)
+"""
+
+import json
+import time
+import hashlib
+import argparse
+import threading
+from pathlib import Path
+from collections import Counter
+from urllib.parse import urlparse, parse_qs
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict, List, Optional, Tuple
+
+CATALOGO_POR_DEFECTO = Path(__file__).resolve().parents[2] / 'tests' / 'fixtures' / 'cimavet' / 'api' / 'medicamentos.json'
+RUTA_BUSQUEDA = '/cimavet/rest/medicamentos'
+RUTA_DETALLE = '/cimavet/rest/medicamento'
+
+
+def cargar_catalogo(ruta=CATALOGO_POR_DEFECTO) -> List[Dict]:
+    with open(ruta, 'r', encoding='utf-8') as f:
+        return json.load(f)['medicamentos']
+
+
+class _Manejador(BaseHTTPRequestHandler):
+    """Atiende las peticiones con el estado del ServidorCimavetLocal que lo creó"""
+
+    servidor_local = None
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        estado = self.servidor_local
+        url = urlparse(self.path)
+        estado._entrar(url.path)
+        try:
+            if estado.latencia:
+                time.sleep(estado.latencia)
+            if estado._fallo_transitorio():
+                return self._responder(503, {'error': 'Servicio no disponible'}, {'Retry-After': '0'})
+
+            params = {k: v[0] for k, v in parse_qs(url.query).items()}
+            if url.path == RUTA_BUSQUEDA:
+                return self._responder(200, estado.buscar(params.get('nombre', ''), params.get('especie', ''),
+                                                          int(params.get('pagina', 1))))
+            if url.path == RUTA_DETALLE:
+                return self._detalle(params.get('nregistro', ''))
+            self._responder(404, {'error': 'Ruta desconocida'})
+        finally:
+            estado._salir()
+
+    def _detalle(self, numero_registro: str):
+        estado = self.servidor_local
+        medicamento = estado.por_registro.get(numero_registro)
+        if medicamento is None:
+            return self._responder(404, {'error': 'No encontrado'})
+
+        etag, modificado = estado.validadores(numero_registro)
+        cabeceras = {'ETag': etag, 'Last-Modified': formatdate(modificado, usegmt=True)}
+        if_none_match = self.headers.get('If-None-Match')
+        if_modified_since = self.headers.get('If-Modified-Since')
+        if if_none_match is not None:
+            no_modificado = if_none_match == etag
+        elif if_modified_since is not None:
+            no_modificado = int(modificado) <= parsedate_to_datetime(if_modified_since).timestamp()
+        else:
+            no_modificado = False
+        if no_modificado:
+            estado._anotar_no_modificado()
+            return self._responder(304, None, cabeceras)
+        return self._responder(200, medicamento, cabeceras)
+
+    def _responder(self, codigo: int, cuerpo: Optional[Dict], cabeceras: Dict[str, str] = None):
+        datos = b'' if cuerpo is None else json.dumps(cuerpo, ensure_ascii=False).encode('utf-8')
+        self.send_response(codigo)
+        if cuerpo is not None:
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(datos)))
+        for nombre, valor in (cabeceras or {}).items():
+            self.send_header(nombre, valor)
+        self.end_headers()
+        self.wfile.write(datos)
+
+
+class ServidorCimavetLocal:
+    """Servidor HTTP en un hilo con el catálogo grabado; se usa como context manager"""
+
+    def __init__(self, catalogo: List[Dict] = None, latencia: float = 0.0, tamano_pagina: int = 10,
+                 fallos_transitorios: int = 0, puerto: int = 0, paginas_cortadas: int = 0):
+        self.catalogo = sorted(catalogo if catalogo is not None else cargar_catalogo(), key=lambda m: m['nombre'])
+        self.por_registro = {m['nregistro']: m for m in self.catalogo}
+        # Fecha de última modificación por producto (todas iguales hasta que se llame a `modificar`)
+        self.modificados = dict.fromkeys(self.por_registro, time.time() - 86400)
+        self.latencia = latencia
+        self.tamano_pagina = tamano_pagina
+        self.fallos_pendientes = fallos_transitorios
+        # Páginas (a partir de la 2) que se sirven sin su última fila, como una respuesta cortada
+        self.cortes_pendientes = paginas_cortadas
+        self.puerto = puerto
+
+        # Métricas para tests y benchmarks
+        self.peticiones = 0
+        self.simultaneas = 0
+        self.max_simultaneas = 0
+        self.no_modificados = 0
+        self.por_ruta = Counter()
+        self._lock = threading.Lock()
+        self._httpd = None
+
+    # ========== CONSULTAS ==========
+
+    def buscar(self, nombre: str, especie: str, pagina: int) -> Dict:
+        """Página `pagina` (desde 1) de los medicamentos cuyo nombre empieza por `nombre`"""
+        nombre, especie = nombre.lower(), especie.lower()
+        filas = [m for m in self.catalogo
+                 if m['nombre'].lower().startswith(nombre)
+                 and (not especie or any(especie in e.lower() for e in m['especies']))]
+        inicio = (pagina - 1) * self.tamano_pagina
+        resultados = filas[inicio:inicio + self.tamano_pagina]
+        if pagina > 1 and resultados and self._pagina_cortada():
+            resultados = resultados[:-1]
+        return {'totalFilas': len(filas), 'pagina': pagina, 'tamanioPagina': self.tamano_pagina,
+                'resultados': resultados}
+
+    def validadores(self, numero_registro: str) -> Tuple[str, float]:
+        """(ETag, fecha de modificación) de la ficha"""
+        cuerpo = json.dumps(self.por_registro[numero_registro], sort_keys=True, ensure_ascii=False)
+        return f'"{hashlib.md5(cuerpo.encode("utf-8")).hexdigest()}"', self.modificados[numero_registro]
+
+    def modificar(self, numero_registro: str, **campos):
+        """Simula un cambio en CIMAVet (nuevo ETag y fecha de modificación)"""
+        medicamento = dict(self.por_registro[numero_registro], **campos)
+        with self._lock:
+            self.catalogo = [medicamento if m['nregistro'] == numero_registro else m for m in self.catalogo]
+            self.por_registro[numero_registro] = medicamento
+            self.modificados[numero_registro] = time.time() + 1
+
+    # ========== MÉTRICAS ==========
+
+    def _entrar(self, ruta: str):
+        with self._lock:
+            self.peticiones += 1
+            self.por_ruta[ruta] += 1
+            self.simultaneas += 1
+            self.max_simultaneas = max(self.max_simultaneas, self.simultaneas)
+
+    def _salir(self):
+        with self._lock:
+            self.simultaneas -= 1
+
+    def _anotar_no_modificado(self):
+        with self._lock:
+            self.no_modificados += 1
+
+    def _fallo_transitorio(self) -> bool:
+        with self._lock:
+            if self.fallos_pendientes > 0:
+                self.fallos_pendientes -= 1
+                return True
+            return False
+
+    def _pagina_cortada(self) -> bool:
+        with self._lock:
+            if self.cortes_pendientes > 0:
+                self.cortes_pendientes -= 1
+                return True
+            return False
+
+    # ========== CICLO DE VIDA ==========
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._httpd.server_address[1]}"
+
+    def iniciar(self) -> 'ServidorCimavetLocal':
+        manejador = type('Manejador', (_Manejador,), {'servidor_local': self})
+        self._httpd = ThreadingHTTPServer(('127.0.0.1', self.puerto), manejador)
+        self._httpd.daemon_threads = True
+        threading.Thread(target=self._httpd.serve_forever, args=(0.05,), daemon=True).start()
+        return self
+
+    def detener(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *exc):
+        self.detener()
+
+
+def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(description="Servidor CIMAVet local con el catálogo grabado")
+    parser.add_argument("--puerto", type=int, default=8765)
+    parser.add_argument("--latencia", type=float, default=0.0, help="Segundos de espera por petición")
+    parser.add_argument("--tamano-pagina", type=int, default=10)
+    parser.add_argument("--catalogo", default=str(CATALOGO_POR_DEFECTO))
+    args = parser.parse_args()
+
+    servidor = ServidorCimavetLocal(cargar_catalogo(args.catalogo), args.latencia, args.tamano_pagina,
+                                    puerto=args.puerto).iniciar()
+    print(f"🌐 CIMAVet local en {servidor.url} ({len(servidor.catalogo)} medicamentos) — Ctrl+C para parar")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        servidor.detener()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+import os
+import shutil
+
+import pytest
+
+KG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'knowledge_graph')
+
+
+@pytest.fixture(scope="session", autouse=True)
+def directorio_de_trabajo(tmp_path_factory):
+    """Los tests se ejecutan sobre una copia de data/knowledge_graph/.
+
+    Motor, loader, journals y overlay abren sus ficheros con rutas relativas y
+    dejan locks (y, si escriben, journals) junto a ellos: así no quedan en el
+    grafo real del repositorio.
+    """
+    raiz = tmp_path_factory.mktemp("proyecto")
+    shutil.copytree(KG_DIR, raiz / 'data' / 'knowledge_graph',
+                    ignore=shutil.ignore_patterns('*.lock', '*.journal*', 'relaciones_enfermedades_admin*'))
+    anterior = os.getcwd()
+    os.chdir(raiz)
+    try:
+        yield raiz
+    finally:
+        os.chdir(anterior)
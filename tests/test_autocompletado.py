@@ -0,0 +1,99 @@
+import os
+import sys
+import json
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from processing.enfermedades_loader import EnfermedadesLoader
+from processing.principios_index import PrincipiosIndex, normalizar_texto
+from processing.catalogo_index import tokenizar
+from processing.autocompletado import Autocompletado, ultima_palabra, completar_texto
+
+KG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'knowledge_graph')
+
+
+def _cargar(nombre):
+    with open(os.path.join(KG_DIR, nombre), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+@pytest.fixture(scope="module")
+def medicamentos():
+    return _cargar('mapeo_enfermedades_medicamentos.json')['medicamentos']
+
+
+@pytest.fixture(scope="module")
+def autocompletado(medicamentos):
+    """Fixture que indexa medicamentos, principios y síntomas una vez"""
+    indice = PrincipiosIndex(medicamentos, _cargar('categorias_medicamentos.json')['categorias'])
+    return Autocompletado(medicamentos, indice, EnfermedadesLoader().indice_busqueda)
+
+
+class TestAutocompletado:
+    """Tests para las sugerencias mientras se escribe"""
+
+    # ========== TESTS DE SUGERENCIAS ==========
+
+    def test_prefijo_nombre(self, autocompletado):
+        """Todas las sugerencias contienen una palabra que empieza por el prefijo"""
+        sugerencias = autocompletado.sugerir('amox', 10)
+        assert len(sugerencias) >= 5
+        for s in sugerencias:
+            palabras = normalizar_texto(s['texto']).replace('/', ' ').split()
+            assert any(p.startswith('amox') for p in palabras)
+
+    def test_por_tipo(self, autocompletado):
+        """Se puede pedir un único tipo de término"""
+        sintomas = autocompletado.sugerir('oid', 5, ('sintoma',))
+        assert sintomas and all(s['tipo'] == 'sintoma' for s in sintomas)
+        assert 'oido' in [s['texto'] for s in sintomas]
+        principios = autocompletado.sugerir('meloxi', 5, ('principio',))
+        assert principios[0]['texto'].upper().startswith('MELOXICAM')
+
+    def test_palabra_interior(self, autocompletado):
+        """Un término casa también por el inicio de cualquiera de sus palabras"""
+        textos = [s['texto'] for s in autocompletado.sugerir('sacude cab', 5, ('sintoma',))]
+        assert 'sacude cabeza' in textos
+        assert any('clavul' in normalizar_texto(s['texto'])
+                   for s in autocompletado.sugerir('clavul', 5, ('principio',)))
+
+    def test_sin_resultados(self, autocompletado):
+        assert autocompletado.sugerir('zzzz') == []
+        assert autocompletado.sugerir('   ') == []
+
+    def test_prefijo_corto_igual_a_calculado(self, autocompletado):
+        """El top precalculado de prefijos cortos coincide con el cálculo directo"""
+        indice = autocompletado.indices['medicamento']
+        for prefijo in ['a', 'ot', 'ami']:
+            assert indice.top(prefijo, 8) == indice._calcular_top(prefijo, 8)
+
+    def test_prefijo_corto_sin_recorrer_el_indice(self, autocompletado, monkeypatch):
+        """Los prefijos cortos salen de la tabla precalculada, sin recorrer su rango del array"""
+        def recorrido(prefijo, n):
+            raise AssertionError(f"recorrido para '{prefijo}'")
+
+        for indice in autocompletado.indices.values():
+            monkeypatch.setattr(indice, '_calcular_top', recorrido)
+        for q in ['a', 'am', 'amo', 'p', 'ot']:
+            assert autocompletado.sugerir(q, 8)
+
+    def test_cuantas_sugerencias(self, autocompletado):
+        """Devuelve min(n, términos que casan) sugerencias, sin repetir ninguna"""
+        for q in ['a', 'am', 'amox', 'otitis', 'sacude cab', 'p', 'zzzz']:
+            prefijo = " ".join(tokenizar(q))
+            casan = sum(
+                1 for indice in autocompletado.indices.values() for texto in indice.textos
+                if any(" ".join(tokenizar(texto)[i:]).startswith(prefijo) for i in range(len(tokenizar(texto)))))
+            for n in (1, 8, 50):
+                sugerencias = autocompletado.sugerir(q, n)
+                assert len(sugerencias) == min(n, casan), (q, n)
+                assert len({(s['texto'], s['tipo']) for s in sugerencias}) == len(sugerencias)
+
+    # ========== TESTS DE EDICIÓN DEL TEXTO ==========
+
+    def test_completar_texto(self):
+        assert ultima_palabra('Perro con pica') == 'pica'
+        assert ultima_palabra('Perro con ') == ''
+        assert completar_texto('Perro con pica', 'picazón') == 'Perro con picazón '
@@ -0,0 +1,113 @@
+import os
+import sys
+import json
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from processing.catalogo_index import CatalogoIndex, posiciones_bits, tokenizar
+
+KG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'knowledge_graph')
+
+
+@pytest.fixture(scope="module")
+def medicamentos():
+    with open(os.path.join(KG_DIR, 'mapeo_enfermedades_medicamentos.json'), 'r', encoding='utf-8') as f:
+        return json.load(f)['medicamentos']
+
+
+@pytest.fixture(scope="module")
+def indice(medicamentos):
+    """Fixture que construye el índice del vademécum una vez"""
+    return CatalogoIndex(medicamentos)
+
+
+def _busqueda_lineal(medicamentos, texto, especie=None, receta=None):
+    """Referencia: recorrido completo del catálogo con los mismos criterios"""
+    tokens = tokenizar(texto)
+    ids = []
+    for med_id, m in medicamentos.items():
+        if especie:
+            esp = m.get('especie', '').upper()
+            if especie.upper() not in esp and 'AMBOS' not in esp:
+                continue
+        presc = m.get('prescripcion', '')
+        if receta is True and "Sujeto" not in presc:
+            continue
+        if receta is False and "No sujeto" not in presc:
+            continue
+        propios = tokenizar(" ".join([m.get('nombre', ''), " ".join(m.get('principios_activos', [])),
+                                      m.get('titular', '') or '']))
+        if all(any(p.startswith(t) for p in propios) for t in tokens):
+            ids.append(med_id)
+    return ids
+
+
+class TestCatalogoIndex:
+    """Tests para el índice invertido del vademécum"""
+
+    # ========== TESTS DE BÚSQUEDA ==========
+
+    def test_buscar_por_nombre(self, indice):
+        """Búsqueda por nombre comercial"""
+        resultado = indice.buscar("DEXAVEX")
+        assert resultado.total > 0
+        assert 'DEXAVEX' in resultado.pagina(1)[0]['nombre']
+
+    def test_buscar_por_prefijo_y_acentos(self, indice):
+        """Prefijos y texto sin mayúsculas ni acentos"""
+        assert indice.buscar("amoxicil").total == indice.buscar("AMOXICILINA").total > 0
+        assert indice.buscar("MEDICAMENTOFICTICIO").total == 0
+
+    @pytest.mark.parametrize("texto,especie,receta", [
+        ("meloxicam", None, None),
+        ("fipro", "Gato", None),
+        ("", "Perro", True),
+        ("zoetis", None, False),
+        ("milbemicina prazi", "Perro", True),
+    ])
+    def test_equivale_a_recorrido(self, indice, medicamentos, texto, especie, receta):
+        """El índice devuelve lo mismo y en el mismo orden que el recorrido lineal"""
+        resultado = indice.buscar(texto, especie, receta)
+        assert list(resultado.ids()) == _busqueda_lineal(medicamentos, texto, especie, receta)
+
+    # ========== TESTS DE PAGINACIÓN ==========
+
+    def test_paginas_perezosas(self, indice):
+        """Las páginas concatenadas reproducen el resultado completo"""
+        resultado = indice.buscar("", "Perro")
+        tamano = 100
+        concatenado = []
+        for numero in range(1, resultado.paginas(tamano) + 1):
+            concatenado.extend(m['id'] for m in resultado.pagina(numero, tamano))
+        assert concatenado == list(resultado.ids())
+        assert resultado.pagina(resultado.paginas(tamano) + 1, tamano) == []
+
+    def test_posiciones_bits(self):
+        """Recorrido de bits con salto inicial"""
+        assert list(posiciones_bits(0b101101)) == [0, 2, 3, 5]
+        assert list(posiciones_bits(0b101101, desde=1, cuantos=2)) == [2, 3]
+        assert list(posiciones_bits(0)) == []
+
+    # ========== TESTS DE FACETAS ==========
+
+    def test_facetas_coinciden_con_busqueda(self, indice):
+        """Cada recuento es el total de la búsqueda con esa opción elegida"""
+        conteos = indice.facetas("amox", especie="Perro")
+        for especie in [None] + indice.especies:
+            assert conteos['especie'][especie] == indice.buscar("amox", especie).total
+        for receta in (True, False):
+            assert conteos['receta'][receta] == indice.buscar("amox", "Perro", receta).total
+        for comercializado in (True, False):
+            assert (conteos['comercializado'][comercializado]
+                    == indice.buscar("amox", "Perro", comercializado=comercializado).total)
+        for titular, n in conteos['titular'].items():
+            assert n == indice.buscar("amox", "Perro", titular=titular).total > 0
+
+    def test_facetas_sin_filtros(self, indice, medicamentos):
+        """Sin texto ni filtros, los titulares cubren todo el catálogo con titular"""
+        conteos = indice.facetas()
+        assert conteos['receta'][None] == len(medicamentos)
+        con_titular = sum(1 for m in medicamentos.values() if (m.get('titular') or '').strip())
+        assert sum(n for t, n in conteos['titular'].items() if t is not None) == con_titular
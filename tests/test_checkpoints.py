@@ -0,0 +1,132 @@
+import os
+import sys
+import json
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from scraping import checkpoints
+from scraping.checkpoints import AlmacenCheckpoints
+from scraping.servidor_cimavet_local import ServidorCimavetLocal, RUTA_BUSQUEDA, RUTA_DETALLE
+from scraping.scraper_http import ejecutar
+from scraping.salida_registros import SalidaRegistros
+
+PARTICIONES = [('perros', 'A'), ('perros', 'B'), ('gatos', 'A')]
+
+
+def med(registro, nombre='AMOXICILINA 250 MG'):
+    return {'nombre': nombre, 'numero_registro': registro}
+
+
+class TestAlmacenCheckpoints:
+    """Tests para el almacén SQLite de checkpoints"""
+
+    def test_reanuda_la_pasada_cortada(self, tmp_path):
+        ruta = tmp_path / "checkpoints.sqlite"
+        with AlmacenCheckpoints(ruta) as almacen:
+            ejecucion = almacen.iniciar(PARTICIONES)
+            almacen.registrar_particion(ejecucion, ('perros', 'A'), [med('1 ESP'), med('2 ESP')])
+
+        # Otro proceso (tras la caída) retoma la misma pasada con lo que faltaba
+        with AlmacenCheckpoints(ruta) as almacen:
+            assert almacen.iniciar(PARTICIONES) == ejecucion
+            assert almacen.pendientes(ejecucion, PARTICIONES) == [('perros', 'B'), ('gatos', 'A')]
+            assert [m['numero_registro'] for m in almacen.medicamentos(ejecucion)] == ['1 ESP', '2 ESP']
+
+            almacen.finalizar(ejecucion)
+            assert almacen.iniciar(PARTICIONES) != ejecucion
+
+    def test_solo_cambiados_piden_ficha(self, tmp_path):
+        with AlmacenCheckpoints(tmp_path / "checkpoints.sqlite") as almacen:
+            primera = almacen.iniciar(PARTICIONES)
+            assert almacen.registrar_particion(primera, ('perros', 'A'), [med('1 ESP'), med('2 ESP')]) == [
+                '1 ESP', '2 ESP']
+            for registro in almacen.pendientes_detalle(primera):
+                almacen.guardar_detalle(registro, dict(med(registro), prescripcion='Si'), etag='"v1"')
+            almacen.finalizar(primera)
+
+            segunda = almacen.iniciar(PARTICIONES)
+            cambiados = almacen.registrar_particion(segunda, ('perros', 'A'),
+                                                    [med('1 ESP'), med('2 ESP', 'AMOXICILINA 500 MG')])
+            assert cambiados == ['2 ESP']
+            assert almacen.pendientes_detalle(segunda) == ['2 ESP']
+            # Sin ficha nueva todavía sale el listado nuevo, no la ficha vieja
+            assert [(m['nombre'], 'prescripcion' in m) for m in almacen.medicamentos(segunda)] == [
+                ('AMOXICILINA 250 MG', True), ('AMOXICILINA 500 MG', False)]
+            assert almacen.validadores('2 ESP') == ('"v1"', None)
+
+            # 304: se conserva la ficha guardada
+            almacen.guardar_detalle('2 ESP', None)
+            assert almacen.pendientes_detalle(segunda) == []
+            assert all(m['prescripcion'] == 'Si' for m in almacen.medicamentos(segunda))
+
+
+class TestScrapingIncremental:
+    """Tests del scraper HTTP con checkpoints contra el servidor local"""
+
+    def test_refresco_solo_descarga_lo_que_cambia(self, tmp_path):
+        ruta = str(tmp_path / "checkpoints.sqlite")
+        with ServidorCimavetLocal(tamano_pagina=3) as servidor:
+            completos, _ = ejecutar(servidor.url, ['perros', 'gatos'], 'ABM', por_segundo=0, detalles=True,
+                                    checkpoints=ruta)
+            fichas = servidor.por_ruta[RUTA_DETALLE]
+            assert fichas == len(completos)
+
+            # Sin cambios: se recorren los listados pero no se pide ninguna ficha
+            repetidos, _ = ejecutar(servidor.url, ['perros', 'gatos'], 'ABM', por_segundo=0, detalles=True,
+                                    checkpoints=ruta)
+            assert servidor.por_ruta[RUTA_DETALLE] == fichas
+            assert repetidos == completos
+
+            # Cambia un producto: una sola ficha, y la nueva
+            registro = completos[0]['numero_registro']
+            servidor.modificar(registro, labtitular='Laboratorio Nuevo S.A.')
+            refrescados, _ = ejecutar(servidor.url, ['perros', 'gatos'], 'ABM', por_segundo=0, detalles=True,
+                                      checkpoints=ruta)
+            assert servidor.por_ruta[RUTA_DETALLE] == fichas + 1
+            assert next(m for m in refrescados if m['numero_registro'] == registro)['laboratorio'] == \
+                'Laboratorio Nuevo S.A.'
+
+    def test_ficha_sin_cambios_responde_304(self, tmp_path):
+        ruta = str(tmp_path / "checkpoints.sqlite")
+        with ServidorCimavetLocal() as servidor:
+            ejecutar(servidor.url, ['gatos'], 'A', por_segundo=0, detalles=True, checkpoints=ruta)
+            # Se pierde el hash del listado (p. ej. cambia el formato): la ficha se revalida con su ETag
+            with AlmacenCheckpoints(ruta) as almacen:
+                almacen._transaccion([("UPDATE productos SET hash = ''", ())])
+            ejecutar(servidor.url, ['gatos'], 'A', por_segundo=0, detalles=True, checkpoints=ruta)
+        assert servidor.no_modificados == servidor.por_ruta[RUTA_DETALLE] // 2 > 0
+
+    def test_reanuda_tras_caida(self, tmp_path):
+        ruta = str(tmp_path / "checkpoints.sqlite")
+        trabajos = [(especie, letra) for especie in ('perros', 'gatos') for letra in 'ABM']
+        with AlmacenCheckpoints(ruta) as almacen:
+            ejecucion = almacen.iniciar(trabajos)
+            almacen.registrar_particion(ejecucion, ('perros', 'A'), [])
+            almacen.registrar_particion(ejecucion, ('perros', 'B'), [])
+
+        with ServidorCimavetLocal(tamano_pagina=100) as servidor:
+            ejecutar(servidor.url, ['perros', 'gatos'], 'ABM', por_segundo=0, checkpoints=ruta)
+        # Solo las 4 particiones que faltaban (una página cada una)
+        assert servidor.por_ruta[RUTA_BUSQUEDA] == 4
+
+    def test_salida_en_streaming_desde_el_almacen(self, tmp_path, monkeypatch):
+        """Con checkpoints y salida, la pasada (también lo de antes de la caída) se vuelca por lotes"""
+        monkeypatch.setattr(checkpoints, 'LOTE_LECTURA', 2)
+        ruta = str(tmp_path / "checkpoints.sqlite")
+        with AlmacenCheckpoints(ruta) as almacen:
+            ejecucion = almacen.iniciar([('perros', 'A'), ('perros', 'B')])
+            almacen.registrar_particion(ejecucion, ('perros', 'A'), [med('1 ESP'), med('2 ESP')])
+            leidos = almacen.medicamentos(ejecucion)
+            assert iter(leidos) is leidos
+            assert [m['numero_registro'] for m in leidos] == ['1 ESP', '2 ESP']
+
+        with ServidorCimavetLocal(tamano_pagina=3) as servidor:
+            with SalidaRegistros(str(tmp_path / "salida.jsonl"), continuar=False) as salida:
+                devueltos, fallidas = ejecutar(servidor.url, ['perros'], 'AB', por_segundo=0,
+                                               checkpoints=ruta, salida=salida)
+            de_b = {m['nregistro'] for m in servidor.catalogo
+                    if m['nombre'].startswith('B') and 'Perros' in m['especies']}
+        assert devueltos == [] and fallidas == []
+        with open(tmp_path / "salida.jsonl", encoding='utf-8') as f:
+            escritos = {json.loads(linea)['numero_registro'] for linea in f}
+        assert escritos == {'1 ESP', '2 ESP'} | de_b
@@ -0,0 +1,100 @@
+import os
+import sys
+import json
+
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+
+from construir_grafo import etapa_mapeo, NOMBRE_MAPEO
+from processing.grafo_compilado import GrafoCompilado, ruta_compilada
+from processing.indices_compilados import tiene_indices
+from processing.catalogo_index import CatalogoIndex
+from processing.medicamentos_ranking import MedicamentosRanking
+
+GRAFO = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'knowledge_graph', NOMBRE_MAPEO)
+# Incluyen aristas en las que el principio del medicamento está contenido en el recomendado
+ENFERMEDADES = ['Dermatitis alérgica_Perro', 'Otitis externa_Perro', 'Pulgas_Gato']
+
+
+@pytest.fixture(scope="module")
+def grafo():
+    with open(GRAFO, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+@pytest.fixture
+def construido(grafo, tmp_path, monkeypatch):
+    """etapa_mapeo sobre CSV pequeños sacados del grafo publicado: (mapeo, id nuevo -> id original)"""
+    relacionados = {r['hacia_medicamento'] for r in grafo['relaciones'] if r['desde_enfermedad'] in ENFERMEDADES}
+    originales = [med_id for med_id in grafo['medicamentos']
+                  if med_id in relacionados or med_id in ('med_0', 'med_1', 'med_2')]
+    medicamentos = [dict(grafo['medicamentos'][med_id]) for med_id in originales]
+    for med in medicamentos:
+        med['medicamento'] = med.pop('nombre')
+        med['principios_activos'] = ', '.join(med['principios_activos'])
+        del med['id']
+
+    enfermedades = [{'enfermedad': e['nombre'], 'categoria': e['categoria'], 'especie': e['especie'],
+                     'principios_activos': '; '.join(e['principios_recomendados']),
+                     'indicaciones': e['indicaciones'], 'contraindicaciones': e['contraindicaciones'],
+                     'notas': e['notas']}
+                    for e in (grafo['enfermedades'][k] for k in ENFERMEDADES)]
+
+    os.makedirs(tmp_path / 'data' / 'processed')
+    pd.DataFrame(medicamentos).to_csv(tmp_path / 'data' / 'processed' / 'cimavet_completo.csv', index=False)
+    pd.DataFrame(enfermedades).to_csv(tmp_path / 'data' / 'processed' /
+                                      'enfermedades_medicamentos_procesado.csv', index=False)
+    monkeypatch.chdir(tmp_path)
+
+    resultado = etapa_mapeo('salida')
+    with open(tmp_path / 'salida' / NOMBRE_MAPEO, 'r', encoding='utf-8') as f:
+        mapeo = json.load(f)
+    assert resultado['relaciones'] == len(mapeo['relaciones'])
+    return mapeo, {f'med_{i}': med_id for i, med_id in enumerate(originales)}, tmp_path / 'salida' / NOMBRE_MAPEO
+
+
+class TestEtapaMapeo:
+    """Tests para la construcción del mapeo y su .kgbin desde los CSV"""
+
+    def test_misma_forma_que_el_grafo_publicado(self, grafo, construido):
+        mapeo, _, _ = construido
+        assert set(mapeo) == set(grafo)
+        assert set(mapeo['metadata']) == set(grafo['metadata'])
+        assert set(next(iter(mapeo['medicamentos'].values()))) <= set(grafo['medicamentos']['med_0'])
+        assert list(mapeo['enfermedades']) == ENFERMEDADES
+        for enf_key in ENFERMEDADES:
+            assert set(mapeo['enfermedades'][enf_key]) == set(grafo['enfermedades'][enf_key])
+        assert all(list(r) == list(grafo['relaciones'][0]) for r in mapeo['relaciones'])
+
+    def test_mismas_aristas_que_el_grafo_publicado(self, grafo, construido):
+        mapeo, original, _ = construido
+        obtenidas = [dict(r, hacia_medicamento=original[r['hacia_medicamento']]) for r in mapeo['relaciones']]
+        for enf_key in ENFERMEDADES:
+            assert ([r for r in obtenidas if r['desde_enfermedad'] == enf_key]
+                    == [r for r in grafo['relaciones'] if r['desde_enfermedad'] == enf_key]), enf_key
+        assert {original[m] for m in mapeo['enfermedades']['Dermatitis alérgica_Perro']['medicamentos_asociados']
+                } >= {'med_297', 'med_394', 'med_395'}
+
+    def test_compilado_igual_al_json(self, construido):
+        mapeo, _, ruta = construido
+        compilado = GrafoCompilado(ruta_compilada(ruta))
+        assert dict(compilado.medicamentos.items()) == mapeo['medicamentos']
+        assert dict(compilado.enfermedades.items()) == mapeo['enfermedades']
+        assert list(compilado.relaciones) == mapeo['relaciones']
+
+    def test_indices_compilados(self, construido):
+        """El .kgbin lleva los índices de búsqueda y coinciden con los construidos desde el JSON"""
+        mapeo, _, ruta = construido
+        compilado = GrafoCompilado(ruta_compilada(ruta))
+        assert tiene_indices(compilado)
+
+        catalogo = CatalogoIndex(mapeo['medicamentos'])
+        abierto = CatalogoIndex.desde_compilado(compilado)
+        assert list(abierto.tokens) == catalogo.tokens
+        assert dict(abierto.postings.items()) == catalogo.postings
+        ranking = MedicamentosRanking(mapeo['medicamentos'], mapeo['enfermedades'], mapeo['relaciones'])
+        assert dict(MedicamentosRanking.desde_compilado(compilado, mapeo['enfermedades']).aristas.items()) \
+            == ranking.aristas
@@ -0,0 +1,127 @@
+import os
+import sys
+import json
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from processing.dosis_engine import DosisEngine, LIMITES_BANDAS_KG
+from processing.principios_index import PrincipiosIndex, normalizar_principio
+
+KG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'knowledge_graph')
+
+
+def _cargar(nombre):
+    with open(os.path.join(KG_DIR, nombre), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+@pytest.fixture(scope="module")
+def medicamentos():
+    return _cargar('mapeo_enfermedades_medicamentos.json')['medicamentos']
+
+
+@pytest.fixture(scope="module")
+def indice(medicamentos):
+    """Fixture que construye el índice de principios una vez"""
+    return PrincipiosIndex(medicamentos, _cargar('categorias_medicamentos.json')['categorias'])
+
+
+@pytest.fixture(scope="module")
+def engine(medicamentos, indice):
+    """Fixture que construye las tablas una vez sobre los datos reales"""
+    return DosisEngine(medicamentos, _cargar('dosis_medicamentos.json'), indice)
+
+
+class TestDosisEngine:
+    """Tests para las tablas de posología precalculadas"""
+
+    # ========== TESTS DE CARGA ==========
+
+    def test_tabla_por_banda(self, engine):
+        """Cada categoría tiene una ficha por banda de peso"""
+        assert 'Antibiotico_Oral' in engine.tabla
+        for fichas in engine.tabla.values():
+            assert len(fichas) == len(LIMITES_BANDAS_KG) + 1
+
+    def test_categoria_resuelta_en_carga(self, engine):
+        """med_0 (DEXAMETASONA FOSFATO SODIO) se resuelve a Corticoesteroide"""
+        assert engine.categoria_por_med['med_0'] == 'Corticoesteroide'
+
+    # ========== TESTS DE CONSULTA ==========
+
+    def test_dosis_por_peso(self, engine):
+        """La dosis en mg es mg/kg x peso"""
+        ficha = engine.obtener_dosis('med_0', 10)
+        assert ficha['dosis_mg'] == 5.0
+        assert ficha['frecuencia'] == 'Cada 12h'
+        assert ficha['banda_kg'] == '10-20 kg'
+
+    def test_dosis_sin_peso(self, engine):
+        """Sin peso se devuelve la pauta en mg/kg"""
+        ficha = engine.obtener_dosis('med_0', None)
+        assert ficha['dosis_mg'] is None
+        assert 'mg/kg' in DosisEngine.formatear(ficha)
+
+    def test_fuera_de_rango(self):
+        """Las bandas fuera de ajustes_peso quedan marcadas"""
+        medicamentos = {'m': {'principios_activos': ['FIPRONILO']}}
+        engine = DosisEngine(
+            medicamentos,
+            {'Antiparasitario_Topico': {'frecuencia_dias': 28,
+                                        'ajustes_peso': {'peso_minimo_kg': 2, 'peso_maximo_kg': 60}}},
+            PrincipiosIndex(medicamentos, {'Fipronilo': 'Antiparasitario_Topico'})
+        )
+        assert engine.obtener_dosis('m', 1)['fuera_de_rango']
+        assert not engine.obtener_dosis('m', 30)['fuera_de_rango']
+        assert engine.obtener_dosis('m', 80)['fuera_de_rango']
+
+    def test_fuera_de_rango_por_peso_real(self):
+        """Se compara el peso del animal, no su banda: 60 kg justos es válido y 2,5 kg con mínimo 3 no"""
+        medicamentos = {'m': {'principios_activos': ['FIPRONILO']}}
+        engine = DosisEngine(
+            medicamentos,
+            {'Antiparasitario_Topico': {'frecuencia_dias': 28,
+                                        'ajustes_peso': {'peso_minimo_kg': 3, 'peso_maximo_kg': 60}}},
+            PrincipiosIndex(medicamentos, {'Fipronilo': 'Antiparasitario_Topico'})
+        )
+        assert not engine.obtener_dosis('m', 60)['fuera_de_rango']
+        assert engine.obtener_dosis('m', 60.5)['fuera_de_rango']
+        assert engine.obtener_dosis('m', 2.5)['fuera_de_rango']
+        assert not engine.obtener_dosis('m', 3)['fuera_de_rango']
+
+    def test_medicamento_sin_categoria(self, engine):
+        """Sin categoría se recurre al texto por defecto"""
+        assert engine.obtener_dosis('med_fake', 10) is None
+        assert DosisEngine.formatear(None) == "Dosis a consultar con veterinario."
+
+
+class TestPrincipiosIndex:
+    """Tests para la normalización principio activo -> categoría"""
+
+    def test_normalizar_principio(self):
+        """Se eliminan acentos, paréntesis y sufijos de sal"""
+        assert normalizar_principio("DEXAMETASONA FOSFATO SODIO") == "dexametasona"
+        assert normalizar_principio("PERMETRINA (40 CIS/60 TRANS)") == "permetrina"
+        assert normalizar_principio("Levotiroxina Sódica") == "levotiroxina"
+        assert normalizar_principio("SODIO CLORURO") == "sodio cloruro"
+
+    def test_coincidencia_por_prefijo(self, indice):
+        """'FIPRONIL' se resuelve contra 'Fipronilo'"""
+        assert indice.categoria("FIPRONIL") == "Antiparasitario_Topico"
+        assert indice.categoria("PREDNISOLONA ACETATO") == "Corticoesteroide"
+
+    def test_ids_densos(self, indice):
+        """Variantes del mismo principio comparten id"""
+        pid = indice.id_principio("DEXAMETASONA FOSFATO SODIO")
+        assert pid is not None
+        assert indice.nombres[pid] == "dexametasona"
+        assert indice.id_principio("Dexametasona") == pid
+
+    def test_informe_cobertura(self, indice):
+        """El informe cuenta medicamentos y principios cubiertos"""
+        informe = indice.informe_cobertura()
+        assert informe['total_medicamentos'] >= 1660
+        assert 0 < informe['medicamentos_con_categoria'] <= informe['total_medicamentos']
+        assert informe['principios_con_categoria'] <= informe['total_principios']
@@ -0,0 +1,49 @@
+import os
+import sys
+import json
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from processing.escritor_json import EscritorJSON
+
+
+class TestEscritorJSON:
+    """Tests para el escritor de JSON en streaming"""
+
+    def test_igual_que_json_dump(self, tmp_path):
+        """Mismo texto que json.dump(indent=2), incluidas secciones vacías"""
+        documento = {
+            'metadata': {'total': 2, 'fuente': 'CIMAVet'},
+            'medicamentos': {'med_0': {'nombre': 'AMOXICILINA', 'principios_activos': ['AMOXICILINA']},
+                             'med_1': {}},
+            'enfermedades': {},
+            'relaciones': [{'desde_enfermedad': 'Otitis_Perro', 'hacia_medicamento': 'med_0'}],
+            'vacia': [],
+        }
+        ruta = tmp_path / "grafo.json"
+        with EscritorJSON(ruta) as escritor:
+            escritor.escribir('metadata', documento['metadata'])
+            assert escritor.escribir_objeto('medicamentos', iter(documento['medicamentos'].items())) == 2
+            escritor.escribir_objeto('enfermedades', iter(()))
+            assert escritor.escribir_lista('relaciones', (r for r in documento['relaciones'])) == 1
+            escritor.escribir_lista('vacia', [])
+
+        assert ruta.read_text(encoding='utf-8') == json.dumps(documento, ensure_ascii=False, indent=2) + '\n'
+
+    def test_error_no_publica(self, tmp_path):
+        """Si falla a mitad, el fichero anterior queda intacto y no quedan temporales"""
+        ruta = tmp_path / "grafo.json"
+        ruta.write_text('{"anterior": true}', encoding='utf-8')
+
+        def aristas():
+            yield {'a': 1}
+            raise RuntimeError("fallo generando aristas")
+
+        with pytest.raises(RuntimeError):
+            with EscritorJSON(ruta) as escritor:
+                escritor.escribir_lista('relaciones', aristas())
+
+        assert json.loads(ruta.read_text(encoding='utf-8')) == {'anterior': True}
+        assert [p.name for p in tmp_path.iterdir()] == ['grafo.json']
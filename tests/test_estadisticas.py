@@ -0,0 +1,50 @@
+import os
+import sys
+import json
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from database.estadisticas import calcular_estadisticas, firma_ficheros
+from database.journal import JournalCambios
+
+ENFERMEDADES = {
+    'Otitis_Perro': {'nombre': 'Otitis', 'categoria': 'Otología', 'especie': 'Perro',
+                     'medicamentos_asociados': ['med_1', 'med_2']},
+    'Otitis_Gato': {'nombre': 'Otitis', 'categoria': 'Otología', 'especie': 'Gato',
+                    'medicamentos_asociados': []},
+    'Pulgas_Perro': {'nombre': 'Pulgas', 'categoria': 'Parasitología', 'especie': 'Perro',
+                     'medicamentos_asociados': ['med_3']},
+}
+SINTOMAS = {
+    'oreja': ['Otitis'],
+    'picor': ['Pulgas', 'Sarna'],
+    'cojera': ['Displasia'],
+    'vacío': [],
+}
+
+
+class TestEstadisticas:
+    """Tests para los agregados del panel de administración"""
+
+    def test_agregados(self):
+        stats = calcular_estadisticas(ENFERMEDADES, SINTOMAS)
+        assert stats['total_enfermedades'] == 3
+        assert stats['por_especie'] == {'Perro': 2, 'Gato': 1}
+        assert stats['categoria_especie']['Otología'] == {'Perro': 1, 'Gato': 1}
+        assert stats['medicamentos_por_enfermedad']['Otitis_Perro'] == 2
+        assert stats['resumen_medicamentos'] == {'min': 0, 'media': 1.0, 'max': 2, 'sin_medicamentos': 1}
+
+    def test_sintomas_huerfanos(self):
+        """Huérfano: no apunta a ninguna enfermedad conocida; referencia rota: a alguna que no existe"""
+        stats = calcular_estadisticas(ENFERMEDADES, SINTOMAS)
+        assert stats['sintomas_huerfanos'] == ['cojera', 'vacío']
+        assert stats['referencias_rotas'] == {'picor': ['Sarna']}
+
+    def test_firma_cambia_con_el_journal(self, tmp_path):
+        """Un guardado en el journal invalida la caché aunque el JSON no cambie"""
+        ruta = tmp_path / "enfermedades.json"
+        ruta.write_text(json.dumps({'enfermedades': ENFERMEDADES}), encoding='utf-8')
+        antes = firma_ficheros(ruta)
+        assert firma_ficheros(ruta) == antes
+        JournalCambios(ruta, 'enfermedades').anadir({'nombre': 'Nueva'})
+        assert firma_ficheros(ruta) != antes
@@ -0,0 +1,131 @@
+import os
+import sys
+import json
+
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+
+from generar_enfermedades_json import GeneradorEnfermedadesJSON, IndiceIngredientes
+
+KG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'knowledge_graph')
+
+MEDICAMENTOS = [
+    ('AMOXIPET 250 MG COMPRIMIDOS', '1001 ESP', 'Amoxicilina', 'Perro'),
+    ('FELIMOX 50 MG COMPRIMIDOS', '1002 ESP', 'Amoxicilina', 'Gato'),
+    ('MELOXIDOG 1,5 MG/ML', '1003 ESP', 'Meloxicam', 'Perro'),
+    ('PULGAFIN SPOT ON', '1004 ESP', 'Fipronilo', 'Perro'),
+    ('PULGACAT SPOT ON', '1005 ESP', 'Fipronilo', 'Gato'),
+    ('OTIDOG GOTAS', '1006 ESP', 'Marbofloxacino, Dexametasona', 'Perro'),
+]
+ENFERMEDADES = [
+    ('Infección bacteriana', 'Infecciosas', 'Perro', 'Amoxicilina', 'Infecciones', '', ''),
+    ('Infección bacteriana', 'Infecciosas', 'Gato', 'Amoxicilina', 'Infecciones', '', ''),
+    ('Dolor articular', 'Musculoesquelético', 'Perro', 'Meloxicam', 'Artrosis', '', ''),
+    ('Pulgas', 'Parasitología', 'Perro', 'Fipronilo', 'Picor', '', ''),
+    ('Pulgas', 'Parasitología', 'Gato', 'Fipronilo', 'Picor', '', ''),
+    ('Otitis externa', 'Dermatología', 'Perro', 'Marbofloxacino; Dexametasona', 'Otitis', '', ''),
+]
+
+
+def escribir_csv(medicamentos=MEDICAMENTOS, enfermedades=ENFERMEDADES):
+    pd.DataFrame(medicamentos, columns=['medicamento', 'numero_registro', 'principios_activos', 'especie']
+                 ).assign(prescripcion='Sí').to_csv('data/processed/cimavet_completo.csv', index=False)
+    pd.DataFrame(enfermedades, columns=['enfermedad', 'categoria', 'especie', 'principios_activos',
+                                        'indicaciones', 'contraindicaciones', 'notas']
+                 ).to_csv('data/processed/enfermedades_medicamentos_procesado.csv', index=False)
+
+
+def generar(dir_salida, incremental=True):
+    generador = GeneradorEnfermedadesJSON(dir_salida=dir_salida, manifest_path=f'{dir_salida}/manifest.json')
+    assert generador.cargar_datos(incremental=incremental)
+    generador.guardar_jsons()
+    return generador
+
+
+def salida(dir_salida):
+    return {nombre: open(os.path.join(dir_salida, nombre), encoding='utf-8').read()
+            for nombre in ('enfermedades_42_completo.json', 'sintomas_enfermedades_mapping.json')}
+
+
+@pytest.fixture
+def proyecto(tmp_path, monkeypatch):
+    """Proyecto con los CSV de ejemplo y una generación completa previa en `kg`"""
+    os.makedirs(tmp_path / 'data' / 'processed')
+    monkeypatch.chdir(tmp_path)
+    escribir_csv()
+    primera = generar('kg')
+    assert len(primera.recalculadas) == len(ENFERMEDADES)
+    return tmp_path
+
+
+class TestGeneracionIncremental:
+    """Tests para la reconstrucción incremental con manifest"""
+
+    def test_sin_cambios_no_recalcula(self, proyecto):
+        generador = generar('kg')
+        assert generador.recalculadas == []
+        assert generador.reutilizadas == len(ENFERMEDADES)
+
+    def test_cambia_un_medicamento(self, proyecto):
+        medicamentos = list(MEDICAMENTOS)
+        medicamentos[3] = ('PULGAFIN SPOT ON', '1004 ESP', 'Fipronilo', 'Gato')
+        escribir_csv(medicamentos)
+
+        incremental = generar('kg')
+        # Sale de la lista de Pulgas_Perro y entra en la de Pulgas_Gato; nada más cambia
+        assert sorted(incremental.recalculadas) == ['Pulgas_Gato', 'Pulgas_Perro']
+        assert incremental.enfermedades['Pulgas_Gato']['medicamentos_asociados'] == ['med_3', 'med_4']
+        assert incremental.enfermedades['Pulgas_Perro']['medicamentos_asociados'] == []
+
+        generar('kg_completo', incremental=False)
+        assert salida('kg') == salida('kg_completo')
+
+    def test_cambia_una_enfermedad(self, proyecto):
+        enfermedades = list(ENFERMEDADES)
+        enfermedades[5] = ('Otitis externa', 'Dermatología', 'Perro', 'Marbofloxacino; Dexametasona',
+                           'Otitis externa con exudado', '', '')
+        escribir_csv(enfermedades=enfermedades)
+
+        incremental = generar('kg')
+        assert incremental.recalculadas == ['Otitis_externa_Perro']
+
+        generar('kg_completo', incremental=False)
+        assert salida('kg') == salida('kg_completo')
+
+
+def buscar_recorriendo(medicamentos, principios_activos, especie, limite=5):
+    """El bucle anidado original: cada medicamento de la especie contra cada principio buscado"""
+    encontrados = []
+    for idx, med in medicamentos.items():
+        if med['especie'].lower() != especie.lower():
+            continue
+        for principio in principios_activos:
+            if any(principio.lower() in p.lower() for p in med['principios']):
+                encontrados.append(idx)
+                break
+    return encontrados[:limite]
+
+
+class TestIndiceIngredientes:
+    """Tests para el índice invertido de principios activos del generador"""
+
+    def test_igual_que_el_bucle(self):
+        with open(os.path.join(KG_DIR, 'mapeo_enfermedades_medicamentos.json'), encoding='utf-8') as f:
+            grafo = json.load(f)
+        medicamentos = {i: {'principios': med['principios_activos'], 'especie': med['especie']}
+                        for i, med in enumerate(grafo['medicamentos'].values())}
+        indice = IndiceIngredientes(medicamentos)
+
+        # Principios de las enfermedades, fragmentos de los del catálogo (también entre palabras) y ausentes
+        buscados = [[p] for enf in grafo['enfermedades'].values() for p in enf['principios_recomendados']]
+        buscados += [enf['principios_recomendados'] for enf in grafo['enfermedades'].values()]
+        catalogo = sorted({p for med in medicamentos.values() for p in med['principios']})
+        buscados += [[p[:5]] for p in catalogo[::7]] + [[p[-9:]] for p in catalogo[::11]]
+        buscados += [['ÁCIDO'], ['ácido'], ['no existe'], ['Amoxicilina', 'no existe']]
+
+        for principios in buscados:
+            for especie in ('Perro', 'gato', 'Caballo'):
+                assert indice.buscar(principios, especie) == buscar_recorriendo(medicamentos, principios, especie), \
+                    (principios, especie)
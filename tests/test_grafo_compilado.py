@@ -0,0 +1,173 @@
+import os
+import sys
+import json
+import shutil
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from processing.grafo_compilado import (GrafoCompilado, RegistrosCompilados, compilar, compilar_desde_json,
+                                        abrir_si_actualizado, ruta_compilada)
+from processing.indices_compilados import tiene_indices
+from processing.principios_index import PrincipiosIndex
+from processing.dosis_engine import DosisEngine
+from processing.catalogo_index import CatalogoIndex
+from processing.medicamentos_ranking import MedicamentosRanking
+from processing.autocompletado import Autocompletado
+
+KG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'knowledge_graph')
+GRAFO_PATH = os.path.join(KG_DIR, 'mapeo_enfermedades_medicamentos.json')
+
+
+@pytest.fixture(scope="module")
+def grafo():
+    with open(GRAFO_PATH, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+@pytest.fixture(scope="module")
+def compilado(grafo, tmp_path_factory):
+    """Fixture que compila el grafo real una vez"""
+    salida = tmp_path_factory.mktemp("kg") / "grafo.kgbin"
+    compilar(grafo, salida)
+    return GrafoCompilado(salida)
+
+
+class TestGrafoCompilado:
+    """Tests para el grafo binario mapeado en memoria"""
+
+    # ========== TESTS DE CONTENIDO ==========
+
+    def test_mismo_contenido_y_orden(self, grafo, compilado):
+        """Las tres secciones reproducen el JSON, en el mismo orden"""
+        assert list(compilado.medicamentos) == list(grafo['medicamentos'])
+        assert dict(compilado.medicamentos.items()) == grafo['medicamentos']
+        assert dict(compilado.enfermedades.items()) == grafo['enfermedades']
+        assert list(compilado.relaciones) == grafo['relaciones']
+
+    def test_acceso_por_clave(self, grafo, compilado):
+        """Búsqueda binaria por clave, incluidas claves con acentos"""
+        for clave in [next(iter(grafo['medicamentos'])), list(grafo['medicamentos'])[-1], 'med_999']:
+            assert compilado.medicamentos[clave] == grafo['medicamentos'][clave]
+        clave_acentos = next(k for k in grafo['enfermedades'] if any(c in k for c in 'áéíóú'))
+        assert compilado.enfermedades[clave_acentos] == grafo['enfermedades'][clave_acentos]
+        assert 'med_inexistente' not in compilado.medicamentos
+        assert compilado.medicamentos.get('med_inexistente') is None
+        with pytest.raises(KeyError):
+            compilado.medicamentos['med_inexistente']
+
+    def test_relaciones_indices(self, grafo, compilado):
+        assert compilado.relaciones[-1] == grafo['relaciones'][-1]
+        assert compilado.relaciones[:2] == grafo['relaciones'][:2]
+        with pytest.raises(IndexError):
+            compilado.relaciones[len(grafo['relaciones'])]
+
+    # ========== TESTS DE FICHERO ==========
+
+    def test_fichero_invalido(self, tmp_path):
+        ruta = tmp_path / "roto.kgbin"
+        ruta.write_bytes(b'no es un grafo' * 10)
+        with pytest.raises(ValueError):
+            GrafoCompilado(ruta)
+
+    def test_solo_si_actualizado(self, grafo, tmp_path):
+        """El binario solo se usa si es posterior al JSON"""
+        json_path = tmp_path / "mini.json"
+        json_path.write_text(json.dumps({'medicamentos': {'med_1': grafo['medicamentos']['med_1']}}),
+                             encoding='utf-8')
+        assert abrir_si_actualizado(json_path) is None
+        compilar_desde_json(json_path)
+        assert len(abrir_si_actualizado(json_path).medicamentos) == 1
+        os.utime(ruta_compilada(json_path), (0, 0))
+        assert abrir_si_actualizado(json_path) is None
+
+
+@pytest.fixture(scope="module")
+def categorias():
+    with open(os.path.join(KG_DIR, 'categorias_medicamentos.json'), 'r', encoding='utf-8') as f:
+        return json.load(f)['categorias']
+
+
+class TestIndicesCompilados:
+    """Los índices abiertos desde el .kgbin responden igual que los construidos recorriendo el catálogo"""
+
+    def test_secciones_de_indices(self, compilado, tmp_path, grafo):
+        assert tiene_indices(compilado)
+        compilar(grafo, tmp_path / "sin_indices.kgbin", indices=False)
+        assert not tiene_indices(GrafoCompilado(tmp_path / "sin_indices.kgbin"))
+
+    def test_principios_y_dosis(self, grafo, compilado, categorias):
+        construido = PrincipiosIndex(grafo['medicamentos'], categorias)
+        abierto = PrincipiosIndex.desde_compilado(compilado, categorias)
+        assert list(abierto.nombres) == construido.nombres
+        assert dict(abierto.id_por_original.items()) == construido.id_por_original
+        assert list(abierto.medicamentos_por_id) == construido.medicamentos_por_id
+        assert abierto.categoria_por_id == construido.categoria_por_id
+        assert abierto.informe_cobertura() == construido.informe_cobertura()
+        for principio in ['DEXAMETASONA FOSFATO SODIO', 'Fipronil', 'no existe']:
+            assert abierto.categoria(principio) == construido.categoria(principio)
+            assert abierto.medicamentos_con(principio) == construido.medicamentos_con(principio)
+
+        assert (DosisEngine(compilado.medicamentos, {}, abierto).categoria_por_med
+                == DosisEngine(grafo['medicamentos'], {}, construido).categoria_por_med)
+
+    def test_catalogo(self, grafo, compilado):
+        construido = CatalogoIndex(grafo['medicamentos'])
+        abierto = CatalogoIndex.desde_compilado(compilado)
+        assert list(abierto.tokens) == construido.tokens
+        assert abierto.bits_titular == construido.bits_titular
+        for consulta in [{}, {'texto': 'amoxi'}, {'texto': 'a', 'especie': 'Gato'},
+                         {'texto': 'meloxicam', 'receta': True, 'comercializado': False},
+                         {'titular': next(iter(construido.bits_titular))}]:
+            assert abierto.facetas(**consulta) == construido.facetas(**consulta)
+            resultado = abierto.buscar(**consulta)
+            assert list(resultado.ids()) == list(construido.buscar(**consulta).ids())
+            assert resultado.pagina(2) == construido.buscar(**consulta).pagina(2)
+
+    def test_ranking(self, grafo, compilado):
+        construido = MedicamentosRanking(grafo['medicamentos'], grafo['enfermedades'], grafo['relaciones'])
+        abierto = MedicamentosRanking.desde_compilado(compilado, grafo['enfermedades'])
+        assert dict(abierto.aristas.items()) == construido.aristas
+        detectadas = [(enf_key, 1.0 / (i + 1), enf.get('medicamentos_asociados', []))
+                      for i, (enf_key, enf) in enumerate(list(grafo['enfermedades'].items())[:6])]
+        for especie in ('Perro', 'Gato'):
+            assert abierto.rankear(detectadas, especie, k=15) == construido.rankear(detectadas, especie, k=15)
+
+    def test_autocompletado(self, grafo, compilado):
+        sintomas = {'picor': ['Pulgas_Perro'], 'picor intenso': ['Pulgas_Perro', 'Pulgas_Gato']}
+        construido = Autocompletado(grafo['medicamentos'], PrincipiosIndex(grafo['medicamentos'], {}), sintomas)
+        abierto = Autocompletado.desde_compilado(compilado, sintomas)
+        for texto in ['a', 'amo', 'pic', 'acido clav', 'meloxicam 1', 'zzz']:
+            assert abierto.sugerir(texto, n=8) == construido.sugerir(texto, n=8)
+            assert abierto.sugerir(texto, n=30) == construido.sugerir(texto, n=30)
+
+    def test_motor_con_indices_del_binario(self, tmp_path, monkeypatch):
+        """El motor abre los índices del .kgbin (overlay incluido) y recomienda lo mismo que con el JSON"""
+        from database.journal import JournalCambios
+        from processing.smart_recommendation_engine import SmartRecommendationEngine
+
+        shutil.copytree(KG_DIR, tmp_path / 'data' / 'knowledge_graph',
+                        ignore=shutil.ignore_patterns('*.lock', '*.journal*', 'relaciones_enfermedades_admin*'))
+        monkeypatch.chdir(tmp_path)
+        os.environ.setdefault("GROQ_API_KEY", "test")
+        engine = SmartRecommendationEngine()
+        enfermedad = {'nombre': 'Pulgas recurrentes', 'especie': 'Perro', 'principios_recomendados': ['Fipronilo']}
+        nueva_key = JournalCambios('data/knowledge_graph/enfermedades_42_completo.json',
+                                   'enfermedades').anadir(enfermedad)
+        engine.recalcular_relaciones(nueva_key, enfermedad)
+        desde_json = engine.recargar()
+
+        compilar_desde_json('data/knowledge_graph/mapeo_enfermedades_medicamentos.json')
+        desde_binario = engine.recargar()
+        assert isinstance(desde_binario.medicamentos, RegistrosCompilados)
+        assert isinstance(desde_binario.catalogo_index.postings, RegistrosCompilados)
+
+        detectadas = [(nueva_key, 1.0, []), ('Otitis externa_Perro', 0.5, [])]
+        assert desde_binario.medicamentos_ranking.peso(desde_json.relaciones[-1]['hacia_medicamento'], nueva_key) > 0
+        assert (desde_binario.medicamentos_ranking.rankear(detectadas, 'Perro')
+                == desde_json.medicamentos_ranking.rankear(detectadas, 'Perro'))
+        assert (list(desde_binario.catalogo_index.buscar('amoxi', especie='Perro').ids())
+                == list(desde_json.catalogo_index.buscar('amoxi', especie='Perro').ids()))
+        assert desde_binario.autocompletado.sugerir('pic') == desde_json.autocompletado.sugerir('pic')
+        assert desde_binario.dosis_engine.categoria_por_med == desde_json.dosis_engine.categoria_por_med
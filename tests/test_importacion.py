@@ -0,0 +1,145 @@
+import io
+import os
+import sys
+import json
+import shutil
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from database.journal import JournalCambios
+from database.importacion import leer_filas, ValidadorImportacion, confirmar_importacion
+from processing.principios_index import PrincipiosIndex
+from processing.relaciones_incrementales import CalculadorRelaciones, ruta_overlay, SECCION_OVERLAY
+
+KG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'knowledge_graph')
+
+ENFERMEDADES = {'ENF_001': {'nombre': 'Otitis', 'especie': 'Perro'}}
+MEDICAMENTOS = {
+    'med_1': {'nombre': 'ALOPURINOL 100 MG', 'principios_activos': ['ALOPURINOL'], 'especie': 'Perro'},
+    'med_2': {'nombre': 'MILTEFORAN', 'principios_activos': ['MILTEFOSINA'], 'especie': 'Perro'},
+}
+IDS = set(MEDICAMENTOS)
+CALCULADOR = CalculadorRelaciones(MEDICAMENTOS, PrincipiosIndex(MEDICAMENTOS, {}))
+
+CSV_VALIDO = (
+    "tipo,nombre,especie,categoria,sintomas,medicamentos_asociados,sintoma,enfermedades\n"
+    "enfermedad,Leishmaniosis,Perro,Parasitología,pérdida de peso|lesiones piel,med_1|med_2,,\n"
+    "sintoma,,,,,,adelgazamiento,Leishmaniosis|Otitis\n"
+)
+
+
+def _bytes(texto):
+    return io.BytesIO(texto.encode('utf-8'))
+
+
+@pytest.fixture
+def journals(tmp_path):
+    enf = tmp_path / "enfermedades.json"
+    enf.write_text(json.dumps({'enfermedades': ENFERMEDADES}), encoding='utf-8')
+    sint = tmp_path / "sintomas.json"
+    sint.write_text(json.dumps({'sintomas_enfermedades': {}}), encoding='utf-8')
+    relaciones = JournalCambios(ruta_overlay(tmp_path / "mapeo.json"), SECCION_OVERLAY)
+    return JournalCambios(enf, 'enfermedades'), JournalCambios(sint, 'sintomas_enfermedades'), relaciones
+
+
+class TestImportacion:
+    """Tests para la importación masiva del panel de administración"""
+
+    def test_csv_valido(self):
+        resultado = ValidadorImportacion(IDS, ENFERMEDADES).validar(leer_filas(_bytes(CSV_VALIDO), 'csv'))
+        assert resultado.valido
+        assert resultado.enfermedades[0]['síntomas'] == ['pérdida de peso', 'lesiones piel']
+        assert resultado.sintomas == {'adelgazamiento': ['Leishmaniosis', 'Otitis']}
+
+    def test_errores_por_fila(self):
+        """Cada fila informa de sus propios errores, con su número de línea"""
+        jsonl = "\n".join([
+            json.dumps({'nombre': 'Otitis', 'especie': 'Perro'}),
+            json.dumps({'nombre': 'Nueva', 'especie': 'Caballo', 'medicamentos_asociados': ['med_9']}),
+            '{roto',
+            json.dumps({'tipo': 'sintoma', 'sintoma': 'tos', 'enfermedades': ['Moquillo']}),
+            json.dumps({'nombre': 'Correcta', 'especie': 'gato'}),
+        ])
+        resultado = ValidadorImportacion(IDS, ENFERMEDADES).validar(leer_filas(_bytes(jsonl), 'jsonl'))
+        filas = dict(resultado.errores)
+        assert set(filas) == {1, 2, 3, 4}
+        assert 'ya existe' in filas[1][0]
+        assert len(filas[2]) == 2
+        assert 'Moquillo' in filas[4][0]
+        assert [e['especie'] for e in resultado.enfermedades] == ['Gato']
+        assert not resultado.valido
+
+    def test_confirmar_todo_o_nada(self, journals):
+        journal_enf, journal_sint, journal_rel = journals
+        validador = ValidadorImportacion(IDS, ENFERMEDADES)
+        resultado = validador.validar(leer_filas(_bytes(CSV_VALIDO), 'csv'))
+        escrito = confirmar_importacion(resultado, journal_enf, journal_sint, CALCULADOR, journal_rel)
+        assert escrito == {'enfermedades': ['ENF_002'], 'sintomas': 1, 'relaciones': 2}
+        assert journal_enf.estado()['ENF_002']['nombre'] == 'Leishmaniosis'
+        assert journal_enf.pendientes() == 1
+        # Aristas de las enfermedades nuevas en una sola escritura al overlay
+        assert [a['hacia_medicamento'] for a in journal_rel.estado()['ENF_002']] == ['med_1', 'med_2']
+        assert journal_rel.pendientes() == 1
+
+        con_errores = validador.validar(leer_filas(_bytes("nombre,especie\n,Perro\n"), 'csv'))
+        with pytest.raises(ValueError):
+            confirmar_importacion(con_errores, journal_enf, journal_sint, CALCULADOR, journal_rel)
+        assert journal_enf.pendientes() == 1
+
+    def test_fallo_en_sintomas_deshace_enfermedades(self, journals, monkeypatch):
+        journal_enf, journal_sint, journal_rel = journals
+        resultado = ValidadorImportacion(IDS, ENFERMEDADES).validar(leer_filas(_bytes(CSV_VALIDO), 'csv'))
+
+        def falla(cambios):
+            raise OSError("disco lleno")
+
+        monkeypatch.setattr(journal_sint, 'guardar_lote', falla)
+        with pytest.raises(OSError, match="disco lleno"):
+            confirmar_importacion(resultado, journal_enf, journal_sint, CALCULADOR, journal_rel)
+        assert set(journal_enf.estado()) == {'ENF_001'}
+        # Otro proceso que lea el journal tampoco ve la enfermedad
+        assert set(JournalCambios(journal_enf.snapshot_path, 'enfermedades').estado()) == {'ENF_001'}
+        assert journal_sint.estado() == {}
+        assert journal_rel.estado() == {}
+
+    def test_fallo_al_deshacer_informa_del_estado_parcial(self, journals, monkeypatch):
+        journal_enf, journal_sint, journal_rel = journals
+        resultado = ValidadorImportacion(IDS, ENFERMEDADES).validar(leer_filas(_bytes(CSV_VALIDO), 'csv'))
+
+        def falla(*args):
+            raise OSError("disco lleno")
+
+        monkeypatch.setattr(journal_sint, 'guardar_lote', falla)
+        monkeypatch.setattr(journal_enf, 'eliminar_lote', falla)
+        with pytest.raises(RuntimeError, match="ENF_002"):
+            confirmar_importacion(resultado, journal_enf, journal_sint, CALCULADOR, journal_rel)
+
+    def test_enfermedad_importada_tiene_recomendaciones(self, tmp_path, monkeypatch):
+        """Importar desde el panel y recargar el motor: la enfermedad nueva ya recomienda medicamentos"""
+        from processing.smart_recommendation_engine import SmartRecommendationEngine
+
+        shutil.copytree(KG_DIR, tmp_path / 'data' / 'knowledge_graph',
+                        ignore=shutil.ignore_patterns('*.lock', '*.journal*', 'relaciones_enfermedades_admin*'))
+        monkeypatch.chdir(tmp_path)
+        os.environ.setdefault("GROQ_API_KEY", "test")
+        engine = SmartRecommendationEngine()
+        journal_enf = JournalCambios('data/knowledge_graph/enfermedades_42_completo.json', 'enfermedades')
+        journal_sint = JournalCambios('data/knowledge_graph/sintomas_enfermedades_mapping.json',
+                                      'sintomas_enfermedades')
+
+        csv_lote = ("tipo,nombre,especie,categoria,sintomas,principios_recomendados,sintoma,enfermedades\n"
+                    "enfermedad,Pulgas recurrentes,Perro,Parasitología,picor intenso,Fipronilo,,\n")
+        resultado = ValidadorImportacion(engine.snapshot.medicamentos, journal_enf.estado()).validar(
+            leer_filas(_bytes(csv_lote), 'csv'))
+        escrito = confirmar_importacion(resultado, journal_enf, journal_sint,
+                                        engine.snapshot.calculador_relaciones, engine.journal_relaciones)
+        nueva_key, = escrito['enfermedades']
+        assert escrito['relaciones'] > 0
+
+        snap = engine.recargar()
+        ranking = snap.medicamentos_ranking.rankear([(nueva_key, 1.0, [])], 'Perro', k=10)
+        assert ranking
+        assert all(any('FIPRONILO' in p.upper() for p in snap.medicamentos[med_id]['principios_activos'])
+                   for med_id, _, _ in ranking)
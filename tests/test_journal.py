@@ -0,0 +1,88 @@
+import os
+import sys
+import json
+import multiprocessing
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from database.journal import JournalCambios, ruta_journal
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    """JSON con la misma forma que enfermedades_42_completo.json"""
+    ruta = tmp_path / "enfermedades.json"
+    ruta.write_text(json.dumps({
+        'metadata': {'total_enfermedades': 2},
+        'enfermedades': {'ENF_001': {'nombre': 'Otitis'}, 'ENF_002': {'nombre': 'Sarna'}},
+    }), encoding='utf-8')
+    return ruta
+
+
+def _anadir_varias(ruta, n):
+    journal = JournalCambios(ruta, 'enfermedades', umbral_compactacion=7)
+    for i in range(n):
+        journal.anadir({'nombre': f'Proceso {os.getpid()} #{i}'})
+
+
+class TestJournalCambios:
+    """Tests para el journal de escrituras del panel de administración"""
+
+    # ========== TESTS DE ESCRITURA ==========
+
+    def test_escritura_no_toca_el_json(self, snapshot):
+        """Guardar solo añade al journal; el estado ve el cambio"""
+        original = snapshot.read_bytes()
+        journal = JournalCambios(snapshot, 'enfermedades')
+        clave = journal.anadir({'nombre': 'Pulgas'})
+        journal.guardar('ENF_001', {'nombre': 'Otitis externa'})
+        journal.eliminar('ENF_002')
+
+        assert clave == 'ENF_003'
+        assert snapshot.read_bytes() == original
+        assert len(ruta_journal(snapshot).read_text(encoding='utf-8').splitlines()) == 3
+        estado = JournalCambios(snapshot, 'enfermedades').estado()
+        assert estado == {'ENF_001': {'nombre': 'Otitis externa'}, 'ENF_003': {'nombre': 'Pulgas'}}
+
+    def test_compactacion_atomica(self, snapshot):
+        """Compactar vuelca el estado al JSON y vacía el journal"""
+        journal = JournalCambios(snapshot, 'enfermedades')
+        journal.anadir({'nombre': 'Pulgas'})
+        journal.compactar()
+
+        documento = json.loads(snapshot.read_text(encoding='utf-8'))
+        assert 'ENF_003' in documento['enfermedades']
+        assert documento['metadata']['total_enfermedades'] == 3
+        assert ruta_journal(snapshot).read_bytes() == b''
+        assert journal.pendientes() == 0
+        assert not list(snapshot.parent.glob('*.tmp'))
+
+    def test_linea_incompleta(self, snapshot):
+        """Una escritura interrumpida no rompe la lectura ni las escrituras siguientes"""
+        journal = JournalCambios(snapshot, 'enfermedades')
+        journal.guardar('ENF_010', {'nombre': 'Completa'})
+        with open(ruta_journal(snapshot), 'ab') as f:
+            f.write(b'{"op": "set", "clave": "ENF_0')
+        assert 'ENF_010' in JournalCambios(snapshot, 'enfermedades').estado()
+        otro = JournalCambios(snapshot, 'enfermedades')
+        otro.guardar('ENF_011', {'nombre': 'Siguiente'})
+        assert set(JournalCambios(snapshot, 'enfermedades').estado()) >= {'ENF_010', 'ENF_011'}
+
+    # ========== TESTS DE CONCURRENCIA ==========
+
+    @pytest.mark.skipif(not hasattr(os, 'fork'), reason="requiere fork")
+    def test_procesos_concurrentes(self, snapshot):
+        """Dos procesos añadiendo a la vez: claves únicas y nada se pierde (con compactaciones)"""
+        contexto = multiprocessing.get_context('fork')
+        procesos = [contexto.Process(target=_anadir_varias, args=(snapshot, 15)) for _ in range(3)]
+        for p in procesos:
+            p.start()
+        for p in procesos:
+            p.join()
+            assert p.exitcode == 0
+
+        estado = JournalCambios(snapshot, 'enfermedades').estado()
+        assert len(estado) == 2 + 3 * 15
+        assert set(estado) == {f'ENF_{i:03d}' for i in range(1, 48)}
@@ -0,0 +1,64 @@
+import io
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from scraping import parser_cimavet
+from scraping.parser_cimavet import parsear_medicamentos, iterar_medicamentos
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'cimavet')
+
+
+def ficha(i, clase=''):
+    return (f"<div{clase}><div><h4>MEDICAMENTO DE PRUEBA NUMERO {i}</h4></div>\n"
+            f"<div><p>LABORATORIO LABIANA</p></div>\n"
+            f"<div><p>PRINCIPIOS ACTIVOS</p>\n<p>PRINCIPIO {i}</p></div>\n"
+            f"<div><p>ESPECIE DE DESTINO</p>\n<p>Perros</p></div>\n"
+            f"<div><p>Nº REGISTRO</p>\n<p>{i} ESP</p></div></div>\n")
+
+
+def pagina(cuerpo, profundidad=3):
+    return "<html><body>" + "<div>" * profundidad + cuerpo + "</div>" * profundidad + "</body></html>"
+
+
+@pytest.fixture(params=['lxml', 'bs4'])
+def parsear(request):
+    """Las dos implementaciones deben dar lo mismo"""
+    if request.param == 'bs4':
+        return parser_cimavet._parsear_bs4
+    if parser_cimavet.etree is None:
+        pytest.skip("lxml no instalado")
+    return parsear_medicamentos
+
+
+class TestParserCimavet:
+    """Tests para la extracción lineal de medicamentos"""
+
+    def test_fixtures_iguales(self, parsear):
+        for nombre in ('resultados_1.html', 'resultados_2.html'):
+            with open(os.path.join(FIXTURES, nombre), encoding='utf-8') as f:
+                html = f.read()
+            assert parsear(html) == parser_cimavet._parsear_bs4(html)
+
+    def test_fichas_sin_clase_una_vez(self, parsear):
+        """Ni los divs de un solo campo ni los contenedores salen como medicamentos"""
+        medicamentos = parsear(pagina(''.join(ficha(i) for i in range(5))))
+        assert [m['numero_registro'] for m in medicamentos] == [f'{i} ESP' for i in range(5)]
+        assert medicamentos[3] == {
+            'nombre': 'MEDICAMENTO DE PRUEBA NUMERO 3', 'laboratorio': 'LABORATORIO LABIANA',
+            'principios_activos': 'PRINCIPIO 3', 'especies': 'Perros', 'numero_registro': '3 ESP', 'estado': ''}
+
+    def test_tarjetas_con_clase_tienen_prioridad(self, parsear):
+        html = pagina(ficha(1) + ficha(2, " class='card destacada'") + "<!-- PRINCIPIOS ACTIVOS -->")
+        assert [m['numero_registro'] for m in parsear(html)] == ['2 ESP']
+
+    def test_streaming_por_bloques(self):
+        if parser_cimavet.etree is None:
+            pytest.skip("lxml no instalado")
+        html = pagina(''.join(ficha(i) for i in range(50)))
+        por_bloques = list(iterar_medicamentos(io.BytesIO(html.encode('utf-8')), tamano_bloque=97))
+        assert por_bloques == parsear_medicamentos(html)
+        assert len(por_bloques) == 50
@@ -0,0 +1,128 @@
+import os
+import sys
+import time
+import threading
+import functools
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from scraping.parser_cimavet import parsear_medicamentos
+from scraping.pool_drivers import PoolDrivers, ejecutar, particiones
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'cimavet')
+
+
+class DriverFalso:
+    """Driver mínimo: solo cuenta si se ha cerrado"""
+
+    def __init__(self):
+        self.cerrado = False
+
+    def quit(self):
+        self.cerrado = True
+
+
+@pytest.fixture(scope="module")
+def servidor():
+    """Sirve las páginas de fixtures/cimavet en un puerto libre"""
+    handler = functools.partial(SimpleHTTPRequestHandler, directory=FIXTURES)
+    handler.log_message = lambda *args: None
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    hilo = threading.Thread(target=httpd.serve_forever, daemon=True)
+    hilo.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+
+
+class TestParserCimavet:
+    """Tests para la extracción de medicamentos del HTML de resultados"""
+
+    def test_pagina_de_resultados(self):
+        with open(os.path.join(FIXTURES, 'resultados_1.html'), encoding='utf-8') as f:
+            medicamentos = parsear_medicamentos(f.read())
+        assert [m['numero_registro'] for m in medicamentos] == ['1234 ESP', '2345 ESP']
+        assert medicamentos[0]['principios_activos'] == 'AMOXICILINA'
+        assert medicamentos[1]['especies'] == 'Gatos'
+
+    def test_sin_resultados(self):
+        assert parsear_medicamentos('<html><body><div id="resultados"></div></body></html>') == []
+
+
+class TestPoolDrivers:
+    """Tests para el pool acotado y la fusión de particiones (sin navegador)"""
+
+    def test_particiones(self):
+        assert particiones(['perros', 'gatos'], 'AB') == [
+            ('perros', 'A'), ('perros', 'B'), ('gatos', 'A'), ('gatos', 'B')]
+
+    def test_no_supera_el_tamano_y_reutiliza(self):
+        creados = []
+
+        def fabrica():
+            creados.append(DriverFalso())
+            return creados[-1]
+
+        activos, maximo = [0], [0]
+        lock = threading.Lock()
+
+        def buscar(driver, url, especie, letra, timeout):
+            with lock:
+                activos[0] += 1
+                maximo[0] = max(maximo[0], activos[0])
+            time.sleep(0.01)
+            with lock:
+                activos[0] -= 1
+            return [{'nombre': f'{especie}-{letra}', 'numero_registro': f'{especie}-{letra}'}]
+
+        medicamentos, fallidas = ejecutar('http://local', ['perros', 'gatos'], 'ABCDE', tamano=3,
+                                          fabrica=fabrica, buscar=buscar)
+        assert len(medicamentos) == 10 and fallidas == []
+        assert maximo[0] <= 3
+        assert len(creados) <= 3
+        assert all(d.cerrado for d in creados)
+
+    def test_fusion_en_orden_y_fallidas(self):
+        def buscar(driver, url, especie, letra, timeout):
+            if letra == 'B':
+                raise TimeoutError("sin resultados a tiempo")
+            return [{'nombre': 'COMUN', 'numero_registro': '1'}, {'nombre': letra, 'numero_registro': letra}]
+
+        medicamentos, fallidas = ejecutar('http://local', ['perros'], 'CBA', tamano=2,
+                                          fabrica=DriverFalso, buscar=buscar)
+        assert [m['nombre'] for m in medicamentos] == ['COMUN', 'C', 'A']
+        assert fallidas == [('perros', 'B')]
+
+    def test_driver_fallido_se_repone(self):
+        creados = []
+
+        def fabrica():
+            creados.append(DriverFalso())
+            return creados[-1]
+
+        pool = PoolDrivers(1, fabrica)
+        with pytest.raises(RuntimeError):
+            with pool.driver():
+                raise RuntimeError("Chrome se ha caído")
+        with pool.driver() as driver:
+            assert driver is creados[1]
+        pool.cerrar()
+        assert creados[0].cerrado and creados[1].cerrado
+
+
+class TestNavegador:
+    """Test de extremo a extremo con Chrome headless contra las páginas locales"""
+
+    def test_busqueda_paginada(self, servidor):
+        pytest.importorskip("selenium")
+        from scraping.pool_drivers import crear_driver_headless
+        try:
+            crear_driver_headless().quit()
+        except Exception as e:
+            pytest.skip(f"Chrome no disponible: {e}")
+
+        medicamentos, fallidas = ejecutar(f"{servidor}/home.html", ['perros', 'gatos'], 'A', tamano=2, timeout=10)
+        assert fallidas == []
+        assert [m['numero_registro'] for m in medicamentos] == ['1234 ESP', '2345 ESP', '3456 ESP']
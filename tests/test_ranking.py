@@ -0,0 +1,127 @@
+import os
+import sys
+import json
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from processing.enfermedades_loader import EnfermedadesLoader
+from processing.principios_index import PrincipiosIndex
+from processing.razas_index import RazasIndex
+from processing.medicamentos_ranking import MedicamentosRanking
+
+KG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'knowledge_graph')
+
+
+def _cargar(nombre):
+    with open(os.path.join(KG_DIR, nombre), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+@pytest.fixture(scope="module")
+def grafo():
+    return _cargar('mapeo_enfermedades_medicamentos.json')
+
+
+@pytest.fixture(scope="module")
+def indice(grafo):
+    return PrincipiosIndex(grafo['medicamentos'], _cargar('categorias_medicamentos.json')['categorias'])
+
+
+@pytest.fixture(scope="module")
+def loader():
+    return EnfermedadesLoader()
+
+
+@pytest.fixture(scope="module")
+def razas(loader, indice):
+    """Fixture que precalcula los vectores por raza una vez"""
+    return RazasIndex(_cargar('razas_predisposiciones.json'), loader.claves, loader.enfermedades, indice)
+
+
+class TestRazasIndex:
+    """Tests para las predisposiciones por raza"""
+
+    # ========== TESTS DE CARGA ==========
+
+    def test_vector_alineado(self, razas, loader):
+        """Un multiplicador por enfermedad, en el orden del loader"""
+        vector = razas.multiplicadores('Boxer')
+        assert len(vector) == len(loader.claves)
+        assert vector[loader.posicion['Dermatitis_alérgica_Perro']] == 1.5
+        assert vector[loader.posicion['Pulgas_Perro']] == 1.0
+
+    def test_resolver_raza(self, razas):
+        """Texto libre de Groq -> raza conocida"""
+        assert razas.resolver_raza('boxer') == 'boxer'
+        assert razas.resolver_raza('Bulldog francés') == 'bulldog'
+        assert razas.resolver_raza('Persa') == 'gato persa'
+        assert razas.resolver_raza('Gato') is None
+        assert razas.multiplicadores('Mestizo') is None
+
+    def test_excluidos_por_precaucion(self, razas, grafo):
+        """Los medicamentos con Isoflurano quedan excluidos para Boxer"""
+        excluidos = razas.excluidos('Boxer')
+        assert excluidos
+        for med_id in excluidos:
+            assert 'ISOFLURANO' in grafo['medicamentos'][med_id]['principios_activos']
+        assert razas.excluidos('Labrador') == frozenset()
+
+    # ========== TESTS DE RE-RANKING ==========
+
+    def test_boost_reordena(self, razas, loader):
+        """La predisposición sube el score de la enfermedad"""
+        sin_raza = dict(loader.buscar_enfermedades_puntuadas('picor otitis', 'Perro'))
+        con_raza = dict(loader.buscar_enfermedades_puntuadas('picor otitis', 'Perro',
+                                                             razas.multiplicadores('Cocker')))
+        clave = 'Otitis_externa_Perro'
+        assert clave in sin_raza and clave in con_raza
+        assert con_raza[clave] == pytest.approx(sin_raza[clave] * 1.6)
+
+
+@pytest.fixture(scope="module")
+def ranking(grafo):
+    """Fixture que pondera las aristas del grafo una vez"""
+    return MedicamentosRanking(grafo['medicamentos'], grafo['enfermedades'], grafo['relaciones'])
+
+
+class TestMedicamentosRanking:
+    """Tests para el ranking global de medicamentos"""
+
+    def test_clave_canonica(self, ranking):
+        """Claves del grafo y del loader se unifican"""
+        assert ranking.clave_enfermedad('Otitis externa', 'Perro') == 'Otitis_externa_Perro'
+        assert ranking.clave_enfermedad('Enfermedad Ficticia', 'Perro') is None
+
+    def test_top_k_sin_duplicados(self, ranking):
+        """Dos enfermedades que comparten medicamento no lo duplican"""
+        candidatas = [('Otitis_externa_Perro', 0.95, []), ('Dermatitis_alérgica_Perro', 0.5, [])]
+        resultado = ranking.rankear(candidatas, 'Perro', k=10)
+        ids = [med_id for med_id, _, _ in resultado]
+        assert len(resultado) == 10
+        assert len(ids) == len(set(ids))
+        puntuaciones = [score for _, score, _ in resultado]
+        assert puntuaciones == sorted(puntuaciones, reverse=True)
+
+    def test_puntuacion_acumulada(self, ranking):
+        """Un medicamento de varias enfermedades suma sus aportaciones"""
+        candidatas = [('Otitis_externa_Perro', 1.0, []), ('Infección_bacteriana_sistémica_Perro', 1.0, [])]
+        for med_id, score, origen in ranking.rankear(candidatas, 'Perro', k=50):
+            esperado = sum(ranking.peso(med_id, enf_key) for enf_key in origen)
+            assert score == pytest.approx(esperado, abs=1e-3)
+
+    def test_anulados_y_especie(self, ranking, grafo):
+        """Nunca se recomiendan anulados ni medicamentos de otra especie"""
+        candidatas = [(enf_key, 1.0, []) for enf_key in ranking.aristas]
+        for med_id, _, _ in ranking.rankear(candidatas, 'Gato', k=200):
+            med = grafo['medicamentos'][med_id]
+            assert med['estado'] != 'Anulado'
+            assert 'GATO' in med['especie'].upper()
+
+    def test_excluidos(self, ranking):
+        """Los medicamentos excluidos no entran en el top-k"""
+        candidatas = [('Otitis_externa_Perro', 1.0, [])]
+        primero = ranking.rankear(candidatas, 'Perro', k=1)[0][0]
+        resultado = ranking.rankear(candidatas, 'Perro', k=10, excluidos=frozenset({primero}))
+        assert primero not in [med_id for med_id, _, _ in resultado]
@@ -0,0 +1,116 @@
+import os
+import sys
+import json
+import time
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from database.journal import JournalCambios
+from processing.principios_index import PrincipiosIndex
+from processing.relaciones_incrementales import (
+    CalculadorRelaciones, aplicar_overlay, recalcular_enfermedad, SECCION_OVERLAY
+)
+
+GRAFO = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'knowledge_graph',
+                     'mapeo_enfermedades_medicamentos.json')
+
+
+@pytest.fixture(scope="module")
+def grafo():
+    with open(GRAFO, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+@pytest.fixture(scope="module")
+def calculador(grafo):
+    medicamentos = grafo['medicamentos']
+    return CalculadorRelaciones(medicamentos, PrincipiosIndex(medicamentos, {}))
+
+
+@pytest.fixture(scope="module")
+def engine():
+    """Fixture que crea el motor una vez (sin llamadas reales a Groq)"""
+    os.environ.setdefault("GROQ_API_KEY", "test")
+    from processing.smart_recommendation_engine import SmartRecommendationEngine
+    return SmartRecommendationEngine()
+
+
+def _por_medicamento(relaciones, enf_key):
+    return {r['hacia_medicamento']: sorted(set(r['principios_coincidentes']))
+            for r in relaciones if r['desde_enfermedad'] == enf_key}
+
+
+class TestCalculadorRelaciones:
+    """Tests para el recálculo de aristas de una sola enfermedad"""
+
+    @pytest.mark.parametrize("enf_key", ['Pulgas_Perro', 'Otitis externa_Gato', 'Garrapatas_Perro'])
+    def test_reproduce_el_grafo(self, grafo, calculador, enf_key):
+        """Mismas aristas y principios coincidentes que el grafo generado"""
+        aristas = calculador.calcular(enf_key, grafo['enfermedades'][enf_key])
+        assert _por_medicamento(aristas, enf_key) == _por_medicamento(grafo['relaciones'], enf_key)
+
+    def test_reproduce_todo_el_grafo(self, grafo, calculador):
+        """Arista a arista, en el mismo orden y con los mismos principios coincidentes (también
+        cuando el principio del medicamento está contenido en el recomendado: CLINDAMICINA)"""
+        for enf_key, enfermedad in grafo['enfermedades'].items():
+            esperadas = [r for r in grafo['relaciones'] if r['desde_enfermedad'] == enf_key]
+            assert calculador.calcular(enf_key, enfermedad) == esperadas, enf_key
+
+    def test_formato_arista(self, grafo, calculador):
+        arista = calculador.calcular('Pulgas_Perro', grafo['enfermedades']['Pulgas_Perro'])[0]
+        assert set(arista) == set(grafo['relaciones'][0])
+        assert arista['tipo'] == 'TRATA'
+
+    def test_sin_principios_usa_medicamentos_asociados(self, calculador):
+        enfermedad = {'nombre': 'Nueva', 'especie': 'Perro', 'medicamentos_asociados': ['med_2']}
+        aristas = calculador.calcular('ENF_900', enfermedad)
+        assert 'med_2' in {a['hacia_medicamento'] for a in aristas}
+        assert all(a['especie'] == 'Perro' for a in aristas)
+
+    def test_enfermedad_vacia(self, calculador):
+        assert calculador.calcular('ENF_901', {'nombre': 'Vacía', 'especie': 'Gato'}) == []
+
+    def test_rapido(self, grafo, calculador):
+        """Debe poder hacerse de forma síncrona al guardar el formulario"""
+        enfermedad = grafo['enfermedades']['Pulgas_Perro']
+        inicio = time.perf_counter()
+        for _ in range(10):
+            calculador.calcular('Pulgas_Perro', enfermedad)
+        assert (time.perf_counter() - inicio) / 10 < 0.1
+
+
+class TestOverlay:
+    """Tests para el overlay de relaciones recalculadas"""
+
+    def test_sustituye_solo_esa_enfermedad(self):
+        relaciones = [{'desde_enfermedad': 'Otitis externa_Perro', 'hacia_medicamento': 'med_1'},
+                      {'desde_enfermedad': 'Pulgas_Perro', 'hacia_medicamento': 'med_2'}]
+        nuevas = [{'desde_enfermedad': 'Otitis_externa_Perro', 'hacia_medicamento': 'med_3'}]
+        resultado = aplicar_overlay(relaciones, {'Otitis_externa_Perro': nuevas})
+        assert [r['hacia_medicamento'] for r in resultado] == ['med_2', 'med_3']
+
+    def test_recalcular_guarda_en_journal(self, tmp_path, grafo, calculador):
+        journal = JournalCambios(tmp_path / "relaciones.json", SECCION_OVERLAY)
+        aristas = recalcular_enfermedad(calculador, journal, 'ENF_050', grafo['enfermedades']['Pulgas_Gato'])
+        assert aristas
+        assert JournalCambios(tmp_path / "relaciones.json", SECCION_OVERLAY).estado() == {'ENF_050': aristas}
+
+
+class TestMotorRelaciones:
+    """Tests para la publicación de las aristas recalculadas en el motor"""
+
+    def test_publica_sin_tocar_el_resto(self, engine):
+        anterior = engine.snapshot
+        enfermedad = {'nombre': 'Pulicosis', 'especie': 'Perro', 'principios_recomendados': ['Fipronilo']}
+        aristas = engine.recalcular_relaciones('ENF_777', enfermedad, guardar=False)
+
+        assert aristas
+        assert engine.snapshot.version == anterior.version + 1
+        assert engine.catalogo_index is anterior.catalogo_index
+        assert anterior.medicamentos_ranking.peso(aristas[0]['hacia_medicamento'], 'ENF_777') == 0
+        assert engine.medicamentos_ranking.peso(aristas[0]['hacia_medicamento'], 'ENF_777') > 0
+        assert engine.medicamentos_ranking.clave_enfermedad('Pulicosis', 'Perro') == 'ENF_777'
+        # El resto de enfermedades no cambia
+        assert engine.medicamentos_ranking.aristas['Pulgas_Perro'] == anterior.medicamentos_ranking.aristas['Pulgas_Perro']
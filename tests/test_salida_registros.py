@@ -0,0 +1,91 @@
+import os
+import sys
+import csv
+import json
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from scraping.salida_registros import SalidaRegistros, guardar_registros
+from scraping.servidor_cimavet_local import ServidorCimavetLocal, cargar_catalogo
+from scraping.scraper_http import ejecutar
+
+
+def med(registro, nombre='AMOXICILINA 250 MG'):
+    return {'nombre': nombre, 'numero_registro': registro}
+
+
+def leer_jsonl(ruta):
+    return [json.loads(linea) for linea in ruta.read_text(encoding='utf-8').splitlines()]
+
+
+class TestSalidaRegistros:
+    """Tests para el sumidero de medicamentos en streaming"""
+
+    def test_deduplica_por_registro_y_no_por_nombre(self, tmp_path):
+        ruta = tmp_path / "medicamentos.csv"
+        with SalidaRegistros(ruta) as salida:
+            # Mismo nombre y distinto registro son dos productos; mismo registro, uno
+            assert salida.escribir_lote([med('1 ESP'), med('2 ESP'), med('1 ESP', 'OTRO NOMBRE LARGO')]) == 2
+            assert not salida.escribir(med('3 ESP', 'AMOX'))  # nombre demasiado corto
+            assert (salida.escritos, salida.duplicados, salida.descartados) == (2, 1, 1)
+
+        with open(ruta, encoding='utf-8', newline='') as f:
+            filas = list(csv.DictReader(f))
+        assert [f['numero_registro'] for f in filas] == ['1 ESP', '2 ESP']
+        assert filas[0]['laboratorio'] == ''
+
+    def test_continua_sin_repetir(self, tmp_path):
+        for ruta in (tmp_path / "medicamentos.jsonl", tmp_path / "medicamentos.csv"):
+            with SalidaRegistros(ruta) as salida:
+                salida.escribir_lote([med('1 ESP'), med('2 ESP')])
+            with SalidaRegistros(ruta) as salida:
+                assert salida.escritos == 2
+                assert salida.escribir_lote([med('2 ESP'), med('3 ESP')]) == 1
+
+        assert [m['numero_registro'] for m in leer_jsonl(tmp_path / "medicamentos.jsonl")] == [
+            '1 ESP', '2 ESP', '3 ESP']
+        with SalidaRegistros(tmp_path / "medicamentos.jsonl", continuar=False) as salida:
+            assert salida.escritos == 0
+
+    def test_descarta_linea_incompleta_tras_caida(self, tmp_path):
+        ruta = tmp_path / "medicamentos.jsonl"
+        with SalidaRegistros(ruta) as salida:
+            salida.escribir_lote([med('1 ESP'), med('2 ESP')])
+        with open(ruta, 'a', encoding='utf-8') as f:
+            f.write('{"nombre": "AMOXICILINA 250 MG", "numero_re')
+
+        with SalidaRegistros(ruta) as salida:
+            assert salida.escritos == 2
+            salida.escribir(med('3 ESP'))
+        assert [m['numero_registro'] for m in leer_jsonl(ruta)] == ['1 ESP', '2 ESP', '3 ESP']
+
+    def test_vistos_en_disco(self, tmp_path):
+        ruta = tmp_path / "medicamentos.jsonl"
+        with SalidaRegistros(ruta, vistos_en_disco=True) as salida:
+            salida.escribir_lote(med(f'{i} ESP') for i in range(100))
+            salida.escribir_lote(med(f'{i} ESP') for i in range(50, 150))
+            assert len(salida.vistos) == 150
+        with SalidaRegistros(ruta, vistos_en_disco=True) as salida:
+            assert not salida.escribir(med('7 ESP'))
+        assert len(leer_jsonl(ruta)) == 150
+        assert sorted(p.name for p in tmp_path.iterdir()) == ['medicamentos.jsonl']
+
+    def test_guardar_registros_sobrescribe(self, tmp_path):
+        ruta = tmp_path / "medicamentos.jsonl"
+        guardar_registros([med('1 ESP')], ruta)
+        assert guardar_registros([med('2 ESP'), med('2 ESP')], ruta) == 1
+        assert leer_jsonl(ruta) == [med('2 ESP')]
+
+
+class TestSalidaScraperHTTP:
+    """El scraper HTTP escribe cada partición según llega"""
+
+    def test_ejecutar_con_salida(self, tmp_path):
+        ruta = tmp_path / "cimavet.jsonl"
+        with ServidorCimavetLocal(tamano_pagina=3) as servidor, SalidaRegistros(ruta) as salida:
+            medicamentos, fallidas = ejecutar(servidor.url, ['perros', 'gatos'], 'ABCDEFGHIJKLMNOPQRSTUVWXYZ',
+                                              concurrencia=4, por_segundo=0, salida=salida)
+        assert medicamentos == [] and fallidas == []
+        registros = [m['numero_registro'] for m in leer_jsonl(ruta)]
+        assert len(registros) == len(set(registros))
+        assert set(registros) == {item['nregistro'] for item in cargar_catalogo()}
@@ -0,0 +1,160 @@
+import os
+import sys
+import time
+import asyncio
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from scraping.servidor_cimavet_local import ServidorCimavetLocal, cargar_catalogo
+from scraping.scraper_http import ClienteCimavet, LimitadorTasa, ErrorCimavetHTTP, ejecutar, resumen_paginacion
+
+
+def esperados(especies):
+    """Nº de registro de los medicamentos del catálogo grabado para esas especies"""
+    return {m['nregistro'] for m in cargar_catalogo()
+            if any(e.lower() in esp.lower() for esp in m['especies'] for e in especies)}
+
+
+class TestScraperHTTP:
+    """Tests para el scraper asíncrono contra el servidor CIMAVet local"""
+
+    def test_catalogo_completo_paginado(self):
+        with ServidorCimavetLocal(tamano_pagina=2) as servidor:
+            medicamentos, fallidas = ejecutar(servidor.url, ['perros', 'gatos'], 'ABM',
+                                              concurrencia=4, por_segundo=0)
+        assert fallidas == []
+        registros = [m['numero_registro'] for m in medicamentos]
+        # El medicamento de perros y gatos aparece en las dos búsquedas pero una sola vez en la salida
+        assert len(registros) == len(set(registros))
+        assert set(registros) == esperados(['perros', 'gatos'])
+        assert all(m['nombre'] and m['principios_activos'] for m in medicamentos)
+
+    def test_respeta_la_concurrencia(self):
+        with ServidorCimavetLocal(latencia=0.02, tamano_pagina=1) as servidor:
+            ejecutar(servidor.url, ['perros', 'gatos'], 'ABM', concurrencia=3, por_segundo=0)
+        assert servidor.max_simultaneas <= 3
+        assert servidor.peticiones > 3
+
+    def test_concurrencia_acelera(self):
+        """Con latencia por petición, 8 en vuelo tarda bastante menos que 1"""
+        tiempos = {}
+        for concurrencia in (1, 8):
+            with ServidorCimavetLocal(latencia=0.02, tamano_pagina=5) as servidor:
+                inicio = time.perf_counter()
+                ejecutar(servidor.url, ['perros', 'gatos'], 'ABM', concurrencia=concurrencia, por_segundo=0)
+                tiempos[concurrencia] = time.perf_counter() - inicio
+        assert tiempos[8] < tiempos[1] / 2
+
+    def test_reintenta_fallos_transitorios(self):
+        with ServidorCimavetLocal(fallos_transitorios=3) as servidor:
+            medicamentos, fallidas = ejecutar(servidor.url, ['gatos'], 'A', concurrencia=1, por_segundo=0)
+        assert fallidas == []
+        assert {m['numero_registro'] for m in medicamentos} == {
+            m['nregistro'] for m in cargar_catalogo()
+            if m['nombre'].startswith('A') and 'Gatos' in m['especies']}
+
+    def test_detalles(self):
+        with ServidorCimavetLocal() as servidor:
+            medicamentos, _ = ejecutar(servidor.url, ['gatos'], 'B', por_segundo=0, detalles=True)
+        assert medicamentos and all('prescripcion' in m and 'comercializado' in m for m in medicamentos)
+
+    def test_fallback_con_las_particiones_fallidas(self):
+        recibidas = []
+
+        def fallback(trabajos):
+            recibidas.extend(trabajos)
+            return [{'nombre': 'RESCATADO POR NAVEGADOR', 'numero_registro': '9999 ESP'}], []
+
+        with ServidorCimavetLocal(fallos_transitorios=100) as servidor:
+            medicamentos, fallidas = ejecutar(servidor.url, ['perros'], 'AB', concurrencia=1, por_segundo=0,
+                                              reintentos=1, fallback=fallback)
+        assert sorted(recibidas) == [('perros', 'A'), ('perros', 'B')]
+        assert fallidas == []
+        assert [m['numero_registro'] for m in medicamentos] == ['9999 ESP']
+
+    def test_error_no_reintentable(self):
+        async def pedir(url):
+            async with ClienteCimavet(url, por_segundo=0) as cliente:
+                await cliente.obtener_json('/no/existe', {})
+            return cliente.peticiones
+
+        with ServidorCimavetLocal() as servidor:
+            with pytest.raises(ErrorCimavetHTTP, match="404"):
+                asyncio.run(pedir(servidor.url))
+            assert servidor.peticiones == 1
+
+
+def buscar(url, especie, letra, **opciones):
+    """(medicamentos, paginación) de una sola partición"""
+    async def _buscar():
+        async with ClienteCimavet(url, por_segundo=0, **opciones) as cliente:
+            return await cliente.buscar_particion(especie, letra), cliente.paginacion
+    return asyncio.run(_buscar())
+
+
+class TestPaginacion:
+    """Tests para las páginas de una búsqueda pedidas en paralelo"""
+
+    def test_paginas_en_paralelo_y_en_orden(self):
+        with ServidorCimavetLocal(latencia=0.02, tamano_pagina=1) as servidor:
+            medicamentos, paginacion = buscar(servidor.url, 'perros', '', concurrencia=8)
+            ordenados = [m['nregistro'] for m in servidor.catalogo if 'Perros' in m['especies']]
+        # Todas las páginas salvo la primera a la vez, pero unidas en orden de página
+        assert servidor.max_simultaneas > 1
+        assert [m['numero_registro'] for m in medicamentos] == ordenados
+        assert paginacion[('perros', '')] == {'paginas': len(ordenados), 'registros': len(ordenados),
+                                              'esperados': len(ordenados)}
+
+    def test_repite_la_pagina_cortada(self):
+        with ServidorCimavetLocal(tamano_pagina=2, paginas_cortadas=2) as servidor:
+            medicamentos, paginacion = buscar(servidor.url, 'perros', '', concurrencia=1)
+        assert [m['numero_registro'] for m in medicamentos] == [
+            m['nregistro'] for m in servidor.catalogo if 'Perros' in m['especies']]
+        assert resumen_paginacion(paginacion)['incompletas'] == []
+
+    def test_incompleta_es_fallida(self):
+        async def _buscar(url):
+            async with ClienteCimavet(url, por_segundo=0, reintentos=1) as cliente:
+                with pytest.raises(ErrorCimavetHTTP, match="registros"):
+                    await cliente.buscar_particion('perros', '')
+                return cliente.paginacion
+
+        with ServidorCimavetLocal(tamano_pagina=2, paginas_cortadas=100) as servidor:
+            resumen = resumen_paginacion(asyncio.run(_buscar(servidor.url)))
+        assert resumen['incompletas'] == [('perros', '')]
+        assert resumen['registros'] < resumen['esperados']
+
+    def test_incompleta_queda_pendiente(self, tmp_path):
+        """Con checkpoints la partición cortada no se marca hecha ni se cierra la pasada"""
+        from scraping.checkpoints import AlmacenCheckpoints
+
+        ruta = tmp_path / "checkpoints.sqlite"
+        with ServidorCimavetLocal(tamano_pagina=2, paginas_cortadas=100) as servidor:
+            _, fallidas = ejecutar(servidor.url, ['perros'], 'A', por_segundo=0, reintentos=1, checkpoints=ruta)
+        assert fallidas == [('perros', 'A')]
+        with AlmacenCheckpoints(ruta) as almacen:
+            ejecucion = almacen.iniciar([('perros', 'A')])
+            assert almacen.pendientes(ejecucion, [('perros', 'A')]) == [('perros', 'A')]
+
+        # La pasada siguiente (ya sin cortes) la reintenta y la completa
+        with ServidorCimavetLocal(tamano_pagina=2) as servidor:
+            medicamentos, fallidas = ejecutar(servidor.url, ['perros'], 'A', por_segundo=0, checkpoints=ruta)
+        assert fallidas == []
+        assert {m['numero_registro'] for m in medicamentos} == {
+            m['nregistro'] for m in cargar_catalogo() if m['nombre'].startswith('A') and 'Perros' in m['especies']}
+
+
+class TestLimitadorTasa:
+    """Tests para el espaciado de peticiones"""
+
+    def test_espacia_las_peticiones(self):
+        async def medir():
+            limitador = LimitadorTasa(50)
+            inicio = time.perf_counter()
+            await asyncio.gather(*(limitador.esperar() for _ in range(6)))
+            return time.perf_counter() - inicio
+
+        # 6 peticiones a 50/s: la última sale a los 5 intervalos (0,1 s)
+        assert asyncio.run(medir()) >= 0.09
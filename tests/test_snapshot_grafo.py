@@ -0,0 +1,84 @@
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from processing.snapshot_grafo import SnapshotGrafo, VigilanteGrafo, firma_directorio
+
+
+@pytest.fixture(scope="module")
+def engine():
+    """Fixture que crea el motor una vez (sin llamadas reales a Groq)"""
+    os.environ.setdefault("GROQ_API_KEY", "test")
+    from processing.smart_recommendation_engine import SmartRecommendationEngine
+    return SmartRecommendationEngine()
+
+
+class TestSnapshotGrafo:
+    """Tests para las fotos inmutables del grafo y su recarga"""
+
+    def test_inmutable(self):
+        snap = SnapshotGrafo(version=1, medicamentos={})
+        with pytest.raises(AttributeError):
+            snap.version = 2
+        with pytest.raises(AttributeError):
+            snap.otro = 1
+
+    def test_recarga_publica_foto_nueva(self, engine):
+        """La foto anterior sigue completa y usable tras publicar la nueva"""
+        anterior = engine.snapshot
+        nuevo = engine.recargar()
+        assert engine.snapshot is nuevo
+        assert nuevo.version == anterior.version + 1
+        assert engine.catalogo_index is nuevo.catalogo_index
+        assert anterior.catalogo_index.buscar("amox").total == nuevo.catalogo_index.buscar("amox").total
+
+    def test_consultas_durante_recarga(self, engine):
+        """Consultas concurrentes con recargas nunca fallan ni mezclan versiones"""
+        errores = []
+
+        def consultar():
+            try:
+                for _ in range(30):
+                    resultado = engine.recomendar_top_10('Otitis externa', 'Perro', peso=10)
+                    assert len(resultado) == 10
+            except Exception as e:  # pragma: no cover - se comprueba abajo
+                errores.append(e)
+
+        hilos = [threading.Thread(target=consultar) for _ in range(4)]
+        for hilo in hilos:
+            hilo.start()
+        engine.recargar()
+        for hilo in hilos:
+            hilo.join()
+        assert errores == []
+
+
+class TestVigilanteGrafo:
+    """Tests para el vigilante de data/knowledge_graph/"""
+
+    def test_avisa_solo_con_firma_estable(self, tmp_path):
+        (tmp_path / "a.json").write_text("{}", encoding="utf-8")
+        avisos = []
+        vigilante = VigilanteGrafo(tmp_path, avisos.append, intervalo=0.01)
+
+        assert vigilante.comprobar() is None
+        (tmp_path / "a.json").write_text('{"x": 1}', encoding="utf-8")
+        (tmp_path / "notas.txt").write_text("ignorado", encoding="utf-8")
+        pendiente = vigilante.comprobar()
+        assert pendiente is not None and avisos == []
+        assert vigilante.comprobar(pendiente) is None
+        assert avisos == [firma_directorio(tmp_path)]
+        assert vigilante.comprobar() is None
+
+    def test_error_en_recarga_no_para_el_vigilante(self, tmp_path):
+        def falla(_):
+            raise ValueError("JSON roto")
+        vigilante = VigilanteGrafo(tmp_path, falla, intervalo=0.01)
+        (tmp_path / "b.json").write_text("{", encoding="utf-8")
+        pendiente = vigilante.comprobar()
+        assert vigilante.comprobar(pendiente) is None
+        assert vigilante.firma == firma_directorio(tmp_path)
@@ -0,0 +1,111 @@
+import os
+import sys
+import shutil
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from processing.validador_grafo import validar_grafo, validar_directorio, ErrorValidacionGrafo
+
+KG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'knowledge_graph')
+
+MEDICAMENTOS = {
+    'med_0': {'nombre': 'OTIDOG', 'principios_activos': ['MARBOFLOXACINO'], 'especie': 'Perro'},
+    'med_1': {'nombre': 'PULGAFIN', 'principios_activos': ['FIPRONILO'], 'especie': 'Perro'},
+}
+ENFERMEDADES = {'Otitis externa_Perro': {'nombre': 'Otitis externa', 'medicamentos_asociados': ['med_0']}}
+
+
+@pytest.fixture(scope="module")
+def engine():
+    """Fixture que crea el motor una vez (sin llamadas reales a Groq)"""
+    os.environ.setdefault("GROQ_API_KEY", "test")
+    from processing.smart_recommendation_engine import SmartRecommendationEngine
+    return SmartRecommendationEngine()
+
+
+class TestValidadorGrafo:
+    """Tests para la validación de integridad referencial del grafo"""
+
+    def test_grafo_real_valido_y_rapido(self):
+        informe = validar_directorio('data/knowledge_graph')
+        assert informe.valido, informe.resumen()
+        assert informe.segundos < 1.0
+
+    def test_detecta_referencias_rotas(self):
+        relaciones = [
+            {'desde_enfermedad': 'Otitis externa_Perro', 'hacia_medicamento': 'med_0',
+             'principios_coincidentes': ['MARBOFLOXACINO']},
+            {'desde_enfermedad': 'Otitis_externa_Perro', 'hacia_medicamento': 'med_9'},
+            {'desde_enfermedad': 'Moquillo_Perro', 'hacia_medicamento': 'med_1'},
+        ]
+        loader = {'ENF_001': {'nombre': 'Otitis externa', 'medicamentos_asociados': ['med_0', 'med_7']}}
+        sintomas = {'picor': ['Otitis externa', 'Otitis externa'], 'tos': ['Moquillo']}
+        informe = validar_grafo(MEDICAMENTOS, ENFERMEDADES, relaciones, loader, sintomas)
+
+        assert not informe.valido
+        assert informe.errores['relacion_medicamento_inexistente'] == [(1, 'med_9')]
+        assert informe.errores['relacion_enfermedad_inexistente'] == [(2, 'Moquillo_Perro')]
+        assert informe.errores['loader_medicamento_inexistente'] == [('ENF_001', 'med_7')]
+        assert informe.errores['sintoma_enfermedad_inexistente'] == [('tos', ['moquillo'])]
+        assert informe.avisos['sintoma_enfermedades_duplicadas'] == ['picor']
+
+    def test_enfermedad_del_loader_con_aristas(self):
+        """Las aristas de una enfermedad añadida desde el panel solo tienen su clave en el loader"""
+        relaciones = [{'desde_enfermedad': 'ENF_043', 'hacia_medicamento': 'med_1',
+                       'principios_coincidentes': ['FIPRONILO']}]
+        loader = {'ENF_043': {'nombre': 'Pulgas', 'medicamentos_asociados': ['med_1']}}
+        informe = validar_grafo(MEDICAMENTOS, ENFERMEDADES, relaciones, loader)
+        assert informe.valido, informe.resumen()
+        assert 'enfermedad_sin_mapeo' not in informe.avisos
+
+    def test_avisos_no_invalidan(self):
+        razas = {'Boxer': {'enfermedades_predisposicion': [{'enfermedad': 'Otitis'}, {'enfermedad': 'Displasia'}],
+                           'medicamentos_precaución': ['Isoflurano']}}
+        informe = validar_grafo(MEDICAMENTOS, ENFERMEDADES, [], razas=razas,
+                                categorias={'Fipronilo': 'Antiparasitario'}, dosis={})
+        assert informe.valido
+        assert informe.avisos['raza_enfermedad_inexistente'] == [('Boxer', 'Displasia')]
+        assert informe.avisos['raza_principio_inexistente'] == [('Boxer', 'Isoflurano')]
+        assert informe.avisos['categoria_sin_dosis'] == [('Fipronilo', 'Antiparasitario')]
+
+
+class TestPuertaDeCarga:
+    """Tests para la validación antes de publicar una recarga"""
+
+    def test_recarga_invalida_conserva_foto(self, engine, monkeypatch):
+        anterior = engine.snapshot
+        rota = anterior.reemplazar(version=anterior.version + 1,
+                                   relaciones=[{'desde_enfermedad': 'X', 'hacia_medicamento': 'med_no_existe'}])
+        monkeypatch.setattr(engine, '_construir_snapshot', lambda version, firma=(): rota)
+
+        with pytest.raises(ErrorValidacionGrafo) as excinfo:
+            engine.recargar()
+        assert engine.snapshot is anterior
+        assert 'relacion_medicamento_inexistente' in excinfo.value.informe.errores
+
+    def test_recarga_tras_anadir_enfermedad_desde_el_panel(self, tmp_path, monkeypatch):
+        """Mismo flujo que "Añadir Enfermedad": journal + overlay de aristas, y después recarga"""
+        from database.journal import JournalCambios
+        from processing.relaciones_incrementales import recalcular_enfermedad
+        from processing.smart_recommendation_engine import SmartRecommendationEngine
+
+        shutil.copytree(KG_DIR, tmp_path / 'data' / 'knowledge_graph',
+                        ignore=shutil.ignore_patterns('*.journal*', 'relaciones_enfermedades_admin*'))
+        monkeypatch.chdir(tmp_path)
+        os.environ.setdefault("GROQ_API_KEY", "test")
+        engine = SmartRecommendationEngine()
+
+        enfermedad = {'nombre': 'Pulgas recurrentes', 'especie': 'Perro',
+                      'principios_recomendados': ['Fipronilo', 'Selamectina']}
+        nueva_key = JournalCambios('data/knowledge_graph/enfermedades_42_completo.json',
+                                   'enfermedades').anadir(enfermedad)
+        aristas = recalcular_enfermedad(engine.snapshot.calculador_relaciones, engine.journal_relaciones,
+                                        nueva_key, enfermedad)
+        assert aristas
+
+        nuevo = engine.recargar()
+        assert engine.snapshot is nuevo
+        assert nueva_key in {r['desde_enfermedad'] for r in nuevo.relaciones}
+        assert validar_directorio('data/knowledge_graph').valido
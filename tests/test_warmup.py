@@ -0,0 +1,42 @@
+import os
+import sys
+import threading
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from processing.warmup import EstadoMotor, calentar
+
+
+class TestEstadoMotor:
+    """Tests para la sonda de disponibilidad"""
+
+    def test_fases(self):
+        """Las fases avanzan y se anota la duración de cada una"""
+        estado = EstadoMotor()
+        assert estado.informe()['fase'] == 'pendiente'
+        assert not estado.esperar(timeout=0.01)
+        estado.marcar('cargando')
+        estado.marcar('calentando')
+        estado.marcar('listo')
+        informe = estado.informe()
+        assert informe['listo']
+        assert set(informe['tiempos']) == {'cargando', 'calentando'}
+
+    def test_error_desbloquea_espera(self):
+        """Un fallo de carga no deja esperando a las sesiones"""
+        estado = EstadoMotor()
+        hilo = threading.Timer(0.05, estado.marcar, args=('error', 'sin datos'))
+        hilo.start()
+        assert estado.esperar(timeout=5) is False
+        assert estado.informe()['error'] == 'sin datos'
+
+
+def test_calentar_motor(monkeypatch):
+    """Las consultas de calentamiento recorren todos los índices locales"""
+    monkeypatch.setenv("GROQ_API_KEY", os.getenv("GROQ_API_KEY") or "test")
+    from processing.smart_recommendation_engine import SmartRecommendationEngine
+    motor = SmartRecommendationEngine()
+    hechas = calentar(motor)
+    assert hechas['ranking'] == 3
+    assert hechas['catalogo'] == hechas['autocompletado'] > 0
+    assert motor.catalogo_index._bits_prefijo.cache_info().currsize > 0